@@ -0,0 +1,86 @@
+"""Maintenance commands: python -m app.cli <command>"""
+import argparse
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.core.static_assets import STATIC_DIR, build_assets
+from app.services.rollup import StatsRollupService
+from app.services.timeseries import TimeSeriesService
+
+
+def rollup_rebuild(db, args) -> int:
+    """Recompute the user_calc_stats rollup from the calculations table"""
+    rows = StatsRollupService.rebuild(db, args.user_id)
+    print(f"Rebuilt {rows} rollup rows")
+    return 0
+
+
+def rollup_check(db, args) -> int:
+    """Report rollup rows that disagree with the calculations table"""
+    mismatches = StatsRollupService.check(db, args.user_id)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"{len(mismatches)} mismatched rollup rows")
+    return 1 if mismatches else 0
+
+
+def timeseries_rebuild(db, args) -> int:
+    """Recompute time-series buckets from the calculations table, then compact them"""
+    hours = TimeSeriesService.rebuild(db, args.user_id)
+    print(f"Rebuilt {hours} hourly buckets")
+    return timeseries_compact(db, args)
+
+
+def timeseries_compact(db, args) -> int:
+    """Fold hourly buckets older than the retention window into daily buckets"""
+    before = datetime.utcnow() - timedelta(days=args.retention_days)
+    hours = TimeSeriesService.compact(db, before)
+    print(f"Compacted {hours} hourly buckets")
+    return 0
+
+
+def static_build(args) -> int:
+    """Write content-hashed, precompressed copies of the static assets"""
+    manifest = build_assets(STATIC_DIR)
+    print(f"Built {len(manifest)} static assets")
+    return 0
+
+
+COMMANDS = {
+    "rollup-rebuild": rollup_rebuild,
+    "rollup-check": rollup_check,
+    "timeseries-rebuild": timeseries_rebuild,
+    "timeseries-compact": timeseries_compact,
+}
+
+# Commands that run without a database, such as during an image build
+OFFLINE_COMMANDS = {
+    "static-build": static_build,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Calculator maintenance commands")
+    parser.add_argument("command", choices=sorted([*COMMANDS, *OFFLINE_COMMANDS]))
+    parser.add_argument("--user-id", type=int, default=None, help="Limit to one user")
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=settings.timeseries_hourly_retention_days,
+        help="Keep hourly time-series buckets for this many days"
+    )
+    args = parser.parse_args()
+    
+    if args.command in OFFLINE_COMMANDS:
+        return OFFLINE_COMMANDS[args.command](args)
+    
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        return COMMANDS[args.command](db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,5 @@
+import redis
+from app.core.config import settings
+
+# Shared Redis connection for the token blacklist and response caches
+redis_client = redis.from_url(settings.redis_url, decode_responses=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Callable, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency until it has had time to recover
+    
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. Once reset_timeout seconds have passed a
+    single trial call is let through: success closes the circuit, failure
+    opens it again for another reset_timeout.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        exceptions: Tuple[Type[BaseException], ...] = (Exception,)
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.exceptions = exceptions
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        # Counters exposed through stats()
+        self.trips = 0
+        self.failures = 0
+        self.short_circuits = 0
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+    
+    def call(self, fn: Callable, *args, **kwargs):
+        """Call fn through the breaker"""
+        trial = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except self.exceptions:
+            self._on_failure(trial)
+            raise
+        except BaseException:
+            # Not a failure of the dependency, so the state stands, but a
+            # later call has to be free to run the trial
+            if trial:
+                self._end_trial()
+            raise
+        self._on_success()
+        return result
+    
+    def stats(self) -> dict:
+        """Current state and counters"""
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "failures": self.failures,
+            "short_circuits": self.short_circuits
+        }
+    
+    def _before_call(self) -> bool:
+        """Admit a call, returning whether it is the half-open trial"""
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.short_circuits += 1
+        raise CircuitOpenError(f"{self.name} circuit is open")
+    
+    def _end_trial(self):
+        with self._lock:
+            self._trial_running = False
+    
+    def _on_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("%s circuit closed", self.name)
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trial_running = False
+    
+    def _on_failure(self, trial: bool):
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if trial:
+                self._trial_running = False
+                self._opened_at = time.monotonic()
+                return
+            if self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                logger.warning(
+                    "%s circuit opened after %d consecutive failures",
+                    self.name, self._consecutive_failures
+                )
\ No newline at end of file
@@ -0,0 +1,177 @@
+import zlib
+from typing import List, Optional, Sequence
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# brotli is in requirements.txt; without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings in the order the server prefers them at equal quality
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Media types worth compressing besides text/*
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def acceptable_encodings(accept_encoding: str, supported: Sequence[str] = SUPPORTED_ENCODINGS) -> List[str]:
+    """Supported codings an Accept-Encoding header allows, best first"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.strip().lower()] = quality
+    
+    wildcard = qualities.get("*", 0.0)
+    ranked = [
+        (-qualities.get(coding, wildcard), index, coding)
+        for index, coding in enumerate(supported)
+        if qualities.get(coding, wildcard) > 0
+    ]
+    return [coding for _, _, coding in sorted(ranked)]
+
+
+# Event streams send small messages that must arrive at once, so
+# compressing them saves little and costs a flush per event
+UNCOMPRESSED_TYPES = {"text/event-stream"}
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Whether a response of this content type shrinks enough to be worth compressing"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in UNCOMPRESSED_TYPES:
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+
+class _Encoder:
+    """Incremental gzip or brotli compressor"""
+    
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 16 + MAX_WBITS writes a gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def compress(self, data: bytes, finish: bool = False) -> bytes:
+        """Compress a chunk; unless finishing, flush it so the client can decode it now"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + (self._brotli.finish() if finish else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Compresses responses with the best coding the client accepts
+    
+    Complete bodies are compressed when they are at least minimum_size bytes;
+    streamed bodies are compressed chunk by chunk and flushed after each one,
+    so exports still reach the client as they are produced. Responses that
+    are already encoded, have no body, or are not text-like pass through, and
+    strong ETags are weakened because the bytes no longer match them.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        
+        encodings = acceptable_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = encodings[0]
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+        
+        async def send_compressed(message: Message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type"))
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether to compress
+                    start = message
+                return
+            
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                compressed = encoder.compress(body, finish=not more_body)
+                self._encode_headers(start, encoding, None if more_body else len(compressed))
+                await send(start)
+            else:
+                compressed = encoder.compress(body, finish=not more_body)
+            
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        
+        await self.app(scope, receive, send_compressed)
+    
+    @staticmethod
+    def _encode_headers(start: Message, encoding: str, length: Optional[int]):
+        """Rewrite the held response start for an encoded body of the given length, None if streamed"""
+        headers = MutableHeaders(scope=start)
+        headers["Content-Encoding"] = encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
\ No newline at end of file
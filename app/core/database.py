@@ -1,6 +1,10 @@
+from functools import lru_cache
+from typing import Callable
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 # Create database engine
@@ -24,4 +28,95 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def async_database_url(url: str) -> str:
+    """Swap a database URL's driver for its asyncio counterpart"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+_DEFER_AFTER_COMMIT = "defer_after_commit"
+_AFTER_COMMIT_WORK = "after_commit_work"
+
+
+def run_after_commit(session: Session, work: Callable[[], None]):
+    """Run blocking work, such as Redis calls, due once a commit is done
+    
+    Meant for after_commit hooks. A sync session runs it at once, in the
+    thread that committed; the session behind an AsyncSession commits on the
+    event loop, so the work is queued for OffloadingAsyncSession to run in the
+    threadpool once the awaited commit returns.
+    """
+    if session.info.get(_DEFER_AFTER_COMMIT):
+        session.info.setdefault(_AFTER_COMMIT_WORK, []).append(work)
+    else:
+        work()
+
+
+class OffloadingAsyncSession(AsyncSession):
+    """AsyncSession that runs its after-commit work off the event loop
+    
+    Commits may be awaited directly or happen inside run_sync, as
+    CalculationService.bulk_create does, so both drain the queued work.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sync_session.info[_DEFER_AFTER_COMMIT] = True
+    
+    async def commit(self):
+        await super().commit()
+        await self._run_after_commit()
+    
+    async def run_sync(self, fn, *args, **kwargs):
+        try:
+            return await super().run_sync(fn, *args, **kwargs)
+        finally:
+            await self._run_after_commit()
+    
+    async def _run_after_commit(self):
+        work = self.sync_session.info.pop(_AFTER_COMMIT_WORK, None)
+        if work:
+            await run_in_threadpool(lambda: [item() for item in work])
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """Create the asyncio engine on first use, so sync deployments never load its driver"""
+    return create_async_engine(
+        settings.async_database_url or async_database_url(settings.database_url),
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=False
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Session factory for the asyncio engine"""
+    # Keep attributes loaded after commit; an expired attribute would need an
+    # implicit lazy load, which AsyncSession cannot do
+    return async_sessionmaker(
+        get_async_engine(),
+        class_=OffloadingAsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    """Dependency that provides an asyncio database session
+    
+    Like the sync session, it only checks out a connection on its first
+    statement, so requests answered from a cache or rejected during auth never
+    touch the pool.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,142 @@
+import time
+from typing import Dict, Optional, Sequence
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+CRITICAL = "critical"
+NORMAL = "normal"
+BULK = "bulk"
+
+
+class AdaptiveConcurrencyLimit:
+    """Concurrency limit that follows how quickly requests are being served
+    
+    The limit is adjusted AIMD style from latency samples. While samples stay
+    within latency_target and the limit is in use, it grows by about one for
+    each limit's worth of requests. A slow sample cuts it by backoff, at most
+    once per round of requests, since only a request started after the last
+    cut can cause another. Each priority class may only fill its share of
+    the limit, so bulk work is refused first and critical requests keep
+    headroom the others cannot take.
+    
+    Only touched from the event loop, so no lock is needed.
+    """
+    
+    SHARES = {CRITICAL: 1.0, NORMAL: 0.8, BULK: 0.5}
+    
+    def __init__(
+        self,
+        initial: int = 20,
+        min_limit: int = 4,
+        max_limit: int = 200,
+        latency_target: float = 0.5,
+        backoff: float = 0.9
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.inflight = 0
+        self._last_decrease = 0.0
+        # Counters exposed through stats()
+        self.shed: Dict[str, int] = {priority: 0 for priority in self.SHARES}
+    
+    def try_acquire(self, priority: str) -> bool:
+        """Take a slot for a request of the given priority, if its share has room"""
+        if self.inflight >= max(1, int(self.limit * self.SHARES[priority])):
+            self.shed[priority] += 1
+            return False
+        self.inflight += 1
+        return True
+    
+    def release(self, started: float, latency: Optional[float] = None):
+        """Free a slot, adjusting the limit when the request yielded a latency sample"""
+        self.inflight -= 1
+        if latency is None:
+            return
+        if latency > self.latency_target:
+            if started >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+        elif self.inflight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+    
+    def stats(self) -> dict:
+        """Health details for the /health endpoint"""
+        return {"limit": int(self.limit), "inflight": self.inflight, "shed": dict(self.shed)}
+
+
+class LoadSheddingMiddleware:
+    """Refuses HTTP requests beyond the concurrency limit with 503 and Retry-After
+    
+    Requests are classed by path prefix; exempt paths are neither counted nor
+    refused. Latency is measured to the start of the response, so long
+    streams are not mistaken for slow service, and bulk requests are not
+    sampled at all because they are slow by nature.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: AdaptiveConcurrencyLimit,
+        critical_paths: Sequence[str] = (),
+        bulk_paths: Sequence[str] = (),
+        exempt_paths: Sequence[str] = (),
+        retry_after: int = 1
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.critical_paths = tuple(critical_paths)
+        self.bulk_paths = tuple(bulk_paths)
+        self.exempt_paths = tuple(exempt_paths)
+        self.retry_after = retry_after
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        
+        priority = self.priority(path)
+        if not self.limiter.try_acquire(priority):
+            response = JSONResponse(
+                {"detail": "Server is busy; try again shortly"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        
+        started = time.monotonic()
+        latency = None
+        
+        async def send_timed(message: Message):
+            nonlocal latency
+            if message["type"] == "http.response.start" and priority != BULK:
+                latency = time.monotonic() - started
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            self.limiter.release(started, latency)
+    
+    def priority(self, path: str) -> str:
+        """Priority class of a request path"""
+        if path.startswith(self.critical_paths):
+            return CRITICAL
+        if path.startswith(self.bulk_paths):
+            return BULK
+        return NORMAL
+
+
+# Shared by the middleware and the /health endpoint
+concurrency_limit = AdaptiveConcurrencyLimit(
+    initial=settings.load_shedding_initial_limit,
+    min_limit=settings.load_shedding_min_limit,
+    max_limit=settings.load_shedding_max_limit,
+    latency_target=settings.load_shedding_latency_target,
+    backoff=settings.load_shedding_backoff
+)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from passlib.context import CryptContext
+
+# One context per bcrypt cost, built on first use inside each worker process
+_contexts: Dict[int, CryptContext] = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    context = _contexts.get(rounds)
+    if context is None:
+        # Hashes at any other cost, and legacy unsalted SHA-256 hex digests,
+        # verify but are reported as needing a rehash
+        context = CryptContext(
+            schemes=["bcrypt", "hex_sha256"],
+            deprecated=["hex_sha256"],
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds
+        )
+        _contexts[rounds] = context
+    return context
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    try:
+        return _context(rounds).verify_and_update(password, hashed)
+    except ValueError:
+        # Not a hash format this context knows
+        return False, None
+
+
+def _warm_up():
+    # Importing bcrypt is the slow part of a worker's first job
+    _context(4)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a bounded process pool
+    
+    bcrypt is deliberately slow, so on request threads a burst of logins
+    would take every core and every threadpool worker at once. Jobs go to a
+    fixed number of worker processes instead, so hashing never uses more than
+    that many cores, and once max_pending jobs are queued or running new ones
+    are refused with PasswordHasherBusy rather than piling up behind a
+    backlog. With workers set to 0 hashing runs inline, for tests and
+    single-core deployments.
+    """
+    
+    def __init__(self, rounds: int = 12, workers: Optional[int] = None, max_pending: int = 64):
+        self.rounds = rounds
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+    
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return self._pending
+    
+    def start(self):
+        """Start the worker processes and load bcrypt in each"""
+        executor = self._pool()
+        if executor is not None:
+            for future in [executor.submit(_warm_up) for _ in range(self.workers)]:
+                future.result()
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def hash(self, password: str) -> str:
+        """Hash a password, blocking until a worker is done"""
+        return self._submit(_hash, password, self.rounds).result()
+    
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password, also returning a new hash when the stored one is outdated"""
+        return self._submit(_verify_and_update, password, hashed, self.rounds).result()
+    
+    async def hash_async(self, password: str) -> str:
+        """hash without blocking the event loop"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(self.hash, password)
+        return await asyncio.wrap_future(self._submit(_hash, password, self.rounds))
+    
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """verify_and_update without blocking the event loop"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(self.verify_and_update, password, hashed)
+        return await asyncio.wrap_future(self._submit(_verify_and_update, password, hashed, self.rounds))
+    
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy(f"{self._pending} password jobs already pending")
+            self._pending += 1
+        try:
+            executor = self._pool()
+            if executor is None:
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                try:
+                    future = executor.submit(fn, *args)
+                except BrokenProcessPool:
+                    # A worker died, and a broken pool refuses every later
+                    # job; replace it and try once more
+                    self._discard(executor)
+                    future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+        return future
+    
+    def _job_done(self, future: Optional[Future]):
+        with self._lock:
+            self._pending -= 1
+    
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            # Another thread may already have replaced it
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers never inherit the parent's threads or the
+                # locks they might hold at fork time
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
\ No newline at end of file
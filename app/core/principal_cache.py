@@ -0,0 +1,66 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from app.core.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated identity resolved from an access token"""
+    id: int
+    username: str
+    email: str
+
+
+class PrincipalCache:
+    """In-process cache of verified tokens and the principal each one belongs to
+    
+    Entries carry the user's generation at the time they were cached; bumping a
+    user's generation invalidates every token cached for that user without
+    having to track which tokens those are.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[int, int] = {}
+        self._invalidations = 0
+        self._lock = threading.Lock()
+    
+    def get(self, token: str) -> Optional[Principal]:
+        """Return the cached principal for a token, if it is still current"""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        principal, generation = entry
+        if generation != self.generation(principal.id):
+            self._entries.delete(token)
+            return None
+        return principal
+    
+    def set(self, token: str, principal: Principal, generation: int, ttl: Optional[float] = None):
+        """Cache a principal resolved while the user was at the given generation"""
+        self._entries.set(token, (principal, generation), ttl=ttl)
+    
+    def generation(self, user_id: int) -> int:
+        """Current generation of a user's cached principals"""
+        with self._lock:
+            return self._generations.get(user_id, 0)
+    
+    def invalidations(self) -> int:
+        """Number of user invalidations so far, across every user"""
+        with self._lock:
+            return self._invalidations
+    
+    def invalidate_token(self, token: str):
+        """Forget a single token"""
+        self._entries.delete(token)
+    
+    def invalidate_user(self, user_id: int):
+        """Forget every token cached for a user"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._invalidations += 1
+    
+    def clear(self):
+        """Forget every token"""
+        self._entries.clear()
\ No newline at end of file
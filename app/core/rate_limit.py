@@ -0,0 +1,291 @@
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+import redis
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.config import settings
+from app.core.security import principal_cache
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Refills a bucket to Redis' clock, puts back tokens a worker never spent and
+# takes up to the wanted number; returns how many were granted and how many
+# remain, the latter as a string because Lua numbers reply as integers
+_LEASE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local returned = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate + returned)
+local granted = math.min(wanted, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {granted, tostring(tokens)}
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A bucket of count requests that refills over period seconds"""
+    count: int
+    period: float
+    
+    @property
+    def rate(self) -> float:
+        """Tokens added per second"""
+        return self.count / self.period
+
+
+@lru_cache(maxsize=None)
+def parse_limit(spec: str) -> Limit:
+    """Parse a limit written as "<count>/<second|minute|hour|day>" """
+    count, _, unit = spec.partition("/")
+    try:
+        return Limit(int(count), _PERIODS[unit.strip().lower()])
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '60/minute'")
+
+
+@dataclass
+class Decision:
+    """Outcome of one rate-limited request"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float = 0.0
+    
+    def headers(self) -> Dict[str, str]:
+        """Rate limit response headers, with Retry-After on refusals"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class TokenBucket:
+    """In-process token bucket"""
+    
+    def __init__(self, limit: Limit, now: float):
+        self.limit = limit
+        self.tokens = float(limit.count)
+        self.updated = now
+    
+    def take(self, now: float) -> Decision:
+        """Spend one token if there is one"""
+        limit = self.limit
+        self.tokens = min(limit.count, self.tokens + (now - self.updated) * limit.rate)
+        self.updated = now
+        if self.tokens < 1:
+            retry_after = (1 - self.tokens) / limit.rate
+            return Decision(False, limit.count, 0, (limit.count - self.tokens) / limit.rate, retry_after)
+        self.tokens -= 1
+        return Decision(True, limit.count, int(self.tokens), (limit.count - self.tokens) / limit.rate)
+    
+    def idle(self, now: float) -> bool:
+        """Whether the bucket has refilled, so dropping it changes nothing"""
+        return self.tokens + (now - self.updated) * self.limit.rate >= self.limit.count
+
+
+@dataclass
+class _Lease:
+    """Tokens a worker took from a Redis bucket and may spend locally"""
+    tokens: int
+    size: int
+    remaining: int
+    expires: float
+    denied_until: float = 0.0
+
+
+class RateLimiter:
+    """Per-key token buckets shared through Redis, spent mostly without it
+    
+    The authoritative bucket for each key lives in Redis and is updated by a
+    Lua script, so workers on every host draw from the same budget. Instead of
+    one round trip per request, a worker leases a few tokens at a time and
+    spends them locally; the lease doubles while a client keeps using it up,
+    to at most lease_fraction of the limit, and tokens left when it expires
+    after lease_ttl seconds are put back on the next lease. A refusal is also
+    remembered until the bucket would have a token again, so a client that
+    keeps retrying is turned away without asking Redis.
+    
+    Without a client, or while Redis fails or cannot run scripts, each worker
+    enforces the limit on its own with in-process buckets.
+    """
+    
+    def __init__(
+        self,
+        client: Optional[redis.Redis] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        lease_fraction: float = 0.1,
+        lease_ttl: float = 1.0,
+        prefix: str = "ratelimit"
+    ):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker("rate limiter", exceptions=(redis.RedisError,))
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.prefix = prefix
+        self._script = client.register_script(_LEASE_SCRIPT) if client is not None else None
+        # Only touched from the event loop, so no lock is needed
+        self._leases: Dict[str, _Lease] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._next_purge = 1024
+    
+    async def hit(self, key: str, limit: Limit) -> Decision:
+        """Count one request against key's bucket"""
+        now = time.monotonic()
+        self._purge(now)
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease.denied_until > now:
+                wait = lease.denied_until - now
+                return Decision(False, limit.count, 0, limit.count / limit.rate, wait)
+            if lease.tokens > 0 and lease.expires > now:
+                lease.tokens -= 1
+                return self._leased(limit, lease)
+        if self._script is None:
+            return self._local(key, limit, now)
+        
+        size = 1
+        returned = 0
+        if lease is not None:
+            if lease.expires > now:
+                # Used up within its lifetime: this client can take a bigger one
+                size = min(max(1, int(limit.count * self.lease_fraction)), lease.size * 2)
+            else:
+                returned = lease.tokens
+        try:
+            granted, remaining = await run_in_threadpool(
+                self.breaker.call,
+                self._script,
+                keys=[f"{self.prefix}:{key}"],
+                args=[limit.count, repr(limit.rate / 1000), size, returned]
+            )
+        except (CircuitOpenError, redis.RedisError):
+            return self._local(key, limit, now)
+        
+        granted, remaining = int(granted), float(remaining)
+        if granted < 1:
+            wait = (1 - remaining) / limit.rate
+            self._leases[key] = _Lease(0, 1, 0, now, denied_until=now + wait)
+            return Decision(False, limit.count, 0, (limit.count - remaining) / limit.rate, wait)
+        lease = _Lease(granted - 1, granted, int(remaining), now + self.lease_ttl)
+        self._leases[key] = lease
+        return self._leased(limit, lease)
+    
+    def clear(self):
+        """Forget every local bucket and lease"""
+        self._leases.clear()
+        self._buckets.clear()
+    
+    def stats(self) -> dict:
+        """Health details for the /health endpoint"""
+        return {
+            "backend": "memory" if self.client is None else "redis",
+            "circuit": self.breaker.stats()
+        }
+    
+    def _leased(self, limit: Limit, lease: _Lease) -> Decision:
+        remaining = lease.remaining + lease.tokens
+        return Decision(True, limit.count, remaining, (limit.count - remaining) / limit.rate)
+    
+    def _local(self, key: str, limit: Limit, now: float) -> Decision:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.limit != limit:
+            bucket = self._buckets[key] = TokenBucket(limit, now)
+        return bucket.take(now)
+    
+    def _purge(self, now: float):
+        # Drop finished leases and refilled buckets whenever the maps have
+        # doubled since the last sweep
+        if len(self._leases) + len(self._buckets) < self._next_purge:
+            return
+        self._leases = {
+            key: lease for key, lease in self._leases.items()
+            if lease.expires > now or lease.denied_until > now
+        }
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.idle(now)}
+        self._next_purge = max(1024, 2 * (len(self._leases) + len(self._buckets)))
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the rate limiter selected by settings.rate_limit_storage"""
+    client = None
+    if settings.rate_limit_storage == "redis":
+        # A dedicated client, so a slow Redis delays limited requests by at
+        # most the timeout before they fall back to local buckets
+        client = redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=settings.rate_limit_timeout,
+            socket_connect_timeout=settings.rate_limit_timeout
+        )
+    return RateLimiter(
+        client,
+        lease_fraction=settings.rate_limit_lease_fraction,
+        lease_ttl=settings.rate_limit_lease_ttl
+    )
+
+
+rate_limiter = create_rate_limiter()
+
+
+def client_key(request: Request) -> str:
+    """The user a request's bearer token belongs to, or else its IP address
+    
+    Tokens are identified from the principal cache or by checking the JWT
+    signature, never with a database lookup; revocation is left to the
+    route's own authentication.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        principal = principal_cache.get(token)
+        if principal is not None:
+            return f"user:{principal.username}"
+        try:
+            username = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]).get("sub")
+        except JWTError:
+            username = None
+        if username:
+            return f"user:{username}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimit:
+    """Dependency applying the limit configured under a name in settings.rate_limits
+    
+    Add it to a route's dependencies so it runs before authentication and
+    before a database session is opened.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    async def __call__(self, request: Request, response: Response):
+        spec = settings.rate_limits.get(self.name)
+        if not settings.rate_limit_enabled or not spec:
+            return
+        decision = await rate_limiter.hit(f"{self.name}:{client_key(request)}", parse_limit(spec))
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded; try again later",
+                headers=decision.headers()
+            )
+        response.headers.update(decision.headers())
\ No newline at end of file
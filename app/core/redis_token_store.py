@@ -0,0 +1,256 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+import redis
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.token_store import TokenStore, token_digest
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings
+    
+    Membership checks can return false positives at roughly error_rate once
+    capacity items are stored, but never false negatives.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def add(self, item: str):
+        """Insert an item; callers adding from several threads must serialise"""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+
+class RedisTokenStore(TokenStore):
+    """Redis token store fronted by an in-process Bloom filter
+    
+    Revoked tokens are stored under the SHA-256 of the token and announced on
+    a pub/sub channel. Each process keeps a Bloom filter of the revoked digests,
+    filled from a key scan and kept current by the channel, so Redis is only
+    asked about tokens the filter reports as possibly revoked. The filter is
+    rebuilt every reload_interval seconds, which drops expired entries and
+    repairs anything missed. Until the subscriber is connected, and whenever
+    it loses Redis, every check goes to Redis.
+    
+    The same channel carries user-wide revocations: revoke_user announces a
+    bumped token version and every process passes the user id to
+    on_user_revoked.
+    
+    Request-path Redis calls go through a circuit breaker. While Redis is
+    failing, checks are answered from the last synced filter, so a possible hit
+    is treated as revoked, and revocations are kept locally and written to
+    Redis once it answers again. Tokens revoked by other processes during the
+    outage are only seen after it ends.
+    """
+    
+    backend = "redis"
+    
+    def __init__(
+        self,
+        client: redis.Redis,
+        breaker: Optional[CircuitBreaker] = None,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+        reload_interval: float = 300.0,
+        retry_interval: float = 1.0,
+        enabled: bool = True,
+        prefix: str = "blacklist",
+        on_user_revoked: Optional[Callable[[int], None]] = None
+    ):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker("token store", exceptions=(redis.RedisError,))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.reload_interval = reload_interval
+        self.retry_interval = retry_interval
+        self.enabled = enabled
+        self.prefix = prefix
+        self.on_user_revoked = on_user_revoked
+        self.channel = f"{prefix}:revoked"
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        # Digests added while a reload scans Redis, replayed into the new filter
+        self._rebuilding: Optional[list] = None
+        # Revocations Redis has not accepted yet, with their expiry times
+        self._pending: Dict[str, float] = {}
+        self._live = False
+        self._stopped: Optional[threading.Event] = None
+    
+    @property
+    def live(self) -> bool:
+        """Whether the filter is synced and can answer negative checks alone"""
+        return self._live
+    
+    def add(self, token: str, expires_in: int):
+        digest = token_digest(token)
+        self._remember(digest)
+        try:
+            self.breaker.call(self.client.setex, self._key(digest), expires_in, "true")
+        except (CircuitOpenError, redis.RedisError):
+            logger.warning("Token store unavailable; keeping revocation locally until it recovers")
+            with self._lock:
+                self._pending[digest] = time.time() + expires_in
+            return
+        self._publish(digest)
+    
+    def revoke_user(self, user_id: int):
+        """Announce that every token issued to a user before now is revoked"""
+        # Other processes drop their cached principals within its TTL if this is lost
+        self._publish(f"user:{user_id}")
+    
+    def might_contain(self, token: str) -> bool:
+        """Whether a token could be revoked, answered without Redis
+        
+        False is definite; True means Redis has to be asked.
+        """
+        return not self._live or token_digest(token) in self._filter
+    
+    def contains(self, token: str) -> bool:
+        digest = token_digest(token)
+        if self._live and digest not in self._filter:
+            return False
+        if self._pending.get(digest, 0) > time.time():
+            return True
+        try:
+            # Keys written before tokens were hashed are checked too until they expire
+            return self.breaker.call(self.client.exists, self._key(digest), self._key(token)) > 0
+        except (CircuitOpenError, redis.RedisError):
+            return digest in self._filter
+    
+    def start(self):
+        """Start the background subscriber that keeps the filter in sync"""
+        if not self.enabled or self._stopped is not None:
+            return
+        # Each subscriber gets its own stop event, so a restart never waits
+        # for the previous thread to notice it was stopped
+        self._stopped = threading.Event()
+        threading.Thread(
+            target=self._run, args=(self._stopped,), name="token-store-sync", daemon=True
+        ).start()
+    
+    def stop(self):
+        """Stop the subscriber and fall back to asking Redis on every check"""
+        with self._lock:
+            if self._stopped is not None:
+                self._stopped.set()
+                self._stopped = None
+            self._live = False
+    
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "pending_revocations": len(self._pending),
+            "circuit": self.breaker.stats()
+        }
+    
+    def reload(self):
+        """Rebuild the filter from the revoked keys currently in Redis"""
+        with self._lock:
+            self._rebuilding = []
+        try:
+            digests = [key[len(self.prefix) + 1:] for key in self.client.scan_iter(f"{self.prefix}:*", count=1000)]
+        except Exception:
+            with self._lock:
+                self._rebuilding = None
+            raise
+        
+        rebuilt = BloomFilter(max(self.capacity, 2 * len(digests)), self.error_rate)
+        for digest in digests:
+            rebuilt.add(digest if len(digest) == 64 else token_digest(digest))
+        with self._lock:
+            for digest in self._rebuilding + list(self._pending):
+                rebuilt.add(digest)
+            self._rebuilding = None
+            self._filter = rebuilt
+    
+    def flush_pending(self):
+        """Write revocations made while Redis was unavailable"""
+        with self._lock:
+            pending = list(self._pending.items())
+        now = time.time()
+        for digest, expires_at in pending:
+            if expires_at > now:
+                self.client.setex(self._key(digest), max(1, int(expires_at - now)), "true")
+                self._publish(digest)
+            with self._lock:
+                self._pending.pop(digest, None)
+    
+    def _publish(self, message: str):
+        if not self.enabled:
+            return
+        try:
+            self.breaker.call(self.client.publish, self.channel, message)
+        except (CircuitOpenError, redis.RedisError):
+            # Other processes pick revoked tokens up on their next reload
+            logger.warning("Could not announce token revocation", exc_info=True)
+    
+    def _remember(self, digest: str):
+        with self._lock:
+            self._filter.add(digest)
+            if self._rebuilding is not None:
+                self._rebuilding.append(digest)
+    
+    def _run(self, stopped: threading.Event):
+        while not stopped.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Subscribe before scanning so nothing revoked in between is missed
+                pubsub.subscribe(self.channel)
+                self.flush_pending()
+                self.reload()
+                self._set_live(stopped, True)
+                next_reload = time.monotonic() + self.reload_interval
+                while not stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._receive(message["data"])
+                    if self._pending:
+                        self.flush_pending()
+                    if time.monotonic() >= next_reload:
+                        self.reload()
+                        next_reload = time.monotonic() + self.reload_interval
+            except redis.RedisError:
+                logger.warning("Token store subscriber lost Redis; checking Redis directly", exc_info=True)
+                self._set_live(stopped, False)
+                stopped.wait(self.retry_interval)
+            finally:
+                try:
+                    pubsub.close()
+                except redis.RedisError:
+                    pass
+    
+    def _receive(self, data: str):
+        if data.startswith("user:"):
+            if self.on_user_revoked is not None:
+                self.on_user_revoked(int(data[len("user:"):]))
+        else:
+            self._remember(data)
+    
+    def _set_live(self, stopped: threading.Event, live: bool):
+        with self._lock:
+            if not stopped.is_set():
+                self._live = live
+    
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
\ No newline at end of file
@@ -1,41 +1,113 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db, run_after_commit
+from app.core.passwords import PasswordHasher, PasswordHasherBusy
+from app.core.principal_cache import Principal, PrincipalCache
+from app.core.token_store import create_token_store
 from app.models.user import User
-import redis
-import hashlib
+import time
+import uuid
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# Redis connection for token blacklist
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+# bcrypt runs in a bounded pool of worker processes, so a burst of logins
+# cannot take every core and request thread
+password_hasher = PasswordHasher(
+    rounds=settings.password_hash_rounds,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
+
+# Verified tokens and their principals, so most requests skip the JWT decode
+# and the users lookup
+principal_cache = PrincipalCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl
+)
+
+# Revoked tokens, in the store selected by settings.token_store; most checks
+# are answered locally without a network round trip
+token_blacklist = create_token_store(on_user_revoked=principal_cache.invalidate_user)
+
+# Session.info keys holding user ids whose cached principals must be dropped,
+# and whose token revocation must be announced, on commit
+_CHANGED_USERS = "changed_principal_users"
+_REVOKED_USERS = "revoked_token_users"
+
+
+def _hasher_busy_exception() -> HTTPException:
+    """Build the 503 raised when the password hashing queue is full"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password checks in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    hashed = hashlib.sha256(plain_password.encode()).hexdigest()
-    return hashed == hashed_password
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also returning a new hash when the stored one is outdated
+    
+    Legacy SHA-256 hashes and bcrypt hashes at another cost verify as before
+    and come back with a replacement the caller should store.
+    """
+    try:
+        return password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password for async routes"""
+    try:
+        return await password_hasher.verify_and_update_async(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    try:
+        return password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a JWT access token"""
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash for async routes"""
+    try:
+        return await password_hasher.hash_async(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
+
+
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    token_version: int = 0
+) -> str:
+    """Create a JWT access token carrying the user's current token version"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
+    # A unique token id keeps tokens issued within the same second distinct,
+    # so blacklisting one session never revokes another
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "ver": token_version})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -44,42 +116,161 @@ def blacklist_token(token: str, expires_in: int = None):
     """Add a token to the blacklist"""
     if expires_in is None:
         expires_in = settings.access_token_expire_minutes * 60
-    redis_client.setex(f"blacklist:{token}", expires_in, "true")
+    token_blacklist.add(token, expires_in)
+    principal_cache.invalidate_token(token)
 
 
 def is_token_blacklisted(token: str) -> bool:
     """Check if a token is blacklisted"""
-    return redis_client.exists(f"blacklist:{token}") > 0
+    return token_blacklist.contains(token)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
-    credentials_exception = HTTPException(
+def revoke_user_tokens(user: User):
+    """Revoke every token issued to a user once the session commits
+    
+    The increment runs in SQL so concurrent revocations never collapse into
+    one; refresh the user after committing to read the new version.
+    """
+    user.token_version = User.token_version + 1
+
+
+def _credentials_exception() -> HTTPException:
+    """Build the 401 raised for any token that cannot be verified"""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _resolve_principal(token: str, db: Session) -> Principal:
+    """Decode a token and load its user, caching the resulting principal"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        username: str = payload.get("sub")
+        if username is None:
+            raise _credentials_exception()
+    except JWTError:
+        raise _credentials_exception()
+    
+    # The user's id, and so its generation, is only known after the lookup;
+    # count invalidations before it instead, so a change committed while the
+    # row is read keeps the possibly outdated principal out of the cache
+    invalidations = principal_cache.invalidations()
+    user = db.query(User).filter(User.username == username).first()
+    # Tokens issued before the user's last revocation carry an older version
+    if user is None or payload.get("ver", 0) != user.token_version:
+        raise _credentials_exception()
+    
+    generation = principal_cache.generation(user.id)
+    principal = Principal(id=user.id, username=user.username, email=user.email)
+    if principal_cache.invalidations() == invalidations:
+        ttl = settings.principal_cache_ttl
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - time.time())
+        # An invalidation from here on bumps the generation, leaving the entry stale
+        principal_cache.set(token, principal, generation, ttl=ttl)
     
-    if is_token_blacklisted(token):
+    return principal
+
+
+async def _ensure_not_revoked(token: str):
+    """Reject blacklisted tokens without blocking the event loop on Redis"""
+    # The store's local state clears almost every token without leaving the event loop
+    if token_blacklist.might_contain(token) and await run_in_threadpool(is_token_blacklisted, token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Get the authenticated principal, from the cache when possible
     
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    Routes that only need the user's id should depend on this rather than
+    get_current_user, so a cached token never touches the users table. The
+    Redis and database clients are synchronous, so their calls run in the
+    threadpool and never block the event loop.
+    """
+    await _ensure_not_revoked(token)
     
-    user = db.query(User).filter(User.username == username).first()
+    principal = principal_cache.get(token)
+    if principal is None:
+        principal = await run_in_threadpool(_resolve_principal, token, db)
+    
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current authenticated user"""
+    user = await run_in_threadpool(db.get, User, principal.id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    
+    return user
+
+
+async def get_current_principal_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """get_current_principal for async routes, loading users through the async engine"""
+    await _ensure_not_revoked(token)
     
-    return user
\ No newline at end of file
+    principal = principal_cache.get(token)
+    if principal is None:
+        principal = await db.run_sync(lambda session: _resolve_principal(token, session))
+    
+    return principal
+
+
+async def get_current_user_async(
+    principal: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user for async routes"""
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise _credentials_exception()
+    
+    return user
+
+
+# Username, email and password changes and account deletion all flush a User
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.identity is not None:
+                session.info.setdefault(_CHANGED_USERS, set()).add(state.identity[0])
+                # Other workers must also stop honouring a deleted user's tokens,
+                # or writes under them fail on the missing user row
+                if obj in session.deleted or state.attrs.token_version.history.has_changes():
+                    session.info.setdefault(_REVOKED_USERS, set()).add(state.identity[0])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    # The local cache is dropped at once, so the committing request already
+    # sees the change; only the Redis writes wait for run_after_commit
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        principal_cache.invalidate_user(user_id)
+    # Other processes only hear about revocations; profile edits reach them
+    # when their cached principals expire
+    revoked = session.info.pop(_REVOKED_USERS, ())
+    if revoked:
+        run_after_commit(session, lambda: [token_blacklist.revoke_user(user_id) for user_id in revoked])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
+    session.info.pop(_REVOKED_USERS, None)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import json
+import shutil
+import stat
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, Optional
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from app.core.compression import acceptable_encodings, brotli
+
+STATIC_DIR = "app/static"
+# Subdirectory of STATIC_DIR that static-build writes hashed copies into
+BUILD_SUBDIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Asset types precompressed at build time
+PRECOMPRESSED_SUFFIXES = {".css", ".js", ".json", ".map", ".svg", ".txt", ".html"}
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Hashed names change with their content, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _precompress(data: bytes) -> Dict[str, bytes]:
+    """Maximum-effort encodings of an asset, keeping only those that shrink it"""
+    encoded = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in encoded.items() if len(body) < len(data)}
+
+
+def build_assets(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Copy static assets to content-hashed names with .br/.gz siblings and write the manifest
+    
+    The manifest maps each asset's path under static_dir to its hashed copy
+    under the build subdirectory, which is replaced on every build.
+    """
+    source = Path(static_dir)
+    target = source / BUILD_SUBDIR
+    if target.exists():
+        shutil.rmtree(target)
+    
+    manifest = {}
+    for path in sorted(source.rglob("*")):
+        relative = path.relative_to(source)
+        if not path.is_file() or any(part.startswith(".") for part in relative.parts):
+            continue
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = relative.with_name(f"{path.stem}.{digest}{path.suffix}")
+        
+        output = target / hashed
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(data)
+        if path.suffix in PRECOMPRESSED_SUFFIXES:
+            for encoding, body in _precompress(data).items():
+                output.with_name(output.name + ENCODING_SUFFIXES[encoding]).write_bytes(body)
+        
+        manifest[relative.as_posix()] = f"{BUILD_SUBDIR}/{hashed.as_posix()}"
+    
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+class AssetManifest:
+    """URLs of static assets, pointing at their hashed copies once static-build has run"""
+    
+    def __init__(self, manifest: Dict[str, str], url_prefix: str = "/static"):
+        self.manifest = manifest
+        self.url_prefix = url_prefix
+        self.hashed = set(manifest.values())
+    
+    @classmethod
+    def load(cls, static_dir: str = STATIC_DIR, url_prefix: str = "/static") -> "AssetManifest":
+        """Read the build manifest; without one every asset is served from its source path"""
+        try:
+            manifest = json.loads((Path(static_dir) / BUILD_SUBDIR / MANIFEST_NAME).read_text())
+        except FileNotFoundError:
+            manifest = {}
+        return cls(manifest, url_prefix)
+    
+    def url(self, path: str) -> str:
+        """Public URL of an asset given its path under the static directory"""
+        return f"{self.url_prefix}/{self.manifest.get(path, path)}"
+    
+    def is_hashed(self, path: str) -> bool:
+        """Whether a served path is a content-hashed copy"""
+        return Path(path).as_posix() in self.hashed
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles serving the .br/.gz siblings written by static-build
+    
+    Hashed copies are marked immutable; everything else is revalidated on
+    each use, so an unhashed URL picks up a changed file straight away.
+    """
+    
+    def __init__(self, *args, manifest: Optional[AssetManifest] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest or AssetManifest({})
+    
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if self.manifest.is_hashed(path) else "no-cache"
+        )
+        response.headers.add_vary_header("Accept-Encoding")
+        return response
+    
+    async def _precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        """The best precompressed sibling of path the client accepts, if one exists"""
+        request_headers = Headers(scope=scope)
+        for encoding in acceptable_encodings(request_headers.get("accept-encoding", "")):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(
+                    self.lookup_path, path + ENCODING_SUFFIXES[encoding]
+                )
+            except OSError:
+                # Left to StaticFiles, which answers for the uncompressed path
+                return None
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=guess_type(path)[0] or "text/plain",
+                headers={"Content-Encoding": encoding}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
\ No newline at end of file
@@ -0,0 +1,172 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+from app.core.config import settings
+
+
+def token_digest(token: str) -> str:
+    """SHA-256 of a token, used in place of the full JWT wherever revocations are stored"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenStore:
+    """Where revoked tokens are kept
+    
+    Stores are shared by every request thread. might_contain must answer
+    without blocking I/O so the async auth path can call it on the event loop;
+    True means contains has to be asked.
+    """
+    
+    backend = "none"
+    
+    @property
+    def live(self) -> bool:
+        """Whether might_contain can clear tokens without asking the store"""
+        return False
+    
+    def add(self, token: str, expires_in: int):
+        """Revoke a token for expires_in seconds"""
+        raise NotImplementedError
+    
+    def contains(self, token: str) -> bool:
+        """Whether a token has been revoked"""
+        raise NotImplementedError
+    
+    def might_contain(self, token: str) -> bool:
+        """Whether a token could be revoked, answered without blocking I/O"""
+        return True
+    
+    def revoke_user(self, user_id: int):
+        """Tell other processes that a user's token version changed"""
+    
+    def start(self):
+        """Start any background work the store needs"""
+    
+    def stop(self):
+        """Stop background work started by start"""
+    
+    def stats(self) -> dict:
+        """Health details for the /health endpoint"""
+        return {"backend": self.backend, "live": self.live}
+
+
+class MemoryTokenStore(TokenStore):
+    """Revoked tokens held in this process only
+    
+    Suits single-worker deployments and tests that run without Redis; with
+    several workers a token revoked in one is still accepted by the others.
+    """
+    
+    backend = "memory"
+    
+    def __init__(self):
+        self._expiries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 1024
+    
+    @property
+    def live(self) -> bool:
+        return True
+    
+    def add(self, token: str, expires_in: int):
+        with self._lock:
+            self._expiries[token_digest(token)] = time.monotonic() + expires_in
+            # Drop expired tokens whenever the map has doubled since the last sweep
+            if len(self._expiries) >= self._next_purge:
+                now = time.monotonic()
+                self._expiries = {digest: expiry for digest, expiry in self._expiries.items() if expiry > now}
+                self._next_purge = max(1024, 2 * len(self._expiries))
+    
+    def contains(self, token: str) -> bool:
+        expiry = self._expiries.get(token_digest(token))
+        return expiry is not None and expiry > time.monotonic()
+    
+    def might_contain(self, token: str) -> bool:
+        return self.contains(token)
+
+
+class SQLiteTokenStore(TokenStore):
+    """Revoked tokens in a local SQLite file shared by every worker on the host
+    
+    User-wide revocations are not broadcast, so other workers drop cached
+    principals for a revoked user when those entries expire.
+    """
+    
+    backend = "sqlite"
+    
+    # Expired rows are deleted on every this many revocations
+    PURGE_EVERY = 100
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._adds = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+            "digest TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+    
+    def add(self, token: str, expires_in: int):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (digest, expires_at) VALUES (?, ?)",
+                (token_digest(token), now + expires_in)
+            )
+            self._adds += 1
+            if self._adds % self.PURGE_EVERY == 0:
+                connection.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+    
+    def contains(self, token: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM revoked_tokens WHERE digest = ? AND expires_at > ?",
+            (token_digest(token), time.time())
+        ).fetchone()
+        return row is not None
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared across threads, so each
+        # request thread opens its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+
+def create_token_store(on_user_revoked: Optional[Callable[[int], None]] = None) -> TokenStore:
+    """Build the token store selected by settings.token_store"""
+    if settings.token_store == "memory":
+        return MemoryTokenStore()
+    if settings.token_store == "sqlite":
+        return SQLiteTokenStore(settings.token_store_sqlite_path)
+    
+    import redis
+    from app.core.circuit_breaker import CircuitBreaker
+    from app.core.redis_token_store import RedisTokenStore
+    
+    # A dedicated client, so the store's tight timeouts never apply to the caches
+    client = redis.from_url(
+        settings.redis_url,
+        decode_responses=True,
+        socket_timeout=settings.token_store_timeout,
+        socket_connect_timeout=settings.token_store_timeout
+    )
+    return RedisTokenStore(
+        client,
+        breaker=CircuitBreaker(
+            "token store",
+            failure_threshold=settings.token_store_breaker_threshold,
+            reset_timeout=settings.token_store_breaker_reset,
+            exceptions=(redis.RedisError,)
+        ),
+        capacity=settings.blacklist_filter_capacity,
+        error_rate=settings.blacklist_filter_error_rate,
+        reload_interval=settings.blacklist_filter_reload_interval,
+        enabled=settings.blacklist_filter_enabled,
+        on_user_revoked=on_user_revoked
+    )
\ No newline at end of file
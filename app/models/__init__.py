@@ -1,4 +1,6 @@
 from app.models.user import User
 from app.models.calculation import Calculation
+from app.models.user_calc_stats import UserCalcStats
+from app.models.calc_time_bucket import CalcTimeBucket
 
-__all__ = ["User", "Calculation"]
\ No newline at end of file
+__all__ = ["User", "Calculation", "UserCalcStats", "CalcTimeBucket"]
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from app.core.database import Base
+
+
+class CalcTimeBucket(Base):
+    """Calculation counts and result sums per user, operation and time bucket
+    
+    Recent activity is kept in hourly buckets; compaction folds hours older
+    than the retention window into daily buckets.
+    """
+    
+    __tablename__ = "calc_time_buckets"
+    
+    # Leading with user, granularity and bucket start lets range reads walk the primary key
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    operation = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    result_sum = Column(Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return (
+            f"<CalcTimeBucket(user_id={self.user_id}, granularity='{self.granularity}', "
+            f"bucket_start={self.bucket_start}, operation='{self.operation}', count={self.count})>"
+        )
\ No newline at end of file
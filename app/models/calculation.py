@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -8,6 +8,10 @@ class Calculation(Base):
     """Calculation model for storing calculation history"""
     
     __tablename__ = "calculations"
+    __table_args__ = (
+        # Serves newest-first listing and keyset pagination per user
+        Index("ix_calculations_user_created_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from app.core.database import Base
+
+
+class UserCalcStats(Base):
+    """Per-user, per-operation rollup of calculation counts and result sums"""
+    
+    __tablename__ = "user_calc_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    operation = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    result_sum = Column(Float, nullable=False, default=0.0)
+    latest_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<UserCalcStats(user_id={self.user_id}, operation='{self.operation}', count={self.count})>"
\ No newline at end of file
@@ -2,5 +2,11 @@ from app.routes.auth import router as auth_router
 from app.routes.users import router as users_router
 from app.routes.calculations import router as calculations_router
 from app.routes.analytics import router as analytics_router
+from app.routes.async_auth import router as async_auth_router
+from app.routes.async_calculations import router as async_calculations_router
+from app.routes.async_analytics import router as async_analytics_router
 
-__all__ = ["auth_router", "users_router", "calculations_router", "analytics_router"]
\ No newline at end of file
+__all__ = [
+    "auth_router", "users_router", "calculations_router", "analytics_router",
+    "async_auth_router", "async_calculations_router", "async_analytics_router"
+]
\ No newline at end of file
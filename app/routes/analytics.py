@@ -1,25 +1,236 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Literal, Optional
+from datetime import datetime, timedelta
+from itertools import islice
+import asyncio
+import csv
+import io
+import json
+import redis
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
-from app.schemas.analytics import AnalyticsSummary
-from app.schemas.calculation import CalculationResponse
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
+from app.core.security import get_current_principal
+from app.schemas.analytics import AnalyticsSummary, TimeSeries
 from app.services.analytics import AnalyticsService
+from app.services.calculations import CalculationService, RESPONSE_COLUMNS
+from app.services.conditional import check_not_modified
+from app.services.live_events import event_hub
+from app.services.pagination import next_cursor
+from app.services.summary_cache import summary_cache
+from app.services.timeseries import TimeSeriesService, parse_bucket, to_utc_naive
 
 router = APIRouter(prefix="/analytics", tags=["Analytics & History"])
 
+# Field names written by history exports, matching AnalyticsService.iter_history_rows
+EXPORT_FIELDS = ["id", "operation", "operand1", "operand2", "result", "created_at"]
 
-@router.get("/summary", response_model=AnalyticsSummary)
+# Rows encoded per chunk sent to the client
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _export_values(row: tuple) -> list:
+    """Convert an exported row to JSON/CSV friendly values"""
+    values = list(row)
+    values[-1] = values[-1].isoformat() if values[-1] else None
+    return values
+
+
+def _encode_csv(rows: List[tuple]) -> str:
+    """Encode rows as CSV lines"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_export_values(row) for row in rows)
+    return buffer.getvalue()
+
+
+def _encode_ndjson(rows: List[tuple]) -> str:
+    """Encode rows as newline-delimited JSON objects"""
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, _export_values(row)))) + "\n"
+        for row in rows
+    )
+
+
+def _stream_export(
+    db: Session,
+    rows: Iterator[tuple],
+    encode: Callable[[List[tuple]], str],
+    header: Optional[str] = None
+) -> Iterator[str]:
+    """Yield encoded chunks of rows, closing the session once the stream ends"""
+    try:
+        if header:
+            yield header
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_ROWS))
+            if not chunk:
+                break
+            yield encode(chunk)
+    finally:
+        # The request's session is reopened by the stream, so release it here
+        db.close()
+
+
+def _sse(event_type: str, data: dict) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _event_stream(queue: asyncio.Queue) -> AsyncIterator[str]:
+    """Relay a subscriber's queued events as Server-Sent Events
+    
+    "ready" is sent once the subscription is live, so a client that loads
+    its snapshot after it misses nothing. The stream ends when the hub loses
+    Redis, and the client reconnects.
+    """
+    yield _sse("ready", {})
+    while True:
+        try:
+            events = await asyncio.wait_for(queue.get(), settings.live_events_keepalive)
+        except asyncio.TimeoutError:
+            # A comment line keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            continue
+        if events is None:
+            return
+        for event in events:
+            yield _sse(event["type"], event)
+
+
+async def _event_response(user_id: int) -> StreamingResponse:
+    """Stream a user's live events, or refuse so the client falls back to polling"""
+    if not settings.live_events_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Live updates are disabled"
+        )
+    try:
+        queue = await event_hub.subscribe(user_id)
+    except (redis.RedisError, OSError, asyncio.TimeoutError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live updates are unavailable",
+            headers={"Retry-After": "5"}
+        )
+    
+    return StreamingResponse(
+        _event_stream(queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs however the stream ends, including a client disconnect
+        background=BackgroundTask(event_hub.unsubscribe, user_id, queue)
+    )
+
+
+def _timeseries_range(start: Optional[datetime], end: Optional[datetime]):
+    """Fill in the default time-series range of the last 30 days"""
+    end = to_utc_naive(end) if end else datetime.utcnow()
+    start = to_utc_naive(start) if start else end - timedelta(days=30)
+    return start, end
+
+
+def _history_response(
+    rows: list,
+    total: Optional[int],
+    has_more: bool,
+    limit: int,
+    offset: int,
+    include_total: bool,
+    estimate_total: bool,
+    headers: Dict[str, str]
+) -> ORJSONResponse:
+    """Build the history page response from RESPONSE_COLUMNS rows
+    
+    The rows come straight from the database, so they are encoded with orjson
+    as they are instead of being validated into CalculationResponse models and
+    serialized a second time through the response model.
+    """
+    
+    return ORJSONResponse({
+        "items": CalculationService.response_items(rows),
+        "total": total,
+        "total_estimated": include_total and estimate_total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": has_more,
+        "next_cursor": next_cursor(rows, has_more)
+    }, headers=headers)
+
+
+def _total_mode(include_total: bool, estimate_total: bool) -> str:
+    """Map the history total flags to AnalyticsService's total_mode"""
+    return ("estimated" if estimate_total else "exact") if include_total else "none"
+
+
+def _export_format(format: str):
+    """Return the encoder, header and media type for an export format"""
+    if format == "csv":
+        return _encode_csv, ",".join(EXPORT_FIELDS) + "\r\n", "text/csv"
+    return _encode_ndjson, None, "application/x-ndjson"
+
+
+def _export_headers(format: str) -> dict:
+    """Headers that make browsers save an export as a file"""
+    return {"Content-Disposition": f'attachment; filename="calculations.{format}"'}
+
+
+@router.get("/summary", response_model=AnalyticsSummary, dependencies=[Depends(RateLimit("analytics:summary"))])
 def get_analytics_summary(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get analytics summary for current user"""
     
-    return AnalyticsService.get_user_statistics(db, current_user.id)
+    response.headers.update(check_not_modified(current_user.id, "summary", if_none_match))
+    
+    return summary_cache.get(
+        current_user.id,
+        lambda: AnalyticsService.get_user_statistics(db, current_user.id)
+    )
+
+
+@router.get("/events")
+async def stream_live_events(current_user: Principal = Depends(get_current_principal)):
+    """Stream calculation events and summary deltas for current user as Server-Sent Events"""
+    return await _event_response(current_user.id)
+
+
+@router.get("/timeseries", response_model=TimeSeries)
+def get_calculation_timeseries(
+    start: Optional[datetime] = Query(None, description="Range start (default: 30 days before end)"),
+    end: Optional[datetime] = Query(None, description="Range end, exclusive (default: now)"),
+    bucket: str = Query("1d", description="Bucket size in hours or days, such as 1h, 6h, 1d or 7d"),
+    operation: Optional[str] = Query(None, description="Filter by operation type"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Get calculation counts and average results per time bucket"""
+    
+    start, end = _timeseries_range(start, end)
+    
+    try:
+        points = TimeSeriesService.get_series(
+            db=db,
+            user_id=current_user.id,
+            start=start,
+            end=end,
+            bucket=parse_bucket(bucket),
+            operation=operation,
+            max_points=settings.timeseries_max_points
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return TimeSeries(start=start, end=end, bucket=bucket, points=points)
 
 
 @router.get("/history", response_model=dict)
@@ -29,47 +240,70 @@ def get_calculation_history(
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
     limit: int = Query(10, ge=1, le=100, description="Number of results per page"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor; overrides offset"),
+    include_total: bool = Query(True, description="Include the total number of matching rows"),
+    estimate_total: bool = Query(False, description="Return a cached or planner-estimated total instead of an exact count"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get filtered calculation history with pagination"""
     
-    calculations, total = AnalyticsService.get_calculation_history(
+    headers = check_not_modified(current_user.id, "history", if_none_match)
+    
+    try:
+        rows, total, has_more = AnalyticsService.get_history_page(
+            db=db,
+            user_id=current_user.id,
+            operation=operation,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            total_mode=_total_mode(include_total, estimate_total),
+            columns=RESPONSE_COLUMNS
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _history_response(rows, total, has_more, limit, offset, include_total, estimate_total, headers)
+
+
+@router.get("/history/export")
+def export_calculation_history(
+    format: Literal["csv", "ndjson"] = Query("csv", description="Export format"),
+    operation: Optional[str] = Query(None, description="Filter by operation type"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Stream the full filtered calculation history as CSV or NDJSON"""
+    
+    rows = AnalyticsService.iter_history_rows(
         db=db,
         user_id=current_user.id,
         operation=operation,
         start_date=start_date,
-        end_date=end_date,
-        limit=limit,
-        offset=offset
+        end_date=end_date
     )
     
-    # Convert to response format
-    calc_responses = [
-        CalculationResponse(
-            id=calc.id,
-            user_id=calc.user_id,
-            operation=calc.operation,
-            operand1=calc.operand1,
-            operand2=calc.operand2,
-            result=calc.result,
-            created_at=calc.created_at
-        )
-        for calc in calculations
-    ]
+    encode, header, media_type = _export_format(format)
     
-    return {
-        "items": calc_responses,
-        "total": total,
-        "limit": limit,
-        "offset": offset,
-        "has_more": (offset + limit) < total
-    }
+    return StreamingResponse(
+        _stream_export(db, rows, encode, header),
+        media_type=media_type,
+        headers=_export_headers(format)
+    )
 
 
 @router.delete("/history", status_code=200)
 def clear_calculation_history(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Clear all calculation history for current user"""
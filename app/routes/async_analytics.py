@@ -0,0 +1,197 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from anyio import from_thread
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Callable, List, Literal, Optional
+from datetime import datetime
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
+from app.core.security import get_current_principal_async
+from app.models.calculation import Calculation
+from app.routes.analytics import (
+    EXPORT_CHUNK_ROWS,
+    _event_response,
+    _export_format,
+    _export_headers,
+    _history_response,
+    _timeseries_range,
+    _total_mode
+)
+from app.schemas.analytics import AnalyticsSummary, TimeSeries
+from app.services.analytics import AnalyticsService, EXPORT_COLUMNS
+from app.services.calculations import RESPONSE_COLUMNS
+from app.services.conditional import check_not_modified
+from app.services.summary_cache import summary_cache
+from app.services.timeseries import TimeSeriesService, parse_bucket
+
+# Async twin of app.routes.analytics, served when settings.async_database is on
+router = APIRouter(prefix="/analytics", tags=["Analytics & History"])
+
+
+async def _stream_export(
+    db: AsyncSession,
+    statement: Select,
+    encode: Callable[[List[tuple]], str],
+    header: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Yield encoded chunks of streamed rows, closing the session once the stream ends"""
+    try:
+        if header:
+            yield header
+        # The request's session is closed before the body is sent, so the
+        # query only starts once the response begins streaming
+        result = await db.stream(statement.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions(EXPORT_CHUNK_ROWS):
+            yield encode(rows)
+    finally:
+        await db.close()
+
+
+@router.get("/summary", response_model=AnalyticsSummary, dependencies=[Depends(RateLimit("analytics:summary"))])
+async def get_analytics_summary(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get analytics summary for current user"""
+    
+    response.headers.update(
+        await run_in_threadpool(check_not_modified, current_user.id, "summary", if_none_match)
+    )
+    
+    # The cache's Redis client is synchronous, so it runs in a worker thread;
+    # on a miss that thread hands the rollup query back to the event loop
+    def compute():
+        return from_thread.run(db.run_sync, AnalyticsService.get_user_statistics, current_user.id)
+    
+    return await run_in_threadpool(summary_cache.get, current_user.id, compute)
+
+
+@router.get("/events")
+async def stream_live_events(current_user: Principal = Depends(get_current_principal_async)):
+    """Stream calculation events and summary deltas for current user as Server-Sent Events"""
+    return await _event_response(current_user.id)
+
+
+@router.get("/timeseries", response_model=TimeSeries)
+async def get_calculation_timeseries(
+    start: Optional[datetime] = Query(None, description="Range start (default: 30 days before end)"),
+    end: Optional[datetime] = Query(None, description="Range end, exclusive (default: now)"),
+    bucket: str = Query("1d", description="Bucket size in hours or days, such as 1h, 6h, 1d or 7d"),
+    operation: Optional[str] = Query(None, description="Filter by operation type"),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get calculation counts and average results per time bucket"""
+    
+    start, end = _timeseries_range(start, end)
+    
+    try:
+        points = await db.run_sync(
+            TimeSeriesService.get_series,
+            user_id=current_user.id,
+            start=start,
+            end=end,
+            bucket=parse_bucket(bucket),
+            operation=operation,
+            max_points=settings.timeseries_max_points
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return TimeSeries(start=start, end=end, bucket=bucket, points=points)
+
+
+@router.get("/history", response_model=dict)
+async def get_calculation_history(
+    operation: Optional[str] = Query(None, description="Filter by operation type"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    limit: int = Query(10, ge=1, le=100, description="Number of results per page"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor; overrides offset"),
+    include_total: bool = Query(True, description="Include the total number of matching rows"),
+    estimate_total: bool = Query(False, description="Return a cached or planner-estimated total instead of an exact count"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get filtered calculation history with pagination"""
+    
+    headers = await run_in_threadpool(check_not_modified, current_user.id, "history", if_none_match)
+    
+    try:
+        rows, total, has_more = await db.run_sync(
+            AnalyticsService.get_history_page,
+            user_id=current_user.id,
+            operation=operation,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            total_mode=_total_mode(include_total, estimate_total),
+            columns=RESPONSE_COLUMNS
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _history_response(rows, total, has_more, limit, offset, include_total, estimate_total, headers)
+
+
+@router.get("/history/export")
+async def export_calculation_history(
+    format: Literal["csv", "ndjson"] = Query("csv", description="Export format"),
+    operation: Optional[str] = Query(None, description="Filter by operation type"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date"),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream the full filtered history as CSV or NDJSON"""
+    
+    # Building the ORM query does no I/O, so the sync session only supplies the statement
+    statement = AnalyticsService.filter_calculations(
+        db.sync_session,
+        current_user.id,
+        operation,
+        start_date,
+        end_date,
+        columns=EXPORT_COLUMNS
+    ).order_by(
+        Calculation.created_at.asc(),
+        Calculation.id.asc()
+    ).statement
+    encode, header, media_type = _export_format(format)
+    
+    return StreamingResponse(
+        _stream_export(db, statement, encode, header),
+        media_type=media_type,
+        headers=_export_headers(format)
+    )
+
+
+@router.delete("/history", status_code=200)
+async def clear_calculation_history(
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Clear all calculation history for current user"""
+    
+    deleted_count = await db.run_sync(AnalyticsService.delete_calculation_history, current_user.id)
+    
+    return {
+        "message": "Calculation history cleared successfully",
+        "deleted_count": deleted_count
+    }
\ No newline at end of file
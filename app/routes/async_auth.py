@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timedelta
+from app.core.database import get_async_db
+from app.core.security import (
+    verify_and_update_password_async,
+    get_password_hash_async,
+    create_access_token,
+    get_current_user_async,
+    get_current_principal_async,
+    blacklist_token,
+    revoke_user_tokens,
+    oauth2_scheme
+)
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
+from app.models.user import User
+from app.schemas.user import UserCreate, UserResponse, Token
+
+# Async twin of app.routes.auth, served when settings.async_database is on
+router = APIRouter(prefix="/auth", tags=["Authentication"])
+
+
+async def _find_user(db: AsyncSession, *criteria) -> User:
+    """Return the first user matching the criteria, if any"""
+    return (await db.execute(select(User).where(*criteria))).scalars().first()
+
+
+@router.post(
+    "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("auth:register"))]
+)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Register a new user"""
+    
+    # Check if username already exists
+    if await _find_user(db, User.username == user_data.username):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    
+    # Check if email already exists
+    if await _find_user(db, User.email == user_data.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    new_user = User(
+        username=user_data.username,
+        email=user_data.email,
+        hashed_password=await get_password_hash_async(user_data.password)
+    )
+    
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    
+    return new_user
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(RateLimit("auth:login"))])
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Login and get access token"""
+    
+    user = await _find_user(db, User.username == form_data.username)
+    
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Legacy SHA-256 hashes and outdated bcrypt costs are upgraded transparently
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data={"sub": user.username},
+        expires_delta=access_token_expires,
+        token_version=user.token_version
+    )
+    
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    """Logout by blacklisting the current token"""
+    
+    await run_in_threadpool(blacklist_token, token)
+    
+    return {"message": "Successfully logged out"}
+
+
+@router.post("/logout-all", status_code=status.HTTP_200_OK)
+async def logout_all(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Logout every session by revoking all of the user's tokens"""
+    
+    revoke_user_tokens(current_user)
+    await db.commit()
+    
+    return {"message": "Successfully logged out of all sessions"}
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user_info(current_user: User = Depends(get_current_user_async)):
+    """Get current user information"""
+    return current_user
\ No newline at end of file
@@ -0,0 +1,262 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
+from app.core.security import get_current_principal_async
+from app.models.calculation import Calculation
+from app.routes.calculations import (
+    _apply_update,
+    _calculation_result,
+    _calculation_row,
+    _evaluate,
+    _idempotency_error,
+    _import_format,
+    _page,
+    _paginate,
+    _serve_channel,
+    _submit_buffered
+)
+from app.schemas.calculation import (
+    CalculationCreate,
+    CalculationResponse,
+    CalculationResult,
+    CalculationUpdate,
+    CalculationBatchCreate,
+    CalculationBatchResult,
+    CalculationImportResult
+)
+from app.services.calculations import CalculationService, RESPONSE_COLUMNS
+from app.services.conditional import check_not_modified
+from app.services.idempotency import (
+    IdempotencyKeyInFlight,
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    idempotency_store
+)
+from app.services.importer import CalculationImporter, iter_lines
+
+# Async twin of app.routes.calculations, served when settings.async_database is on
+router = APIRouter(prefix="/calculations", tags=["Calculations"])
+
+
+async def _get_own_calculation(db: AsyncSession, calculation_id: int, user_id: int) -> Calculation:
+    """Load one of the user's calculations or answer 404"""
+    calculation = (await db.execute(
+        select(Calculation).where(
+            Calculation.id == calculation_id,
+            Calculation.user_id == user_id
+        )
+    )).scalar_one_or_none()
+    
+    if not calculation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calculation not found"
+        )
+    
+    return calculation
+
+
+async def _create_calculation(
+    calc_data: CalculationCreate, user_id: int, db: AsyncSession, queue: bool = True
+) -> CalculationResult:
+    """Evaluate a calculation and save it, or queue it when buffering unless queue is False"""
+    result = _evaluate(calc_data.operation, calc_data.operand1, calc_data.operand2)
+    row = _calculation_row(calc_data, user_id, result)
+    
+    if queue and settings.calculation_persistence == "buffered":
+        # A full buffer makes submit wait briefly, so keep that wait off the event loop
+        await run_in_threadpool(_submit_buffered, row)
+        message = "Calculation completed and queued for saving"
+    else:
+        db.add(Calculation(**row))
+        await db.commit()
+        message = "Calculation completed and saved successfully"
+    
+    return _calculation_result(calc_data, result, message)
+
+
+@router.post(
+    "/", response_model=CalculationResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:create"))]
+)
+async def create_calculation(
+    calc_data: CalculationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create and perform a new calculation (Browse + Add)"""
+    if idempotency_key is None:
+        return await _create_calculation(calc_data, current_user.id, db)
+    
+    async def create() -> dict:
+        # Saved now, not queued, as the replayed response vouches for the row
+        return (await _create_calculation(calc_data, current_user.id, db, queue=False)).model_dump(mode="json")
+    
+    try:
+        body, replayed = await idempotency_store.run_async(
+            f"calculations:{current_user.id}",
+            idempotency_key,
+            IdempotencyStore.fingerprint(calc_data),
+            create
+        )
+    except (IdempotencyKeyReused, IdempotencyKeyInFlight) as e:
+        raise _idempotency_error(e)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
+@router.post(
+    "/batch", response_model=CalculationBatchResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:batch"))]
+)
+async def create_calculations_batch(
+    batch: CalculationBatchCreate,
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Perform a batch of calculations and save them in a single transaction"""
+    
+    results, rows = CalculationService.evaluate_batch(batch.items, current_user.id)
+    succeeded = await db.run_sync(CalculationService.bulk_create, rows)
+    
+    return CalculationBatchResult(
+        total=len(batch.items),
+        succeeded=succeeded,
+        failed=len(batch.items) - succeeded,
+        results=results
+    )
+
+
+@router.post(
+    "/import", response_model=CalculationImportResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:import"))]
+)
+async def import_calculations(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Upload format; inferred from Content-Type when omitted"
+    ),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import calculations from a streamed CSV or NDJSON upload"""
+    
+    importer = CalculationImporter(
+        db.sync_session,
+        current_user.id,
+        _import_format(request, format),
+        max_line_bytes=settings.import_max_line_bytes,
+        max_reported_errors=settings.import_max_reported_errors
+    )
+    
+    def process(session, lines):
+        importer.process(lines)
+    
+    pending = []
+    async for numbered_line in iter_lines(request.stream(), settings.import_max_line_bytes):
+        pending.append(numbered_line)
+        if len(pending) >= settings.import_chunk_size:
+            await db.run_sync(process, pending)
+            pending = []
+    
+    if pending:
+        await db.run_sync(process, pending)
+    
+    return importer.summary()
+
+
+@router.websocket("/ws")
+async def calculation_channel(websocket: WebSocket, db: AsyncSession = Depends(get_async_db)):
+    """Perform pipelined calculations over one connection, authenticated once"""
+    
+    async def authenticate(token: str) -> Principal:
+        try:
+            return await get_current_principal_async(token, db)
+        finally:
+            # Return the connection of a user lookup to the pool between batches
+            await db.close()
+    
+    await _serve_channel(
+        websocket,
+        authenticate,
+        lambda rows: db.run_sync(CalculationService.bulk_create, rows)
+    )
+
+
+@router.get("/", response_model=List[CalculationResponse])
+async def get_all_calculations(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from a previous X-Next-Cursor header; overrides skip"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all calculations for current user (Browse)"""
+    
+    headers = await run_in_threadpool(check_not_modified, current_user.id, "calculations", if_none_match)
+    
+    query = _paginate(
+        select(*RESPONSE_COLUMNS).where(Calculation.user_id == current_user.id),
+        skip, limit, cursor
+    )
+    
+    return _page((await db.execute(query)).all(), limit, headers)
+
+
+@router.get("/{calculation_id}", response_model=CalculationResponse)
+async def get_calculation(
+    calculation_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific calculation by ID (Read)"""
+    response.headers.update(
+        await run_in_threadpool(check_not_modified, current_user.id, f"calculation:{calculation_id}", if_none_match)
+    )
+    return await _get_own_calculation(db, calculation_id, current_user.id)
+
+
+@router.put("/{calculation_id}", response_model=CalculationResponse)
+async def update_calculation(
+    calculation_id: int,
+    calc_data: CalculationUpdate,
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update a calculation (Edit)"""
+    
+    calculation = await _get_own_calculation(db, calculation_id, current_user.id)
+    _apply_update(calculation, calc_data)
+    
+    await db.commit()
+    await db.refresh(calculation)
+    
+    return calculation
+
+
+@router.delete("/{calculation_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_calculation(
+    calculation_id: int,
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a calculation (Delete)"""
+    
+    calculation = await _get_own_calculation(db, calculation_id, current_user.id)
+    
+    await db.delete(calculation)
+    await db.commit()
+    
+    return None
\ No newline at end of file
@@ -4,21 +4,28 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.core.database import get_db
 from app.core.security import (
-    verify_password,
+    verify_and_update_password,
     get_password_hash,
     create_access_token,
     get_current_user,
+    get_current_principal,
     blacklist_token,
+    revoke_user_tokens,
     oauth2_scheme
 )
 from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("auth:register"))]
+)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     
@@ -50,7 +57,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(RateLimit("auth:login"))])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
@@ -59,16 +66,27 @@ def login(
     
     user = db.query(User).filter(User.username == form_data.username).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = verify_and_update_password(form_data.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Legacy SHA-256 hashes and outdated bcrypt costs are upgraded transparently
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username},
+        expires_delta=access_token_expires,
+        token_version=user.token_version
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -77,7 +95,7 @@ def login(
 @router.post("/logout", status_code=status.HTTP_200_OK)
 def logout(
     token: str = Depends(oauth2_scheme),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Logout by blacklisting the current token"""
     
@@ -86,6 +104,19 @@ def logout(
     return {"message": "Successfully logged out"}
 
 
+@router.post("/logout-all", status_code=status.HTTP_200_OK)
+def logout_all(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Logout every session by revoking all of the user's tokens"""
+    
+    revoke_user_tokens(current_user)
+    db.commit()
+    
+    return {"message": "Successfully logged out of all sessions"}
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
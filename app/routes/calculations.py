@@ -1,91 +1,342 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
+from datetime import datetime
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.principal_cache import Principal
+from app.core.rate_limit import RateLimit
+from app.core.security import get_current_principal
 from app.models.calculation import Calculation
 from app.schemas.calculation import (
     CalculationCreate,
     CalculationResponse,
     CalculationResult,
-    CalculationUpdate
+    CalculationUpdate,
+    CalculationBatchCreate,
+    CalculationBatchResult,
+    CalculationImportResult
 )
 from app.services.calculator import CalculatorService
+from app.services.calculation_channel import CalculationChannel
+from app.services.calculations import CalculationService, RESPONSE_COLUMNS
+from app.services.conditional import check_not_modified
+from app.services.idempotency import (
+    IdempotencyKeyInFlight,
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    idempotency_store
+)
+from app.services.pagination import keyset_paginate, next_cursor
+from app.services.write_buffer import write_buffer, WriteBufferFull
+from app.services.importer import CalculationImporter, iter_lines
 
 router = APIRouter(prefix="/calculations", tags=["Calculations"])
 
 
-@router.post("/", response_model=CalculationResult, status_code=status.HTTP_201_CREATED)
+def _evaluate(operation: str, operand1: float, operand2: float) -> float:
+    """Perform a calculation, turning calculator errors into 400 responses"""
+    try:
+        return CalculatorService.calculate(operation, operand1, operand2)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _calculation_row(calc_data: CalculationCreate, user_id: int, result: float) -> dict:
+    """Build the row saved for a new calculation"""
+    return {
+        "user_id": user_id,
+        "operation": calc_data.operation,
+        "operand1": calc_data.operand1,
+        "operand2": calc_data.operand2,
+        "result": result,
+        "created_at": datetime.utcnow()
+    }
+
+
+def _submit_buffered(row: dict):
+    """Queue a row for write-behind persistence, or answer 503 when the buffer is full"""
+    try:
+        write_buffer.submit(row)
+    except WriteBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many calculations are waiting to be saved, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+
+def _calculation_result(calc_data: CalculationCreate, result: float, message: str) -> CalculationResult:
+    """Build the response for a new calculation"""
+    return CalculationResult(
+        operation=calc_data.operation,
+        operand1=calc_data.operand1,
+        operand2=calc_data.operand2,
+        result=result,
+        message=message
+    )
+
+
+def _create_calculation(
+    calc_data: CalculationCreate, user_id: int, db: Session, queue: bool = True
+) -> CalculationResult:
+    """Evaluate a calculation and save it, or queue it when buffering unless queue is False"""
+    result = _evaluate(calc_data.operation, calc_data.operand1, calc_data.operand2)
+    row = _calculation_row(calc_data, user_id, result)
+    
+    if queue and settings.calculation_persistence == "buffered":
+        # Write-behind: the background flusher saves the row in a later bulk insert
+        _submit_buffered(row)
+        message = "Calculation completed and queued for saving"
+    else:
+        # Save to database; the response carries no generated columns, so no refresh is needed
+        db.add(Calculation(**row))
+        db.commit()
+        message = "Calculation completed and saved successfully"
+    
+    return _calculation_result(calc_data, result, message)
+
+
+def _idempotency_error(error: Exception) -> HTTPException:
+    """Response for an Idempotency-Key that cannot be honoured"""
+    if isinstance(error, IdempotencyKeyReused):
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still being processed",
+        headers={"Retry-After": "1"}
+    )
+
+
+@router.post(
+    "/", response_model=CalculationResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:create"))]
+)
 def create_calculation(
     calc_data: CalculationCreate,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Create and perform a new calculation (Browse + Add)"""
+    """Create and perform a new calculation (Browse + Add)
+    
+    Retries sent with the same Idempotency-Key header get the first response
+    back instead of creating the calculation again.
+    """
+    if idempotency_key is None:
+        return _create_calculation(calc_data, current_user.id, db)
     
     try:
-        # Perform calculation
-        result = CalculatorService.calculate(
-            calc_data.operation,
-            calc_data.operand1,
-            calc_data.operand2
-        )
-        
-        # Save to database
-        calculation = Calculation(
-            user_id=current_user.id,
-            operation=calc_data.operation,
-            operand1=calc_data.operand1,
-            operand2=calc_data.operand2,
-            result=result
+        body, replayed = idempotency_store.run(
+            f"calculations:{current_user.id}",
+            idempotency_key,
+            IdempotencyStore.fingerprint(calc_data),
+            # The stored response is replayed as proof the row exists, so it
+            # is saved now rather than queued where it could still be dropped
+            lambda: _create_calculation(calc_data, current_user.id, db, queue=False).model_dump(mode="json")
         )
-        
-        db.add(calculation)
-        db.commit()
-        db.refresh(calculation)
-        
-        return CalculationResult(
-            operation=calc_data.operation,
-            operand1=calc_data.operand1,
-            operand2=calc_data.operand2,
-            result=result,
-            message="Calculation completed and saved successfully"
-        )
-        
+    except (IdempotencyKeyReused, IdempotencyKeyInFlight) as e:
+        raise _idempotency_error(e)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
+@router.post(
+    "/batch", response_model=CalculationBatchResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:batch"))]
+)
+def create_calculations_batch(
+    batch: CalculationBatchCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Perform a batch of calculations and save them in a single transaction"""
+    
+    results, rows = CalculationService.evaluate_batch(batch.items, current_user.id)
+    
+    # Save every successful item with one multi-row INSERT
+    succeeded = CalculationService.bulk_create(db, rows)
+    
+    return CalculationBatchResult(
+        total=len(batch.items),
+        succeeded=succeeded,
+        failed=len(batch.items) - succeeded,
+        results=results
+    )
+
+
+def _import_format(request: Request, format: Optional[str]) -> str:
+    """Use the requested import format, or infer it from the Content-Type"""
+    if format is not None:
+        return format
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "text/csv":
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send text/csv or application/x-ndjson, or pass the format parameter"
+    )
+
+
+@router.post(
+    "/import", response_model=CalculationImportResult, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("calculations:import"))]
+)
+async def import_calculations(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Upload format; inferred from Content-Type when omitted"
+    ),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Import calculations from a streamed CSV or NDJSON upload
+    
+    CSV uploads need a header row naming operation, operand1, operand2 and
+    optionally created_at; NDJSON uploads carry one object per line. Results
+    are recomputed and rows are inserted import_chunk_size at a time, each
+    chunk in its own transaction.
+    """
+    
+    importer = CalculationImporter(
+        db,
+        current_user.id,
+        _import_format(request, format),
+        max_line_bytes=settings.import_max_line_bytes,
+        max_reported_errors=settings.import_max_reported_errors
+    )
+    
+    # Parse the body as it arrives and hand full chunks to a worker thread
+    pending = []
+    async for numbered_line in iter_lines(request.stream(), settings.import_max_line_bytes):
+        pending.append(numbered_line)
+        if len(pending) >= settings.import_chunk_size:
+            await run_in_threadpool(importer.process, pending)
+            pending = []
+    
+    if pending:
+        await run_in_threadpool(importer.process, pending)
+    
+    return importer.summary()
+
+
+def _paginate(query, skip: int, limit: int, cursor: Optional[str]):
+    """Apply keyset or offset pagination, peeking one row past the page"""
+    try:
+        # The extra row tells whether another page follows
+        query = keyset_paginate(query, cursor, limit + 1)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    
+    if not cursor:
+        query = query.offset(skip)
+    return query
+
+
+def _page(rows: list, limit: int, headers: Dict[str, str]) -> ORJSONResponse:
+    """Encode a page of RESPONSE_COLUMNS rows, advertising the next page's cursor
+    
+    Rows are encoded with orjson as they come from the database instead of
+    being validated and serialized through the response model.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    response = ORJSONResponse(CalculationService.response_items(rows), headers=headers)
+    cursor_for_next_page = next_cursor(rows, has_more)
+    if cursor_for_next_page:
+        response.headers["X-Next-Cursor"] = cursor_for_next_page
+    
+    return response
+
+
+async def _serve_channel(
+    websocket: WebSocket,
+    authenticate: Callable[[str], Awaitable[Principal]],
+    save: Callable[[List[dict]], Awaitable[int]]
+):
+    """Run a calculation channel with the configured batching and limits"""
+    await CalculationChannel(
+        websocket,
+        authenticate,
+        save,
+        batch_size=settings.calculation_channel_batch_size,
+        flush_interval=settings.calculation_channel_flush_interval,
+        max_in_flight=settings.calculation_channel_max_in_flight,
+        auth_timeout=settings.calculation_channel_auth_timeout,
+        revalidate_interval=settings.calculation_channel_revalidate_interval
+    ).serve()
+
+
+@router.websocket("/ws")
+async def calculation_channel(websocket: WebSocket, db: Session = Depends(get_db)):
+    """Perform pipelined calculations over one connection, authenticated once"""
+    
+    async def authenticate(token: str) -> Principal:
+        try:
+            return await get_current_principal(token, db)
+        finally:
+            # Return the connection of a user lookup to the pool between batches
+            await run_in_threadpool(db.close)
+    
+    await _serve_channel(
+        websocket,
+        authenticate,
+        lambda rows: run_in_threadpool(CalculationService.bulk_create, db, rows)
+    )
 
 
 @router.get("/", response_model=List[CalculationResponse])
 def get_all_calculations(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous X-Next-Cursor header; overrides skip"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get all calculations for current user (Browse)"""
+    """Get all calculations for current user (Browse)
     
-    calculations = db.query(Calculation).filter(
-        Calculation.user_id == current_user.id
-    ).order_by(
-        Calculation.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    The cursor for the following page is returned in the X-Next-Cursor header.
+    """
     
-    return calculations
+    headers = check_not_modified(current_user.id, "calculations", if_none_match)
+    
+    query = _paginate(
+        db.query(*RESPONSE_COLUMNS).filter(Calculation.user_id == current_user.id),
+        skip, limit, cursor
+    )
+    return _page(query.all(), limit, headers)
 
 
 @router.get("/{calculation_id}", response_model=CalculationResponse)
 def get_calculation(
     calculation_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get a specific calculation by ID (Read)"""
     
+    response.headers.update(check_not_modified(current_user.id, f"calculation:{calculation_id}", if_none_match))
+    
     calculation = db.query(Calculation).filter(
         Calculation.id == calculation_id,
         Calculation.user_id == current_user.id
@@ -100,11 +351,26 @@ def get_calculation(
     return calculation
 
 
+def _apply_update(calculation: Calculation, calc_data: CalculationUpdate):
+    """Apply the provided fields and recalculate the result"""
+    
+    # Update fields if provided
+    if calc_data.operation:
+        calculation.operation = calc_data.operation
+    if calc_data.operand1 is not None:
+        calculation.operand1 = calc_data.operand1
+    if calc_data.operand2 is not None:
+        calculation.operand2 = calc_data.operand2
+    
+    # Recalculate result
+    calculation.result = _evaluate(calculation.operation, calculation.operand1, calculation.operand2)
+
+
 @router.put("/{calculation_id}", response_model=CalculationResponse)
 def update_calculation(
     calculation_id: int,
     calc_data: CalculationUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update a calculation (Edit)"""
@@ -120,26 +386,7 @@ def update_calculation(
             detail="Calculation not found"
         )
     
-    # Update fields if provided
-    if calc_data.operation:
-        calculation.operation = calc_data.operation
-    if calc_data.operand1 is not None:
-        calculation.operand1 = calc_data.operand1
-    if calc_data.operand2 is not None:
-        calculation.operand2 = calc_data.operand2
-    
-    # Recalculate result
-    try:
-        calculation.result = CalculatorService.calculate(
-            calculation.operation,
-            calculation.operand1,
-            calculation.operand2
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
+    _apply_update(calculation, calc_data)
     
     db.commit()
     db.refresh(calculation)
@@ -150,7 +397,7 @@ def update_calculation(
 @router.delete("/{calculation_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_calculation(
     calculation_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a calculation (Delete)"""
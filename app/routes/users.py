@@ -1,7 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from datetime import timedelta
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import get_current_user, get_password_hash, verify_password
+from app.core.security import (
+    get_current_user,
+    get_password_hash,
+    verify_password,
+    create_access_token,
+    revoke_user_tokens
+)
 from app.models.user import User
 from app.schemas.user import UserUpdate, UserResponse, PasswordChange
 
@@ -54,7 +62,7 @@ def change_password(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Change user password"""
+    """Change user password, signing out every other session"""
     
     # Verify current password
     if not verify_password(password_data.current_password, current_user.hashed_password):
@@ -63,11 +71,24 @@ def change_password(
             detail="Current password is incorrect"
         )
     
-    # Update password
+    # Update password and revoke every token issued with the old one
     current_user.hashed_password = get_password_hash(password_data.new_password)
+    revoke_user_tokens(current_user)
     db.commit()
+    db.refresh(current_user)
+    
+    # The caller's own token is revoked too, so hand back a replacement
+    access_token = create_access_token(
+        data={"sub": current_user.username},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
+        token_version=current_user.token_version
+    )
     
-    return {"message": "Password changed successfully"}
+    return {
+        "message": "Password changed successfully",
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
 
 
 @router.delete("/profile", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,9 +1,15 @@
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, PasswordChange, Token, TokenData
-from app.schemas.calculation import CalculationCreate, CalculationUpdate, CalculationResponse, CalculationResult
-from app.schemas.analytics import AnalyticsSummary, OperationStats, HistoryFilter
+from app.schemas.calculation import (
+    CalculationCreate, CalculationUpdate, CalculationResponse, CalculationResult,
+    CalculationBatchCreate, CalculationBatchItemResult, CalculationBatchResult,
+    CalculationImportRow, CalculationImportError, CalculationImportResult
+)
+from app.schemas.analytics import AnalyticsSummary, OperationStats, TimeSeriesPoint, TimeSeries, HistoryFilter
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "PasswordChange", "Token", "TokenData",
     "CalculationCreate", "CalculationUpdate", "CalculationResponse", "CalculationResult",
-    "AnalyticsSummary", "OperationStats", "HistoryFilter"
+    "CalculationBatchCreate", "CalculationBatchItemResult", "CalculationBatchResult",
+    "CalculationImportRow", "CalculationImportError", "CalculationImportResult",
+    "AnalyticsSummary", "OperationStats", "TimeSeriesPoint", "TimeSeries", "HistoryFilter"
 ]
\ No newline at end of file
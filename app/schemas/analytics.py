@@ -23,10 +23,27 @@ class AnalyticsSummary(BaseModel):
         from_attributes = True
 
 
+class TimeSeriesPoint(BaseModel):
+    """Calculation activity within one time bucket"""
+    bucket_start: datetime
+    count: int
+    average_result: Optional[float] = None
+    operations: Dict[str, int]
+
+
+class TimeSeries(BaseModel):
+    """Bucketed calculation activity over a time range"""
+    start: datetime
+    end: datetime
+    bucket: str
+    points: List[TimeSeriesPoint]
+
+
 class HistoryFilter(BaseModel):
     """Filters for calculation history"""
     operation: Optional[str] = None
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     limit: int = 10
-    offset: int = 0
\ No newline at end of file
+    offset: int = 0
+    cursor: Optional[str] = None
\ No newline at end of file
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional
+
+# Maximum number of items accepted by a single batch request
+MAX_BATCH_SIZE = 1000
 
 
 class CalculationBase(BaseModel):
@@ -49,4 +52,52 @@ class CalculationResult(BaseModel):
     operand1: float
     operand2: float
     result: float
-    message: str = "Calculation completed successfully"
\ No newline at end of file
+    message: str = "Calculation completed successfully"
+
+
+class CalculationImportRow(CalculationCreate):
+    """Schema for one row of a calculation import"""
+    created_at: Optional[datetime] = None
+
+
+class CalculationImportError(BaseModel):
+    """Schema for a rejected import row"""
+    line: int
+    error: str
+
+
+class CalculationImportResult(BaseModel):
+    """Schema for calculation import summary"""
+    accepted: int
+    rejected: int
+    errors: List[CalculationImportError]
+    errors_truncated: bool = False
+
+
+class CalculationBatchCreate(BaseModel):
+    """Schema for creating a batch of calculations"""
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Calculations to perform, each shaped like CalculationCreate"
+    )
+
+
+class CalculationBatchItemResult(BaseModel):
+    """Schema for the outcome of a single batch item"""
+    index: int
+    success: bool
+    operation: Optional[str] = None
+    operand1: Optional[float] = None
+    operand2: Optional[float] = None
+    result: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResult(BaseModel):
+    """Schema for batch calculation result"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[CalculationBatchItemResult]
\ No newline at end of file
@@ -1,4 +1,7 @@
 from app.services.calculator import CalculatorService
 from app.services.analytics import AnalyticsService
+from app.services.calculations import CalculationService
+from app.services.rollup import StatsRollupService
+from app.services.timeseries import TimeSeriesService
 
-__all__ = ["CalculatorService", "AnalyticsService"]
\ No newline at end of file
+__all__ = ["CalculatorService", "AnalyticsService", "CalculationService", "StatsRollupService", "TimeSeriesService"]
\ No newline at end of file
@@ -2,21 +2,39 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from app.models.calculation import Calculation
 from app.schemas.analytics import AnalyticsSummary, OperationStats
-from typing import List, Optional
+from app.services.live_events import record_cleared
+from app.services.pagination import keyset_paginate
+from app.services.rollup import StatsRollupService
+from app.services.summary_cache import mark_summary_stale
+from app.services.timeseries import TimeSeriesService
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache
+from typing import Iterator, List, Optional
 from datetime import datetime
 
+# Columns written by history exports, in output order
+EXPORT_COLUMNS = (
+    Calculation.id,
+    Calculation.operation,
+    Calculation.operand1,
+    Calculation.operand2,
+    Calculation.result,
+    Calculation.created_at
+)
+
+# Recently computed history totals, keyed by user and filters
+_history_count_cache = TTLCache(maxsize=10000, ttl=settings.history_count_cache_ttl)
+
 
 class AnalyticsService:
     """Service class for analytics and history operations"""
     
     @staticmethod
     def get_user_statistics(db: Session, user_id: int) -> AnalyticsSummary:
-        """Get analytics summary for a user"""
+        """Get analytics summary for a user from the per-operation rollup"""
         
-        # Get total calculations
-        total_calculations = db.query(Calculation).filter(
-            Calculation.user_id == user_id
-        ).count()
+        stats = [row for row in StatsRollupService.get_user_stats(db, user_id) if row.count > 0]
+        total_calculations = sum(row.count for row in stats)
         
         if total_calculations == 0:
             return AnalyticsSummary(
@@ -27,23 +45,13 @@ class AnalyticsService:
                 latest_calculation=None
             )
         
-        # Get operations breakdown
-        operations_data = db.query(
-            Calculation.operation,
-            func.count(Calculation.id).label("count")
-        ).filter(
-            Calculation.user_id == user_id
-        ).group_by(
-            Calculation.operation
-        ).all()
-        
         operations_breakdown = [
             OperationStats(
-                operation=op,
-                count=count,
-                percentage=round((count / total_calculations) * 100, 2)
+                operation=row.operation,
+                count=row.count,
+                percentage=round((row.count / total_calculations) * 100, 2)
             )
-            for op, count in operations_data
+            for row in stats
         ]
         
         # Sort by count descending
@@ -52,41 +60,34 @@ class AnalyticsService:
         # Get most used operation
         most_used_operation = operations_breakdown[0].operation if operations_breakdown else None
         
-        # Get average result
-        avg_result = db.query(
-            func.avg(Calculation.result)
-        ).filter(
-            Calculation.user_id == user_id
-        ).scalar()
-        
-        # Get latest calculation timestamp
-        latest_calc = db.query(Calculation).filter(
-            Calculation.user_id == user_id
-        ).order_by(desc(Calculation.created_at)).first()
-        
-        latest_calculation = latest_calc.created_at if latest_calc else None
+        # Average result and latest timestamp come straight from the per-operation totals
+        avg_result = sum(row.result_sum for row in stats) / total_calculations
+        latest_times = [row.latest_at for row in stats if row.latest_at is not None]
+        latest_calculation = max(latest_times) if latest_times else None
         
         return AnalyticsSummary(
             total_calculations=total_calculations,
             operations_breakdown=operations_breakdown,
             most_used_operation=most_used_operation,
-            average_result=round(avg_result, 4) if avg_result is not None else None,
+            average_result=round(avg_result, 4),
             latest_calculation=latest_calculation
         )
     
     @staticmethod
-    def get_calculation_history(
+    def filter_calculations(
         db: Session,
         user_id: int,
         operation: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        limit: int = 10,
-        offset: int = 0
-    ) -> tuple[List[Calculation], int]:
-        """Get filtered calculation history for a user"""
+        columns: Optional[tuple] = None
+    ):
+        """Build a query for a user's calculations with the history filters applied
         
-        query = db.query(Calculation).filter(Calculation.user_id == user_id)
+        Pass columns to select plain column tuples instead of Calculation objects.
+        """
+        
+        query = db.query(*(columns or (Calculation,))).filter(Calculation.user_id == user_id)
         
         # Apply filters
         if operation:
@@ -98,21 +99,138 @@ class AnalyticsService:
         if end_date:
             query = query.filter(Calculation.created_at <= end_date)
         
-        # Get total count before pagination
-        total = query.count()
+        return query
+    
+    @staticmethod
+    def get_calculation_history(
+        db: Session,
+        user_id: int,
+        operation: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> tuple[List[Calculation], int]:
+        """Get filtered calculation history for a user
+        
+        When a cursor is given the page starts right after it and offset is ignored.
+        """
         
-        # Apply pagination and ordering
-        calculations = query.order_by(
-            desc(Calculation.created_at)
-        ).limit(limit).offset(offset).all()
+        calculations, total, _ = AnalyticsService.get_history_page(
+            db, user_id, operation, start_date, end_date, limit, offset, cursor
+        )
         
         return calculations, total
     
+    @staticmethod
+    def get_history_page(
+        db: Session,
+        user_id: int,
+        operation: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        total_mode: str = "exact",
+        columns: Optional[tuple] = None
+    ) -> tuple[list, Optional[int], bool]:
+        """Get one page of history along with its total and whether more pages follow
+        
+        total_mode is "exact" (COUNT query), "estimated" (cached count or planner
+        estimate) or "none" (no count at all). has_more never needs a count: one
+        extra row is fetched past the page instead. Pass columns to get plain
+        column tuples instead of Calculation objects.
+        """
+        
+        query = AnalyticsService.filter_calculations(db, user_id, operation, start_date, end_date, columns=columns)
+        
+        if total_mode == "exact":
+            total = query.count()
+        elif total_mode == "estimated":
+            total = AnalyticsService.estimate_count(
+                db, query, (user_id, operation, start_date, end_date)
+            )
+        else:
+            total = None
+        
+        # Apply ordering and pagination, peeking one row past the page
+        page = keyset_paginate(query, cursor, limit + 1)
+        if not cursor:
+            page = page.offset(offset)
+        
+        calculations = page.all()
+        has_more = len(calculations) > limit
+        
+        return calculations[:limit], total, has_more
+    
+    @staticmethod
+    def estimate_count(db: Session, query, cache_key: tuple) -> int:
+        """Estimate the number of rows a query returns, caching the answer per filter set"""
+        
+        cached = _history_count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        connection = db.connection()
+        if connection.dialect.name == "postgresql":
+            # The planner's row estimate costs no table scan
+            plan = connection.exec_driver_sql(
+                *AnalyticsService.explain_statement(query.statement, connection.dialect)
+            ).scalar()
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+        else:
+            estimate = query.count()
+        
+        _history_count_cache.set(cache_key, estimate)
+        return estimate
+    
+    @staticmethod
+    def explain_statement(statement, dialect) -> tuple:
+        """EXPLAIN SQL for a statement and its parameters, in the driver's paramstyle
+        
+        psycopg2 takes named pyformat parameters, asyncpg positional $n ones.
+        """
+        compiled = statement.compile(dialect=dialect)
+        params = compiled.params
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        return f"EXPLAIN (FORMAT JSON) {compiled}", params
+    
+    @staticmethod
+    def iter_history_rows(
+        db: Session,
+        user_id: int,
+        operation: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> Iterator[tuple]:
+        """Stream a user's filtered history oldest first as plain column tuples
+        
+        Rows are pulled from a server-side cursor batch_size at a time and never
+        enter the identity map, so memory stays flat however many rows match.
+        """
+        
+        query = AnalyticsService.filter_calculations(
+            db, user_id, operation, start_date, end_date, columns=EXPORT_COLUMNS
+        ).order_by(
+            Calculation.created_at.asc(),
+            Calculation.id.asc()
+        ).execution_options(yield_per=batch_size)
+        
+        yield from query
+    
     @staticmethod
     def delete_calculation_history(db: Session, user_id: int) -> int:
         """Delete all calculation history for a user"""
         deleted_count = db.query(Calculation).filter(
             Calculation.user_id == user_id
         ).delete()
+        StatsRollupService.clear(db.connection(), user_id)
+        TimeSeriesService.clear(db.connection(), user_id)
+        mark_summary_stale(db, user_id)
+        record_cleared(db, user_id)
         db.commit()
         return deleted_count
\ No newline at end of file
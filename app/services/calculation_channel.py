@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Set
+import orjson
+from fastapi import HTTPException, WebSocket, status
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.rate_limit import parse_limit, rate_limiter
+from app.services.calculations import CalculationService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChannelStats:
+    """Counters for one calculation channel"""
+    received: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    invalid: int = 0
+    batches: int = 0
+    save_seconds: float = 0.0
+    opened_at: float = field(default_factory=time.monotonic)
+    
+    def snapshot(self, in_flight: int) -> dict:
+        """Counters as sent to the client"""
+        answered = self.succeeded + self.failed
+        return {
+            "received": self.received,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "in_flight": in_flight,
+            "batches": self.batches,
+            "average_batch_size": round(answered / self.batches, 2) if self.batches else 0.0,
+            "average_save_ms": round(self.save_seconds * 1000 / self.batches, 3) if self.batches else 0.0,
+            "connected_seconds": round(time.monotonic() - self.opened_at, 3)
+        }
+
+
+class CalculationChannel:
+    """One WebSocket connection carrying pipelined calculations for a user
+    
+    The client authenticates once, with an Authorization header on the
+    handshake or a first {"type": "auth", "token": ...} message, and may then
+    send calculation messages tagged with its own "id" without waiting for
+    replies. Messages are evaluated and saved in micro-batches: a batch holds
+    up to batch_size messages and is written flush_interval seconds after its
+    first one arrived, and its replies go out in one "results" message once
+    it has committed. With max_in_flight messages unanswered the channel
+    stops reading, so TCP slows a fast client down instead of the server
+    buffering its backlog. Once revalidate_interval seconds have passed the
+    token is checked again before the next batch, and the connection is
+    closed if it has expired or been revoked.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        authenticate: Callable[[str], Awaitable[Principal]],
+        save: Callable[[List[dict]], Awaitable[int]],
+        batch_size: int = 200,
+        flush_interval: float = 0.005,
+        max_in_flight: int = 1000,
+        auth_timeout: float = 10.0,
+        revalidate_interval: float = 60.0
+    ):
+        self.websocket = websocket
+        self.authenticate = authenticate
+        self.save = save
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_in_flight = max_in_flight
+        self.auth_timeout = auth_timeout
+        self.revalidate_interval = revalidate_interval
+        
+        self.stats = ChannelStats()
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+    
+    async def serve(self):
+        """Run the connection until the client leaves or its token stops being valid"""
+        await self.websocket.accept()
+        token = await self._read_token()
+        principal = await self._authenticate(token) if token else None
+        if principal is None:
+            await self._close(status.WS_1008_POLICY_VIOLATION, "Could not validate credentials")
+            return
+        if not await self._within_rate_limit(principal):
+            await self._close(status.WS_1013_TRY_AGAIN_LATER, "Rate limit exceeded; try again later")
+            return
+        
+        await self._send({"type": "ready", "batch_size": self.batch_size, "max_in_flight": self.max_in_flight})
+        calculation_channels.add(self)
+        reader = asyncio.create_task(self._read())
+        writer = asyncio.create_task(self._write(principal, token))
+        try:
+            done, _ = await asyncio.wait([reader, writer], return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                # Messages already received are still saved, then the writer stops
+                self._pending.put_nowait(None)
+            await writer
+        finally:
+            reader.cancel()
+            writer.cancel()
+            calculation_channels.discard(self)
+            logger.debug("Calculation channel for user %d closed: %s", principal.id, self.stats.snapshot(self.in_flight))
+    
+    async def _read_token(self) -> Optional[str]:
+        """The bearer token from the handshake, or else from the first message"""
+        scheme, _, token = self.websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return token
+        try:
+            message = await asyncio.wait_for(self.websocket.receive(), self.auth_timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message["type"] == "websocket.disconnect":
+            self._closed = True
+            return None
+        try:
+            message = orjson.loads(message.get("text") or message.get("bytes") or b"")
+        except orjson.JSONDecodeError:
+            return None
+        if isinstance(message, dict) and message.get("type") == "auth" and isinstance(message.get("token"), str):
+            return message["token"]
+        return None
+    
+    async def _authenticate(self, token: str) -> Optional[Principal]:
+        """The token's principal, or None once it is invalid, expired or revoked"""
+        try:
+            return await self.authenticate(token)
+        except HTTPException:
+            return None
+    
+    @staticmethod
+    async def _within_rate_limit(principal: Principal) -> bool:
+        """Count the connection against the user's calculations:connect limit"""
+        spec = settings.rate_limits.get("calculations:connect")
+        if not settings.rate_limit_enabled or not spec:
+            return True
+        decision = await rate_limiter.hit(f"calculations:connect:user:{principal.username}", parse_limit(spec))
+        return decision.allowed
+    
+    async def _read(self):
+        """Queue calculation messages, pausing while max_in_flight are unanswered"""
+        while True:
+            await self._slots.acquire()
+            try:
+                message = await self.websocket.receive()
+            except RuntimeError:
+                # Closed by the writer
+                return
+            if message["type"] == "websocket.disconnect":
+                self._closed = True
+                return
+            
+            try:
+                message = orjson.loads(message.get("text") or message.get("bytes") or b"")
+            except orjson.JSONDecodeError:
+                message = None
+            kind = message.get("type", "calculation") if isinstance(message, dict) else None
+            if kind == "calculation":
+                self.stats.received += 1
+                self.in_flight += 1
+                self._pending.put_nowait(message)
+                continue
+            
+            # Control and malformed messages are answered at once and hold no slot
+            self._slots.release()
+            if kind == "stats":
+                await self._send({"type": "stats", **self.stats.snapshot(self.in_flight)})
+            else:
+                self.stats.invalid += 1
+                await self._send({
+                    "type": "error",
+                    "id": message.get("id") if isinstance(message, dict) else None,
+                    "error": "Expected a calculation or stats message"
+                })
+    
+    async def _write(self, principal: Principal, token: str):
+        """Evaluate and save queued messages a batch at a time"""
+        loop = asyncio.get_running_loop()
+        revalidate_at = loop.time() + self.revalidate_interval
+        stopping = False
+        while not stopping:
+            message = await self._pending.get()
+            if message is None:
+                return
+            
+            batch = [message]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    message = await asyncio.wait_for(self._pending.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if message is None:
+                    stopping = True
+                    break
+                batch.append(message)
+            
+            if loop.time() >= revalidate_at:
+                if await self._authenticate(token) is None:
+                    await self._close(status.WS_1008_POLICY_VIOLATION, "Token expired or revoked")
+                    return
+                revalidate_at = loop.time() + self.revalidate_interval
+            
+            if not await self._process(batch, principal.id):
+                return
+    
+    async def _process(self, batch: List[dict], user_id: int) -> bool:
+        """Save one batch and answer its messages; False if it could not be saved"""
+        results, rows = CalculationService.evaluate_batch(batch, user_id)
+        started = time.perf_counter()
+        try:
+            await self.save(rows)
+        except Exception:
+            # Unanswered messages were not saved; the client may send them again
+            logger.exception("Failed to save %d calculations from a WebSocket channel", len(rows))
+            await self._close(status.WS_1011_INTERNAL_ERROR, "Calculations could not be saved")
+            return False
+        
+        self.stats.save_seconds += time.perf_counter() - started
+        self.stats.batches += 1
+        self.stats.succeeded += len(rows)
+        self.stats.failed += len(batch) - len(rows)
+        
+        replies = []
+        for message, result in zip(batch, results):
+            if result.success:
+                replies.append({"id": message.get("id"), "result": result.result})
+            else:
+                replies.append({"id": message.get("id"), "error": result.error})
+        await self._send({"type": "results", "results": replies})
+        
+        self.in_flight -= len(batch)
+        for _ in batch:
+            self._slots.release()
+        return True
+    
+    async def _send(self, message: dict):
+        """Send a message, unless the client has gone"""
+        if self._closed:
+            return
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(orjson.dumps(message).decode())
+            except (RuntimeError, OSError):
+                self._closed = True
+    
+    async def _close(self, code: int, reason: str):
+        """Close the connection, unless the client already has"""
+        if self._closed:
+            return
+        self._closed = True
+        async with self._send_lock:
+            try:
+                await self.websocket.close(code=code, reason=reason)
+            except (RuntimeError, OSError):
+                pass
+
+
+class ChannelRegistry:
+    """The calculation channels open in this worker"""
+    
+    def __init__(self):
+        self._channels: Set[CalculationChannel] = set()
+        self.opened = 0
+    
+    def add(self, channel: CalculationChannel):
+        self._channels.add(channel)
+        self.opened += 1
+    
+    def discard(self, channel: CalculationChannel):
+        self._channels.discard(channel)
+    
+    def stats(self) -> dict:
+        """Health details for the /health endpoint"""
+        return {
+            "connections": len(self._channels),
+            "opened": self.opened,
+            "in_flight": sum(channel.in_flight for channel in self._channels)
+        }
+
+
+calculation_channels = ChannelRegistry()
\ No newline at end of file
@@ -0,0 +1,112 @@
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.calculation import Calculation
+from app.schemas.calculation import CalculationBatchItemResult, CalculationCreate
+from app.services.calculator import CalculatorService
+from app.services.live_events import record_created
+from app.services.rollup import StatsRollupService
+from app.services.summary_cache import mark_summary_stale
+from app.services.timeseries import TimeSeriesService
+from typing import Iterable, List, Tuple
+from datetime import datetime
+
+# Columns of a CalculationResponse, for list endpoints that select plain tuples
+# and encode them directly instead of loading and validating Calculation objects
+RESPONSE_COLUMNS = (
+    Calculation.id,
+    Calculation.user_id,
+    Calculation.operation,
+    Calculation.operand1,
+    Calculation.operand2,
+    Calculation.result,
+    Calculation.created_at
+)
+RESPONSE_FIELDS = tuple(column.key for column in RESPONSE_COLUMNS)
+
+
+class CalculationService:
+    """Service class for evaluating and persisting calculations in bulk"""
+    
+    @staticmethod
+    def response_items(rows: Iterable[tuple]) -> List[dict]:
+        """Shape RESPONSE_COLUMNS rows like CalculationResponse, without validating them"""
+        return [dict(zip(RESPONSE_FIELDS, row)) for row in rows]
+    
+    @staticmethod
+    def evaluate_batch(items: List[dict], user_id: int) -> Tuple[List[CalculationBatchItemResult], List[dict]]:
+        """Validate and evaluate batch items, returning per-item results and the rows to save"""
+        
+        results = [None] * len(items)
+        valid_items = []
+        
+        # Validate each item on its own so one bad item only fails itself
+        for index, item in enumerate(items):
+            try:
+                valid_items.append((index, CalculationCreate.model_validate(item)))
+            except ValidationError as e:
+                results[index] = CalculationBatchItemResult(
+                    index=index,
+                    success=False,
+                    error="; ".join(error["msg"] for error in e.errors())
+                )
+        
+        # Evaluate every valid item at once, one array operation per operation type
+        values, errors = CalculatorService.calculate_many(
+            [calc_data.operation for _, calc_data in valid_items],
+            [calc_data.operand1 for _, calc_data in valid_items],
+            [calc_data.operand2 for _, calc_data in valid_items]
+        )
+        
+        rows = []
+        for (index, calc_data), value, error in zip(valid_items, values.data.tolist(), errors):
+            results[index] = CalculationBatchItemResult(
+                index=index,
+                success=error is None,
+                operation=calc_data.operation,
+                operand1=calc_data.operand1,
+                operand2=calc_data.operand2,
+                result=value if error is None else None,
+                error=error
+            )
+            if error is None:
+                rows.append({
+                    "user_id": user_id,
+                    "operation": calc_data.operation,
+                    "operand1": calc_data.operand1,
+                    "operand2": calc_data.operand2,
+                    "result": value
+                })
+        
+        return results, rows
+    
+    @staticmethod
+    def bulk_create(db: Session, rows: List[dict]) -> int:
+        """Insert many calculation rows with a single multi-row INSERT"""
+        if not rows:
+            return 0
+        
+        # Stamp rows here so the rollup sees the same created_at that is stored
+        now = datetime.utcnow()
+        rows = [row if row.get("created_at") else {**row, "created_at": now} for row in rows]
+        
+        # Executing an insert() with a list of parameter sets lets the driver
+        # batch every row into one statement instead of one round trip per row
+        if settings.live_events_enabled:
+            # Events carry each row's id so subscribers can match later deletes;
+            # insertmanyvalues still batches the rows with RETURNING
+            ids = db.execute(
+                insert(Calculation).returning(Calculation.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            rows = [{**row, "id": calculation_id} for row, calculation_id in zip(rows, ids)]
+        else:
+            db.execute(insert(Calculation), rows)
+        StatsRollupService.add_rows(db.connection(), rows)
+        TimeSeriesService.add_rows(db.connection(), rows)
+        for user_id in {row["user_id"] for row in rows}:
+            mark_summary_stale(db, user_id)
+        record_created(db, rows)
+        db.commit()
+        
+        return len(rows)
\ No newline at end of file
@@ -1,6 +1,29 @@
+import math
+import numpy as np
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+# Error messages shared by the scalar and vectorized paths
+DIVIDE_BY_ZERO = "Cannot divide by zero"
+MODULUS_BY_ZERO = "Cannot calculate modulus with zero divisor"
+ZERO_TO_NEGATIVE_POWER = "Cannot raise zero to a negative power"
+COMPLEX_POWER = "Power result is not a real number"
+OUT_OF_RANGE = "Result is out of range"
+
+# Lookup tables used by calculate_many to work with small integer codes per row
+_OPERATION_CODES = {
+    operation: code
+    for code, operation in enumerate(["add", "subtract", "multiply", "divide", "power", "modulus"])
+}
+_ERROR_MESSAGES = [None, DIVIDE_BY_ZERO, MODULUS_BY_ZERO, ZERO_TO_NEGATIVE_POWER, COMPLEX_POWER, OUT_OF_RANGE]
+_ERROR_CODES = {message: code for code, message in enumerate(_ERROR_MESSAGES) if message}
+
+
 class CalculatorService:
     """Service class for calculator operations"""
     
+    OPERATIONS = frozenset(_OPERATION_CODES)
+    
     @staticmethod
     def add(a: float, b: float) -> float:
         """Add two numbers"""
@@ -20,34 +43,128 @@ class CalculatorService:
     def divide(a: float, b: float) -> float:
         """Divide a by b"""
         if b == 0:
-            raise ValueError("Cannot divide by zero")
+            raise ValueError(DIVIDE_BY_ZERO)
         return a / b
     
     @staticmethod
     def power(a: float, b: float) -> float:
         """Raise a to the power of b"""
-        return a ** b
+        if a == 0 and b < 0:
+            raise ValueError(ZERO_TO_NEGATIVE_POWER)
+        # A negative base with a fractional exponent has no real result
+        if a < 0 and math.isfinite(a) and math.isfinite(b) and b != math.floor(b):
+            raise ValueError(COMPLEX_POWER)
+        try:
+            return a ** b
+        except OverflowError:
+            raise ValueError(OUT_OF_RANGE)
+    
+    @staticmethod
+    def _unchecked_power(a: float, b: float) -> float:
+        """Raise a to the power of b, returning inf instead of raising on overflow"""
+        try:
+            return a ** b
+        except OverflowError:
+            return math.inf
     
     @staticmethod
     def modulus(a: float, b: float) -> float:
         """Calculate a modulo b"""
         if b == 0:
-            raise ValueError("Cannot calculate modulus with zero divisor")
+            raise ValueError(MODULUS_BY_ZERO)
         return a % b
     
     @classmethod
     def calculate(cls, operation: str, operand1: float, operand2: float) -> float:
         """Perform calculation based on operation type"""
-        operations = {
-            "add": cls.add,
-            "subtract": cls.subtract,
-            "multiply": cls.multiply,
-            "divide": cls.divide,
-            "power": cls.power,
-            "modulus": cls.modulus
-        }
-        
-        if operation not in operations:
+        if operation not in cls.OPERATIONS:
             raise ValueError(f"Invalid operation: {operation}")
         
-        return operations[operation](operand1, operand2)
\ No newline at end of file
+        result = getattr(cls, operation)(operand1, operand2)
+        
+        # inf and nan cannot be stored or serialized as JSON
+        if not math.isfinite(result):
+            raise ValueError(OUT_OF_RANGE)
+        
+        return result
+    
+    @classmethod
+    def calculate_many(
+        cls,
+        operations: Sequence[str],
+        operand1s: Sequence[float],
+        operand2s: Sequence[float]
+    ) -> Tuple[np.ma.MaskedArray, List[Optional[str]]]:
+        """Perform many calculations at once, evaluating each operation as one array op
+        
+        Returns a masked array of results and a list of per-row error messages.
+        Rows that failed are masked and carry the same message `calculate` would raise.
+        """
+        operations = list(operations)
+        a = np.asarray(operand1s, dtype=np.float64)
+        b = np.asarray(operand2s, dtype=np.float64)
+        
+        if not (len(operations) == a.shape[0] == b.shape[0]) or a.ndim != 1 or b.ndim != 1:
+            raise ValueError("operations, operand1s and operand2s must be 1-D and the same length")
+        
+        # Map operation names to small integers once so grouping is a cheap integer compare
+        ops = np.fromiter(
+            map(_OPERATION_CODES.get, operations, repeat(-1, len(operations))),
+            dtype=np.int8,
+            count=len(operations)
+        )
+        
+        results = np.zeros(a.shape[0], dtype=np.float64)
+        # Errors are tracked as small integer codes and only turned into messages at the end
+        error_codes = np.zeros(a.shape[0], dtype=np.int8)
+        
+        with np.errstate(all="ignore"):
+            for operation, operation_code in _OPERATION_CODES.items():
+                rows = np.flatnonzero(ops == operation_code)
+                if rows.shape[0] == 0:
+                    continue
+                
+                x = a[rows]
+                y = b[rows]
+                codes = np.zeros(rows.shape[0], dtype=np.int8)
+                
+                if operation == "add":
+                    out = x + y
+                elif operation == "subtract":
+                    out = x - y
+                elif operation == "multiply":
+                    out = x * y
+                elif operation == "divide":
+                    codes[y == 0] = _ERROR_CODES[DIVIDE_BY_ZERO]
+                    out = x / y
+                elif operation == "modulus":
+                    codes[y == 0] = _ERROR_CODES[MODULUS_BY_ZERO]
+                    out = np.remainder(x, y)
+                else:
+                    codes[(x < 0) & np.isfinite(x) & np.isfinite(y) & (y != np.floor(y))] = _ERROR_CODES[COMPLEX_POWER]
+                    codes[(x == 0) & (y < 0)] = _ERROR_CODES[ZERO_TO_NEGATIVE_POWER]
+                    # np.power uses SIMD kernels that can differ from libm pow in the
+                    # last bit, so evaluate powers with Python floats to match `calculate`
+                    out = np.array([
+                        0.0 if code else cls._unchecked_power(xi, yi)
+                        for xi, yi, code in zip(x.tolist(), y.tolist(), codes.tolist())
+                    ], dtype=np.float64)
+                
+                codes[(codes == 0) & ~np.isfinite(out)] = _ERROR_CODES[OUT_OF_RANGE]
+                error_codes[rows] = codes
+                results[rows] = out
+        
+        mask = (error_codes != 0) | (ops < 0)
+        errors = [None] * a.shape[0]
+        
+        # Failures are rare, so their messages are filled in one by one
+        failed_rows = np.flatnonzero(mask)
+        for row, operation_code, error_code in zip(
+            failed_rows.tolist(), ops[failed_rows].tolist(), error_codes[failed_rows].tolist()
+        ):
+            if operation_code < 0:
+                errors[row] = f"Invalid operation: {operations[row]}"
+            else:
+                errors[row] = _ERROR_MESSAGES[error_code]
+        
+        return np.ma.MaskedArray(results, mask=mask), errors
\ No newline at end of file
@@ -0,0 +1,52 @@
+import hashlib
+from email.utils import formatdate
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from app.services.summary_cache import summary_cache
+
+
+def _opaque_tag(etag: str) -> str:
+    """An entity tag without its weak prefix, for weak comparison"""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def validator_headers(user_id: int, scope: str) -> Dict[str, str]:
+    """ETag and Last-Modified of a user's calculations as of their current watermark
+    
+    The watermark is the summary cache's generation, which changes after every
+    committed calculation write or history clear, so the ETag of every read
+    built from a user's calculations changes with it. scope tells apart the
+    representations served by different endpoints. Empty when there is no
+    watermark to offer.
+    """
+    watermark = summary_cache.generation(user_id)
+    if watermark is None:
+        return {}
+    
+    digest = hashlib.sha256(f"{scope}:{user_id}:{watermark}".encode()).hexdigest()[:24]
+    written_at = int(watermark.split(":")[0]) / 1000
+    return {
+        "ETag": f'W/"{digest}"',
+        "Last-Modified": formatdate(written_at, usegmt=True),
+        # Browsers revalidate on every use and keep one user's copy from another's
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization"
+    }
+
+
+def check_not_modified(user_id: int, scope: str, if_none_match: Optional[str]) -> Dict[str, str]:
+    """Raise 304 when If-None-Match names the current ETag, else return the headers to send
+    
+    Called before any query runs, so an unchanged read costs one Redis lookup.
+    The watermark is read first, so a write landing while the response is
+    built leaves it with an older ETag rather than a newer one. Last-Modified
+    is informational: its one-second resolution cannot tell apart two writes
+    in the same second, so If-Modified-Since is not honoured.
+    """
+    headers = validator_headers(user_id, scope)
+    if headers and if_none_match:
+        tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        if "*" in tags or _opaque_tag(headers["ETag"]) in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return headers
\ No newline at end of file
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, Set, Tuple
+import redis
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from app.core.cache import redis_client
+from app.core.config import settings
+
+# Returned by _claim when this request now owns the key
+_CLAIMED = object()
+
+# Each script acts on the key only while it still holds the caller's claim,
+# compared as the exact value written by _claim, so a request whose claim
+# lapsed and was taken by a retry never touches the retry's entry
+_STORE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key is sent again with a different request"""
+
+
+class IdempotencyKeyInFlight(Exception):
+    """Raised when the request holding a key is still running after the wait"""
+
+
+class IdempotencyStore:
+    """Redis record of responses to requests sent with an Idempotency-Key header
+    
+    The first request with a key claims it with SET NX and runs; its response
+    is kept for ttl seconds and handed to every retry, which never runs the
+    handler again. Retries that arrive while the first request is still
+    running poll until it finishes, for up to wait_timeout seconds. A request
+    that fails gives its key up so the next retry runs afresh. Claims are
+    renewed every third of claim_timeout while their handler runs, so only
+    the claim of a worker that died mid-request lapses.
+    Keys are tied to a fingerprint of the request they were first used with.
+    While Redis is unreachable requests run without duplicate protection.
+    """
+    
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int = 86400,
+        claim_timeout: float = 30.0,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        prefix: str = "idempotency"
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.claim_timeout = claim_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._store_script = client.register_script(_STORE_SCRIPT)
+        self._release_script = client.register_script(_RELEASE_SCRIPT)
+        self._renew_script = client.register_script(_RENEW_SCRIPT)
+        # Claims of running handlers, renewed by one background thread
+        self._held: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def fingerprint(payload: BaseModel) -> str:
+        """Digest identifying a request body"""
+        return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+    
+    def run(self, scope: str, key: str, fingerprint: str, handler: Callable[[], dict]) -> Tuple[dict, bool]:
+        """Run handler at most once per key, returning its response and whether it was replayed"""
+        redis_key, token = self._key(scope, key), uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        
+        while True:
+            stored = self._claim(redis_key, token, fingerprint)
+            if stored is _CLAIMED:
+                break
+            if stored is not None:
+                return stored, True
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInFlight(f"Request with key {key!r} is still running")
+            time.sleep(self.poll_interval)
+        
+        claim = self._claim_entry(token, fingerprint)
+        self._hold(redis_key, claim)
+        try:
+            response = handler()
+        except BaseException:
+            self._drop(redis_key, claim)
+            self._release(redis_key, claim)
+            raise
+        self._drop(redis_key, claim)
+        self._store(redis_key, claim, fingerprint, response)
+        return response, False
+    
+    async def run_async(
+        self, scope: str, key: str, fingerprint: str, handler: Callable[[], Awaitable[dict]]
+    ) -> Tuple[dict, bool]:
+        """run for async routes, waiting and talking to Redis off the event loop"""
+        redis_key, token = self._key(scope, key), uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        
+        while True:
+            stored = await run_in_threadpool(self._claim, redis_key, token, fingerprint)
+            if stored is _CLAIMED:
+                break
+            if stored is not None:
+                return stored, True
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInFlight(f"Request with key {key!r} is still running")
+            await asyncio.sleep(self.poll_interval)
+        
+        claim = self._claim_entry(token, fingerprint)
+        self._hold(redis_key, claim)
+        try:
+            response = await handler()
+        except BaseException:
+            self._drop(redis_key, claim)
+            await run_in_threadpool(self._release, redis_key, claim)
+            raise
+        self._drop(redis_key, claim)
+        await run_in_threadpool(self._store, redis_key, claim, fingerprint, response)
+        return response, False
+    
+    def _key(self, scope: str, key: str) -> str:
+        return f"{self.prefix}:{scope}:{key}"
+    
+    @staticmethod
+    def _claim_entry(token: str, fingerprint: str) -> str:
+        """The value a request claims its key with"""
+        return json.dumps({"token": token, "fingerprint": fingerprint})
+    
+    def _claim(self, redis_key: str, token: str, fingerprint: str):
+        """Claim a key, returning _CLAIMED, the stored response, or None while another request holds it"""
+        claim = self._claim_entry(token, fingerprint)
+        try:
+            if self.client.set(redis_key, claim, nx=True, px=int(self.claim_timeout * 1000)):
+                return _CLAIMED
+            raw = self.client.get(redis_key)
+        except redis.RedisError:
+            return _CLAIMED
+        
+        if raw is None:
+            # Given up between the two commands; the next attempt can claim it
+            return None
+        entry = json.loads(raw)
+        if entry["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused("Idempotency key was already used with a different request")
+        return entry.get("response")
+    
+    def _store(self, redis_key: str, claim: str, fingerprint: str, response: dict):
+        """Replace the claim with the finished response if this request still holds it"""
+        entry = {"fingerprint": fingerprint, "response": response}
+        try:
+            self._store_script(keys=[redis_key], args=[claim, json.dumps(entry), self.ttl])
+        except redis.RedisError:
+            pass
+    
+    def _release(self, redis_key: str, claim: str):
+        """Give up a claim if this request still holds it"""
+        try:
+            self._release_script(keys=[redis_key], args=[claim])
+        except redis.RedisError:
+            pass
+    
+    def _hold(self, redis_key: str, claim: str):
+        """Keep renewing a claim until it is dropped"""
+        with self._lock:
+            self._held.add((redis_key, claim))
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew, name="idempotency-renew", daemon=True)
+                self._renewer.start()
+    
+    def _drop(self, redis_key: str, claim: str):
+        with self._lock:
+            self._held.discard((redis_key, claim))
+    
+    def _renew(self):
+        """Extend every held claim to a full claim_timeout, every third of it"""
+        while True:
+            time.sleep(self.claim_timeout / 3)
+            with self._lock:
+                held = list(self._held)
+            for redis_key, claim in held:
+                try:
+                    self._renew_script(keys=[redis_key], args=[claim, int(self.claim_timeout * 1000)])
+                except redis.RedisError:
+                    # Lapses only if Redis stays unreachable for the rest of the claim
+                    pass
+
+
+idempotency_store = IdempotencyStore(
+    redis_client,
+    ttl=settings.idempotency_ttl,
+    claim_timeout=settings.idempotency_claim_timeout,
+    wait_timeout=settings.idempotency_wait_timeout
+)
\ No newline at end of file
@@ -0,0 +1,155 @@
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.schemas.calculation import CalculationImportRow, CalculationImportError, CalculationImportResult
+from app.services.calculator import CalculatorService
+from app.services.calculations import CalculationService
+from app.services.timeseries import to_utc_naive
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+    max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Split a byte stream into numbered lines without holding more than one line in memory
+    
+    Lines longer than max_line_bytes are discarded and yielded as None so the
+    caller can reject them.
+    """
+    buffer = b""
+    line_number = 0
+    discarding = False
+    
+    async for chunk in stream:
+        buffer += chunk
+        if b"\n" in chunk:
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if discarding or len(line) > max_line_bytes:
+                    discarding = False
+                    yield line_number, None
+                else:
+                    yield line_number, line
+        
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            discarding = True
+    
+    if discarding:
+        yield line_number + 1, None
+    elif buffer:
+        yield line_number + 1, buffer
+
+
+class CalculationImporter:
+    """Validates, evaluates and bulk inserts imported rows one chunk at a time"""
+    
+    def __init__(
+        self,
+        db: Session,
+        user_id: int,
+        format: str,
+        max_line_bytes: int = 65536,
+        max_reported_errors: int = 100
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.format = format
+        self.max_line_bytes = max_line_bytes
+        self.max_reported_errors = max_reported_errors
+        
+        self.accepted = 0
+        self.rejected = 0
+        self.errors: List[CalculationImportError] = []
+        self._header: Optional[List[str]] = None
+    
+    def process(self, lines: List[Tuple[int, Optional[bytes]]]):
+        """Import one chunk of raw lines in its own transaction"""
+        valid = []
+        
+        for line_number, line in lines:
+            if line is None:
+                self._reject(line_number, f"Line exceeds {self.max_line_bytes} bytes")
+                continue
+            
+            # utf-8-sig drops the byte order mark Excel puts before the header
+            text = line.decode("utf-8-sig", errors="replace").strip()
+            if not text:
+                continue
+            
+            try:
+                record = self._parse(text)
+                if record is None:
+                    continue
+                valid.append((line_number, CalculationImportRow.model_validate(record)))
+            except ValidationError as e:
+                self._reject(line_number, "; ".join(error["msg"] for error in e.errors()))
+            except ValueError as e:
+                self._reject(line_number, str(e))
+        
+        if not valid:
+            return
+        
+        # Recompute every result rather than trusting values from the source system
+        values, errors = CalculatorService.calculate_many(
+            [row.operation for _, row in valid],
+            [row.operand1 for _, row in valid],
+            [row.operand2 for _, row in valid]
+        )
+        
+        rows = []
+        for (line_number, row), value, error in zip(valid, values.data.tolist(), errors):
+            if error is not None:
+                self._reject(line_number, error)
+                continue
+            data = {
+                "user_id": self.user_id,
+                "operation": row.operation,
+                "operand1": row.operand1,
+                "operand2": row.operand2,
+                "result": value
+            }
+            if row.created_at is not None:
+                # Stored, rolled up and bucketed as naive UTC like every other timestamp
+                data["created_at"] = to_utc_naive(row.created_at)
+            rows.append(data)
+        
+        self.accepted += CalculationService.bulk_create(self.db, rows)
+    
+    def summary(self) -> CalculationImportResult:
+        """Summarize accepted and rejected rows"""
+        return CalculationImportResult(
+            accepted=self.accepted,
+            rejected=self.rejected,
+            errors=self.errors,
+            errors_truncated=self.rejected > len(self.errors)
+        )
+    
+    def _parse(self, text: str) -> Optional[dict]:
+        """Parse one line into a record, or None for the CSV header"""
+        if self.format == "ndjson":
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON: {e.msg}")
+            if not isinstance(record, dict):
+                raise ValueError("Each line must be a JSON object")
+            return record
+        
+        values = next(csv.reader([text]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self._header):
+            raise ValueError(f"Expected {len(self._header)} columns, got {len(values)}")
+        # Empty cells count as missing so optional columns can be left blank
+        return {name: value for name, value in zip(self._header, values) if value != ""}
+    
+    def _reject(self, line_number: int, error: str):
+        """Count a rejected row, keeping only the first few error details"""
+        self.rejected += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append(CalculationImportError(line=line_number, error=error))
\ No newline at end of file
@@ -0,0 +1,267 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+import redis
+import redis.asyncio
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.core.database import run_after_commit
+from app.models.calculation import Calculation
+
+# Session.info key holding the events of the current transaction, by user id
+_PENDING_EVENTS = "live_events"
+
+# Calculation fields sent with events, matching CalculationResponse
+EVENT_FIELDS = ("id", "user_id", "operation", "operand1", "operand2", "result", "created_at")
+
+CREATED = "calculation.created"
+UPDATED = "calculation.updated"
+DELETED = "calculation.deleted"
+CLEARED = "history.cleared"
+
+
+def channel(user_id: int) -> str:
+    """Redis pub/sub channel carrying a user's events"""
+    return f"{settings.live_events_prefix}:{user_id}"
+
+
+def _payload(values: dict) -> dict:
+    """JSON-ready calculation fields"""
+    payload = {field: values.get(field) for field in EVENT_FIELDS}
+    if isinstance(payload["created_at"], datetime):
+        payload["created_at"] = payload["created_at"].isoformat()
+    return payload
+
+
+def summary_delta(added: Iterable[dict] = (), removed: Iterable[dict] = ()) -> dict:
+    """Change to a user's AnalyticsSummary from adding and removing calculations
+    
+    Carries the change in count, result sum and per-operation counts, which
+    is enough for a client to update the totals, breakdown percentages, most
+    used operation and average it already shows.
+    """
+    delta = {"count": 0, "result_sum": 0.0, "operations": defaultdict(int), "latest_at": None}
+    for calculation, sign in [(row, 1) for row in added] + [(row, -1) for row in removed]:
+        delta["count"] += sign
+        delta["result_sum"] += sign * calculation["result"]
+        delta["operations"][calculation["operation"]] += sign
+        created_at = calculation.get("created_at")
+        if sign > 0 and created_at and (delta["latest_at"] is None or str(created_at) > delta["latest_at"]):
+            delta["latest_at"] = str(created_at)
+    delta["operations"] = {operation: count for operation, count in delta["operations"].items() if count}
+    return delta
+
+
+def record_event(db: Session, user_id: int, event: dict):
+    """Publish an event for a user once db's transaction commits"""
+    if settings.live_events_enabled:
+        db.info.setdefault(_PENDING_EVENTS, defaultdict(list))[user_id].append(event)
+
+
+def record_created(db: Session, rows: List[dict]):
+    """Record calculations inserted outside the ORM, such as bulk inserts
+    
+    Rows beyond live_events_max_items are reported only through the delta,
+    so large imports do not flood subscribers; clients reload the history.
+    """
+    by_user = defaultdict(list)
+    for row in rows:
+        by_user[row["user_id"]].append(_payload(row))
+    for user_id, calculations in by_user.items():
+        record_event(db, user_id, {
+            "type": CREATED,
+            "calculations": calculations if len(calculations) <= settings.live_events_max_items else None,
+            "delta": summary_delta(added=calculations)
+        })
+
+
+def record_cleared(db: Session, user_id: int):
+    """Record that a user's whole history was deleted"""
+    record_event(db, user_id, {"type": CLEARED, "calculations": None, "delta": None})
+
+
+def publish(user_id: int, events: List[dict]):
+    """Send a user's committed events to every worker's subscribers"""
+    try:
+        redis_client.publish(channel(user_id), json.dumps(events))
+    except redis.RedisError:
+        # Subscribers miss these events; their next full reload catches up
+        pass
+
+
+# ORM writes are picked up per row at flush time; bulk statements call
+# record_created and record_cleared themselves. The previous operation and
+# result of an updated row are loaded because app.services.rollup asks for
+# active history on those attributes.
+@event.listens_for(Calculation, "after_insert")
+def _calculation_inserted(mapper, connection, target):
+    calculation = _payload(inspect(target).dict)
+    record_event(object_session(target), target.user_id, {
+        "type": CREATED,
+        "calculations": [calculation],
+        "delta": summary_delta(added=[calculation])
+    })
+
+
+@event.listens_for(Calculation, "after_update")
+def _calculation_updated(mapper, connection, target):
+    state = inspect(target)
+    operation = state.attrs.operation.history
+    result = state.attrs.result.history
+    calculation = _payload(state.dict)
+    previous = {
+        "operation": operation.deleted[0] if operation.deleted else target.operation,
+        "result": result.deleted[0] if result.deleted else target.result
+    }
+    record_event(object_session(target), target.user_id, {
+        "type": UPDATED,
+        "calculations": [calculation],
+        "delta": summary_delta(added=[calculation], removed=[previous])
+    })
+
+
+@event.listens_for(Calculation, "after_delete")
+def _calculation_deleted(mapper, connection, target):
+    calculation = _payload(inspect(target).dict)
+    record_event(object_session(target), target.user_id, {
+        "type": DELETED,
+        "calculations": [calculation],
+        "delta": summary_delta(removed=[calculation])
+    })
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    pending = session.info.pop(_PENDING_EVENTS, {})
+    if pending:
+        run_after_commit(session, lambda: [publish(user_id, events) for user_id, events in pending.items()])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_EVENTS, None)
+
+
+class EventHub:
+    """Fans the events published on Redis out to this worker's subscribers
+    
+    The worker holds one pub/sub connection and subscribes it to a user's
+    channel while at least one of that user's streams is open, so any worker
+    can serve any subscriber whichever worker handled the write. Each stream
+    reads from its own bounded queue; a stream that falls queue_size batches
+    behind is told to resync instead of holding events in memory. If Redis
+    goes away every stream is ended with None so clients reconnect.
+    """
+    
+    def __init__(self, url: str, queue_size: int = 100, subscribe_timeout: float = 5.0):
+        self.url = url
+        self.queue_size = queue_size
+        self.subscribe_timeout = subscribe_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+    
+    def _reset(self):
+        self._queues: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._confirmations: Dict[str, asyncio.Future] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+    
+    async def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Start receiving a user's events, once Redis confirms the subscription"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Connections belong to one event loop; test clients each run their own
+            self._loop = loop
+            self._reset()
+        
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        first = not self._queues[user_id]
+        self._queues[user_id].add(queue)
+        if not first:
+            return queue
+        
+        try:
+            if self._pubsub is None:
+                self._pubsub = redis.asyncio.from_url(self.url, decode_responses=True).pubsub()
+            confirmation = self._confirmations[channel(user_id)] = loop.create_future()
+            await self._pubsub.subscribe(channel(user_id))
+            if self._listener is None:
+                self._listener = asyncio.create_task(self._listen())
+            await asyncio.wait_for(confirmation, self.subscribe_timeout)
+        except (redis.RedisError, OSError, asyncio.TimeoutError):
+            self._queues[user_id].discard(queue)
+            raise
+        finally:
+            self._confirmations.pop(channel(user_id), None)
+        return queue
+    
+    async def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        """Stop delivering to a queue, leaving the channel once the user has no streams here"""
+        queues = self._queues.get(user_id)
+        if not queues or queue not in queues:
+            return
+        queues.discard(queue)
+        if queues:
+            return
+        del self._queues[user_id]
+        try:
+            await self._pubsub.unsubscribe(channel(user_id))
+        except (redis.RedisError, OSError):
+            pass
+    
+    async def close(self):
+        """Stop listening and drop the pub/sub connection, ending every stream"""
+        for queues in self._queues.values():
+            self._deliver(queues, None)
+        if self._listener is not None and self._loop is asyncio.get_running_loop():
+            self._listener.cancel()
+            try:
+                await self._pubsub.aclose()
+            except (redis.RedisError, OSError):
+                pass
+        self._reset()
+    
+    def stats(self) -> dict:
+        """Health details for the /health endpoint"""
+        return {"users": len(self._queues), "streams": sum(len(queues) for queues in self._queues.values())}
+    
+    async def _listen(self):
+        pubsub = self._pubsub
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message["type"] == "subscribe":
+                    confirmation = self._confirmations.get(message["channel"])
+                    if confirmation is not None and not confirmation.done():
+                        confirmation.set_result(True)
+                elif message["type"] == "message":
+                    user_id = int(message["channel"].rsplit(":", 1)[1])
+                    self._deliver(self._queues.get(user_id, ()), json.loads(message["data"]))
+        except (redis.RedisError, OSError):
+            for queues in self._queues.values():
+                self._deliver(queues, None)
+            for confirmation in self._confirmations.values():
+                if not confirmation.done():
+                    confirmation.set_exception(redis.ConnectionError("Live events connection lost"))
+            self._reset()
+            await pubsub.aclose()
+    
+    @staticmethod
+    def _deliver(queues: Iterable[asyncio.Queue], events: Optional[List[dict]]):
+        for queue in list(queues):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                # The stream fell behind; drop its backlog and have the client reload
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None if events is None else [{"type": "resync"}])
+
+
+event_hub = EventHub(settings.redis_url, queue_size=settings.live_events_queue_size)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from app.models.calculation import Calculation
+
+
+def encode_cursor(created_at: datetime, calculation_id: int) -> str:
+    """Encode the position of a calculation as an opaque cursor"""
+    payload = json.dumps([created_at.isoformat(), calculation_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, calculation_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(calculation_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+
+def next_cursor(calculations: list, has_more: bool) -> Optional[str]:
+    """Return the cursor for the page after calculations, if there is one"""
+    if not has_more or not calculations:
+        return None
+    last = calculations[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def keyset_paginate(query: Query, cursor: Optional[str], limit: int) -> Query:
+    """Order newest first and seek past the cursor instead of using OFFSET
+    
+    Comparing the (created_at, id) row value lets the database jump straight to
+    the cursor through the (user_id, created_at, id) index, so every page costs
+    the same no matter how deep it is.
+    """
+    if cursor:
+        created_at, calculation_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(Calculation.created_at, Calculation.id) < tuple_(created_at, calculation_id)
+        )
+    
+    return query.order_by(
+        Calculation.created_at.desc(),
+        Calculation.id.desc()
+    ).limit(limit)
\ No newline at end of file
@@ -0,0 +1,279 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.models.calculation import Calculation
+from app.models.user import User
+from app.models.user_calc_stats import UserCalcStats
+from app.services.timeseries import TimeSeriesService
+
+
+class StatsRollupService:
+    """Keeps the user_calc_stats rollup in step with the calculations table"""
+    
+    @staticmethod
+    def add_rows(connection: Connection, rows: Iterable[dict]):
+        """Fold newly inserted calculation rows into the rollup"""
+        
+        deltas: Dict[Tuple[int, str], list] = defaultdict(lambda: [0, 0.0, None])
+        for row in rows:
+            delta = deltas[(row["user_id"], row["operation"])]
+            delta[0] += 1
+            delta[1] += row["result"]
+            created_at = row.get("created_at")
+            if created_at is not None and (delta[2] is None or created_at > delta[2]):
+                delta[2] = created_at
+        
+        for (user_id, operation), (count, result_sum, latest_at) in deltas.items():
+            StatsRollupService._increment(connection, user_id, operation, count, result_sum, latest_at)
+    
+    @staticmethod
+    def remove_row(
+        connection: Connection,
+        user_id: int,
+        operation: str,
+        result: float,
+        created_at: Optional[datetime]
+    ):
+        """Take a deleted calculation back out of the rollup"""
+        
+        key = (UserCalcStats.user_id == user_id) & (UserCalcStats.operation == operation)
+        
+        connection.execute(
+            update(UserCalcStats).where(key).values(
+                count=UserCalcStats.count - 1,
+                result_sum=UserCalcStats.result_sum - result
+            )
+        )
+        connection.execute(delete(UserCalcStats).where(key, UserCalcStats.count <= 0))
+        
+        # The latest timestamp cannot be decremented, so look it up again only
+        # when the deleted row may have been the latest one
+        if created_at is not None:
+            latest = select(func.max(Calculation.created_at)).where(
+                Calculation.user_id == user_id,
+                Calculation.operation == operation
+            ).scalar_subquery()
+            connection.execute(
+                update(UserCalcStats).where(key, UserCalcStats.latest_at <= created_at).values(latest_at=latest)
+            )
+    
+    @staticmethod
+    def clear(connection: Connection, user_id: int):
+        """Drop every rollup row for a user"""
+        connection.execute(delete(UserCalcStats).where(UserCalcStats.user_id == user_id))
+    
+    @staticmethod
+    def get_user_stats(db: Session, user_id: int) -> List[UserCalcStats]:
+        """Get a user's per-operation rollup rows"""
+        return db.query(UserCalcStats).filter(UserCalcStats.user_id == user_id).all()
+    
+    @staticmethod
+    def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+        """Recompute the rollup from the calculations table, for one user or everyone"""
+        
+        clear = delete(UserCalcStats)
+        source = select(
+            Calculation.user_id,
+            Calculation.operation,
+            func.count(Calculation.id),
+            func.sum(Calculation.result),
+            func.max(Calculation.created_at)
+        ).group_by(Calculation.user_id, Calculation.operation)
+        
+        if user_id is not None:
+            clear = clear.where(UserCalcStats.user_id == user_id)
+            source = source.where(Calculation.user_id == user_id)
+        
+        db.execute(clear)
+        result = db.execute(
+            insert(UserCalcStats).from_select(
+                ["user_id", "operation", "count", "result_sum", "latest_at"], source
+            )
+        )
+        db.commit()
+        
+        return result.rowcount
+    
+    @staticmethod
+    def check(db: Session, user_id: Optional[int] = None) -> List[dict]:
+        """Compare the rollup with a fresh aggregate and list every mismatch"""
+        
+        actual_query = select(
+            Calculation.user_id,
+            Calculation.operation,
+            func.count(Calculation.id),
+            func.sum(Calculation.result),
+            func.max(Calculation.created_at)
+        ).group_by(Calculation.user_id, Calculation.operation)
+        stored_query = select(
+            UserCalcStats.user_id,
+            UserCalcStats.operation,
+            UserCalcStats.count,
+            UserCalcStats.result_sum,
+            UserCalcStats.latest_at
+        )
+        
+        if user_id is not None:
+            actual_query = actual_query.where(Calculation.user_id == user_id)
+            stored_query = stored_query.where(UserCalcStats.user_id == user_id)
+        
+        actual = {(row[0], row[1]): row[2:] for row in db.execute(actual_query)}
+        stored = {(row[0], row[1]): row[2:] for row in db.execute(stored_query)}
+        
+        mismatches = []
+        for key in sorted(set(actual) | set(stored)):
+            expected = actual.get(key, (0, 0.0, None))
+            found = stored.get(key, (0, 0.0, None))
+            same = (
+                expected[0] == found[0]
+                and math.isclose(expected[1] or 0.0, found[1] or 0.0, rel_tol=1e-9, abs_tol=1e-6)
+                and expected[2] == found[2]
+            )
+            if not same:
+                mismatches.append({
+                    "user_id": key[0],
+                    "operation": key[1],
+                    "expected": {"count": expected[0], "result_sum": expected[1], "latest_at": expected[2]},
+                    "found": {"count": found[0], "result_sum": found[1], "latest_at": found[2]}
+                })
+        
+        return mismatches
+    
+    @staticmethod
+    def _increment(
+        connection: Connection,
+        user_id: int,
+        operation: str,
+        count: int,
+        result_sum: float,
+        latest_at: Optional[datetime]
+    ):
+        """Add to one rollup row, creating it if needed, in a single upsert"""
+        
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            StatsRollupService._increment_portable(connection, user_id, operation, count, result_sum, latest_at)
+            return
+        
+        statement = dialect_insert(UserCalcStats).values(
+            user_id=user_id,
+            operation=operation,
+            count=count,
+            result_sum=result_sum,
+            latest_at=latest_at
+        )
+        excluded = statement.excluded
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[UserCalcStats.user_id, UserCalcStats.operation],
+            set_={
+                "count": UserCalcStats.count + excluded.count,
+                "result_sum": UserCalcStats.result_sum + excluded.result_sum,
+                "latest_at": case(
+                    (UserCalcStats.latest_at.is_(None), excluded.latest_at),
+                    (excluded.latest_at > UserCalcStats.latest_at, excluded.latest_at),
+                    else_=UserCalcStats.latest_at
+                )
+            }
+        ))
+    
+    @staticmethod
+    def _increment_portable(
+        connection: Connection,
+        user_id: int,
+        operation: str,
+        count: int,
+        result_sum: float,
+        latest_at: Optional[datetime]
+    ):
+        """Update-then-insert fallback for databases without ON CONFLICT"""
+        
+        key = (UserCalcStats.user_id == user_id) & (UserCalcStats.operation == operation)
+        values = {
+            "count": UserCalcStats.count + count,
+            "result_sum": UserCalcStats.result_sum + result_sum
+        }
+        if latest_at is not None:
+            values["latest_at"] = case(
+                (UserCalcStats.latest_at.is_(None), latest_at),
+                (UserCalcStats.latest_at < latest_at, latest_at),
+                else_=UserCalcStats.latest_at
+            )
+        
+        if connection.execute(update(UserCalcStats).where(key).values(**values)).rowcount == 0:
+            connection.execute(insert(UserCalcStats).values(
+                user_id=user_id,
+                operation=operation,
+                count=count,
+                result_sum=result_sum,
+                latest_at=latest_at
+            ))
+
+
+def _calculation_row(calculation: Calculation) -> dict:
+    """Read the columns the rollup tracks from a Calculation"""
+    return {
+        "user_id": calculation.user_id,
+        "operation": calculation.operation,
+        "result": calculation.result,
+        "created_at": calculation.created_at
+    }
+
+
+# ORM writes (db.add, attribute changes, db.delete) keep the rollup and the
+# time-series buckets current inside the same flush; bulk inserts and bulk
+# deletes call the services directly
+@event.listens_for(Calculation, "after_insert")
+def _calculation_inserted(mapper, connection, target):
+    row = _calculation_row(target)
+    StatsRollupService.add_rows(connection, [row])
+    TimeSeriesService.add_rows(connection, [row])
+
+
+# Asking for active history makes SQLAlchemy load the previous operation and
+# result before they are overwritten, even on expired instances, so updates
+# always know which rollup row to take the old values out of
+@event.listens_for(Calculation.operation, "set", active_history=True)
+@event.listens_for(Calculation.result, "set", active_history=True)
+def _track_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(Calculation, "after_update")
+def _calculation_updated(mapper, connection, target):
+    state = inspect(target)
+    operation = state.attrs.operation.history
+    result = state.attrs.result.history
+    if not operation.has_changes() and not result.has_changes():
+        return
+    
+    old_operation = operation.deleted[0] if operation.deleted else target.operation
+    old_result = result.deleted[0] if result.deleted else target.result
+    row = _calculation_row(target)
+    StatsRollupService.remove_row(connection, target.user_id, old_operation, old_result, target.created_at)
+    StatsRollupService.add_rows(connection, [row])
+    TimeSeriesService.remove_row(connection, target.user_id, old_operation, old_result, target.created_at)
+    TimeSeriesService.add_rows(connection, [row])
+
+
+@event.listens_for(Calculation, "after_delete")
+def _calculation_deleted(mapper, connection, target):
+    StatsRollupService.remove_row(
+        connection, target.user_id, target.operation, target.result, target.created_at
+    )
+    TimeSeriesService.remove_row(
+        connection, target.user_id, target.operation, target.result, target.created_at
+    )
+
+
+@event.listens_for(User, "before_delete")
+def _user_deleted(mapper, connection, target):
+    StatsRollupService.clear(connection, target.id)
+    TimeSeriesService.clear(connection, target.id)
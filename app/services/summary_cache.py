@@ -0,0 +1,210 @@
+import json
+import time
+import uuid
+from itertools import chain
+from typing import Callable, Optional
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.core.database import run_after_commit
+from app.models.calculation import Calculation
+from app.models.user import User
+from app.schemas.analytics import AnalyticsSummary
+
+# Session.info key holding user ids whose summaries must be invalidated on commit
+_STALE_USERS = "stale_summary_users"
+
+
+class SummaryCache:
+    """Read-through Redis cache for per-user analytics summaries
+    
+    Every write to a user's calculations replaces the user's generation key
+    after the transaction commits. A cached entry is fresh while it was built
+    from the current generation. On a miss one request takes a short Redis lock
+    and recomputes; concurrent requests wait for its result, or, if the entry
+    went stale less than stale_ttl seconds ago, answer with the stale summary
+    instead of queuing behind the recompute.
+    """
+    
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int = 300,
+        stale_ttl: int = 30,
+        lock_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+        enabled: bool = True,
+        prefix: str = "analytics:summary"
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+        self.prefix = prefix
+    
+    def get(self, user_id: int, compute: Callable[[], AnalyticsSummary]) -> AnalyticsSummary:
+        """Return the user's summary from the cache, computing it at most once per change"""
+        if not self.enabled:
+            return compute()
+        
+        entry_key, generation_key, lock_key = self._keys(user_id)
+        deadline = time.monotonic() + self.lock_timeout
+        
+        while True:
+            try:
+                raw, generation = self.client.mget(entry_key, generation_key)
+            except redis.RedisError:
+                return compute()
+            
+            entry = json.loads(raw) if raw else None
+            if entry is not None and entry["generation"] == generation:
+                return AnalyticsSummary.model_validate(entry["summary"])
+            
+            token = uuid.uuid4().hex
+            try:
+                acquired = self.client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+            except redis.RedisError:
+                return compute()
+            
+            if acquired:
+                try:
+                    # The generation was read before computing, so a write that
+                    # lands meanwhile leaves this entry stale rather than lost
+                    summary = compute()
+                    self._store(entry_key, generation, summary)
+                    return summary
+                finally:
+                    self._release(lock_key, token)
+            
+            if entry is not None and self._stale_age(generation) < self.stale_ttl:
+                return AnalyticsSummary.model_validate(entry["summary"])
+            
+            if time.monotonic() >= deadline:
+                # The lock holder is stuck; answer without waiting any longer
+                return compute()
+            time.sleep(self.poll_interval)
+    
+    def invalidate(self, user_id: int):
+        """Mark a user's cached summary stale"""
+        _, generation_key, _ = self._keys(user_id)
+        try:
+            self.client.set(generation_key, self._new_generation(), ex=self.ttl)
+        except redis.RedisError:
+            # Without a new generation the entry would outlive the write, so drop it
+            self._delete(user_id)
+    
+    def generation(self, user_id: int) -> Optional[str]:
+        """The user's current generation, starting one if there is none
+        
+        It changes after every committed write to the user's calculations, so
+        it doubles as the watermark behind conditional GETs. Generations expire
+        with the cache TTL, which bounds how long a write whose invalidation
+        was lost can go unnoticed. None while the cache is disabled or Redis
+        is unreachable.
+        """
+        if not self.enabled:
+            return None
+        
+        _, generation_key, _ = self._keys(user_id)
+        try:
+            generation = self.client.get(generation_key)
+            if generation is None:
+                self.client.set(generation_key, self._new_generation(), nx=True, ex=self.ttl)
+                generation = self.client.get(generation_key)
+        except redis.RedisError:
+            return None
+        return generation
+    
+    def clear(self):
+        """Remove every cached summary"""
+        try:
+            for key in self.client.scan_iter(f"{self.prefix}:*"):
+                self.client.delete(key)
+        except redis.RedisError:
+            pass
+    
+    def _keys(self, user_id: int) -> tuple:
+        base = f"{self.prefix}:{user_id}"
+        return f"{base}:entry", f"{base}:generation", f"{base}:lock"
+    
+    def _store(self, entry_key: str, generation: Optional[str], summary: AnalyticsSummary):
+        """Save a computed summary tagged with the generation it was built from"""
+        entry = {"generation": generation, "summary": summary.model_dump(mode="json")}
+        try:
+            self.client.set(entry_key, json.dumps(entry), ex=self.ttl)
+        except redis.RedisError:
+            pass
+    
+    def _release(self, lock_key: str, token: str):
+        """Release the recompute lock if this request still owns it"""
+        try:
+            if self.client.get(lock_key) == token:
+                self.client.delete(lock_key)
+        except redis.RedisError:
+            pass
+    
+    def _delete(self, user_id: int):
+        """Drop a user's cached entry outright"""
+        try:
+            self.client.delete(self._keys(user_id)[0])
+        except redis.RedisError:
+            pass
+    
+    @staticmethod
+    def _new_generation() -> str:
+        """A generation stamped with the current time in milliseconds"""
+        return f"{int(time.time() * 1000)}:{uuid.uuid4().hex[:8]}"
+    
+    @staticmethod
+    def _stale_age(generation: Optional[str]) -> float:
+        """Seconds since the write that made the current entry stale"""
+        if generation is None:
+            return float("inf")
+        return time.time() - int(generation.split(":")[0]) / 1000
+
+
+summary_cache = SummaryCache(
+    redis_client,
+    ttl=settings.summary_cache_ttl,
+    stale_ttl=settings.summary_cache_stale_ttl,
+    lock_timeout=settings.summary_cache_lock_timeout,
+    enabled=settings.summary_cache_enabled
+)
+
+
+def mark_summary_stale(db: Session, user_id: int):
+    """Invalidate a user's cached summary once db's transaction commits"""
+    db.info.setdefault(_STALE_USERS, set()).add(user_id)
+
+
+# ORM writes are picked up from the flush; bulk statements call
+# mark_summary_stale themselves
+@event.listens_for(Session, "after_flush")
+def _collect_stale_users(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Calculation):
+            user_id = inspect(obj).dict.get("user_id")
+        elif isinstance(obj, User):
+            user_id = inspect(obj).dict.get("id")
+        else:
+            continue
+        if user_id is not None:
+            mark_summary_stale(session, user_id)
+
+
+# Invalidating only after commit keeps a concurrent reader from caching the
+# pre-commit aggregate under the new generation
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop(_STALE_USERS, ())
+    if user_ids:
+        run_after_commit(session, lambda: [summary_cache.invalidate(user_id) for user_id in user_ids])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_STALE_USERS, None)
\ No newline at end of file
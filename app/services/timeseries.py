@@ -0,0 +1,298 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.models.calc_time_bucket import CalcTimeBucket
+from app.models.calculation import Calculation
+from app.schemas.analytics import TimeSeriesPoint
+
+HOUR = "hour"
+DAY = "day"
+
+# Buckets are aligned to multiples of their size counted from the Unix epoch
+EPOCH = datetime(1970, 1, 1)
+
+_BUCKET_PATTERN = re.compile(r"^([1-9]\d*)([hd])$")
+
+
+def parse_bucket(bucket: str) -> timedelta:
+    """Parse a bucket size such as 1h, 6h, 1d or 7d"""
+    match = _BUCKET_PATTERN.match(bucket)
+    if not match:
+        raise ValueError("Bucket must be a number of hours or days, such as 1h, 6h, 1d or 7d")
+    amount, unit = int(match.group(1)), match.group(2)
+    return timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Convert an aware datetime to the naive UTC timestamps stored in the database"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def hour_start(value: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(value: datetime) -> datetime:
+    """Truncate a timestamp to the start of its day"""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class TimeSeriesService:
+    """Keeps hourly and daily calculation buckets and reads series from them"""
+    
+    @staticmethod
+    def add_rows(connection: Connection, rows: Iterable[dict]):
+        """Fold newly inserted calculation rows into their hourly buckets"""
+        
+        deltas: Dict[Tuple[int, datetime, str], list] = defaultdict(lambda: [0, 0.0])
+        for row in rows:
+            if row.get("created_at") is None:
+                continue
+            delta = deltas[(row["user_id"], hour_start(row["created_at"]), row["operation"])]
+            delta[0] += 1
+            delta[1] += row["result"]
+        
+        for (user_id, bucket_start, operation), (count, result_sum) in deltas.items():
+            TimeSeriesService._increment(connection, user_id, HOUR, bucket_start, operation, count, result_sum)
+    
+    @staticmethod
+    def remove_row(
+        connection: Connection,
+        user_id: int,
+        operation: str,
+        result: float,
+        created_at: Optional[datetime]
+    ):
+        """Take a deleted calculation back out of its bucket"""
+        if created_at is None:
+            return
+        
+        # The calculation's hour may already have been compacted into its day
+        for granularity, bucket_start in ((HOUR, hour_start(created_at)), (DAY, day_start(created_at))):
+            key = (
+                (CalcTimeBucket.user_id == user_id)
+                & (CalcTimeBucket.granularity == granularity)
+                & (CalcTimeBucket.bucket_start == bucket_start)
+                & (CalcTimeBucket.operation == operation)
+            )
+            updated = connection.execute(
+                update(CalcTimeBucket).where(key).values(
+                    count=CalcTimeBucket.count - 1,
+                    result_sum=CalcTimeBucket.result_sum - result
+                )
+            ).rowcount
+            if updated:
+                connection.execute(delete(CalcTimeBucket).where(key, CalcTimeBucket.count <= 0))
+                return
+    
+    @staticmethod
+    def clear(connection: Connection, user_id: int):
+        """Drop every bucket for a user"""
+        connection.execute(delete(CalcTimeBucket).where(CalcTimeBucket.user_id == user_id))
+    
+    @staticmethod
+    def get_series(
+        db: Session,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+        bucket: timedelta,
+        operation: Optional[str] = None,
+        max_points: int = 5000
+    ) -> List[TimeSeriesPoint]:
+        """Get per-bucket counts and average results between start and end
+        
+        Stored hourly and daily buckets are summed into the requested bucket
+        size, so reads touch at most one row per stored bucket and operation.
+        Hours that were compacted only resolve to the day they belong to.
+        """
+        
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        if end <= start:
+            raise ValueError("end must be after start")
+        
+        first = EPOCH + ((start - EPOCH) // bucket) * bucket
+        point_count = -((first - end) // bucket)
+        if point_count > max_points:
+            raise ValueError(f"Range covers {point_count} buckets; at most {max_points} are allowed")
+        
+        # Hourly and daily rows are folded together below, so no GROUP BY is needed
+        query = select(
+            CalcTimeBucket.bucket_start,
+            CalcTimeBucket.operation,
+            CalcTimeBucket.count,
+            CalcTimeBucket.result_sum
+        ).where(
+            CalcTimeBucket.user_id == user_id,
+            CalcTimeBucket.granularity.in_((HOUR, DAY)),
+            CalcTimeBucket.bucket_start >= first,
+            CalcTimeBucket.bucket_start < end
+        )
+        if operation:
+            query = query.where(CalcTimeBucket.operation == operation)
+        
+        counts = [0] * point_count
+        sums = [0.0] * point_count
+        operations: List[Dict[str, int]] = [{} for _ in range(point_count)]
+        # Plain Core rows skip the ORM result machinery, which dominates on long ranges
+        for bucket_start, row_operation, count, result_sum in db.connection().execute(query):
+            index = (bucket_start - first) // bucket
+            counts[index] += count
+            sums[index] += result_sum
+            operations[index][row_operation] = operations[index].get(row_operation, 0) + count
+        
+        return [
+            TimeSeriesPoint(
+                bucket_start=first + index * bucket,
+                count=counts[index],
+                average_result=round(sums[index] / counts[index], 4) if counts[index] else None,
+                operations=operations[index]
+            )
+            for index in range(point_count)
+        ]
+    
+    @staticmethod
+    def compact(db: Session, before: datetime) -> int:
+        """Fold hourly buckets from days before the given time into daily buckets
+        
+        The hourly rows are deleted and returned in one statement, so an
+        increment racing with compaction lands in a fresh hourly row that the
+        next run picks up instead of being lost.
+        """
+        
+        cutoff = day_start(to_utc_naive(before))
+        removed = db.execute(
+            delete(CalcTimeBucket).where(
+                CalcTimeBucket.granularity == HOUR,
+                CalcTimeBucket.bucket_start < cutoff
+            ).returning(
+                CalcTimeBucket.user_id,
+                CalcTimeBucket.bucket_start,
+                CalcTimeBucket.operation,
+                CalcTimeBucket.count,
+                CalcTimeBucket.result_sum
+            )
+        ).all()
+        
+        days: Dict[Tuple[int, datetime, str], list] = defaultdict(lambda: [0, 0.0])
+        for user_id, bucket_start, operation, count, result_sum in removed:
+            day = days[(user_id, day_start(bucket_start), operation)]
+            day[0] += count
+            day[1] += result_sum
+        
+        connection = db.connection()
+        for (user_id, bucket_start, operation), (count, result_sum) in days.items():
+            TimeSeriesService._increment(connection, user_id, DAY, bucket_start, operation, count, result_sum)
+        db.commit()
+        
+        return len(removed)
+    
+    @staticmethod
+    def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+        """Recompute hourly buckets from the calculations table, for one user or everyone"""
+        
+        clear = delete(CalcTimeBucket)
+        source = select(
+            Calculation.user_id,
+            Calculation.operation,
+            Calculation.result,
+            Calculation.created_at
+        ).where(Calculation.created_at.isnot(None)).execution_options(yield_per=10000)
+        
+        if user_id is not None:
+            clear = clear.where(CalcTimeBucket.user_id == user_id)
+            source = source.where(Calculation.user_id == user_id)
+        
+        # Truncating timestamps in Python keeps the rebuild portable across databases
+        hours: Dict[Tuple[int, datetime, str], list] = defaultdict(lambda: [0, 0.0])
+        for row_user_id, operation, result, created_at in db.execute(source):
+            hour = hours[(row_user_id, hour_start(created_at), operation)]
+            hour[0] += 1
+            hour[1] += result
+        
+        db.execute(clear)
+        if hours:
+            db.execute(insert(CalcTimeBucket), [
+                {
+                    "user_id": row_user_id,
+                    "granularity": HOUR,
+                    "bucket_start": bucket_start,
+                    "operation": operation,
+                    "count": count,
+                    "result_sum": result_sum
+                }
+                for (row_user_id, bucket_start, operation), (count, result_sum) in hours.items()
+            ])
+        db.commit()
+        
+        return len(hours)
+    
+    @staticmethod
+    def _increment(
+        connection: Connection,
+        user_id: int,
+        granularity: str,
+        bucket_start: datetime,
+        operation: str,
+        count: int,
+        result_sum: float
+    ):
+        """Add to one bucket, creating it if needed"""
+        
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            key = (
+                (CalcTimeBucket.user_id == user_id)
+                & (CalcTimeBucket.granularity == granularity)
+                & (CalcTimeBucket.bucket_start == bucket_start)
+                & (CalcTimeBucket.operation == operation)
+            )
+            updated = connection.execute(
+                update(CalcTimeBucket).where(key).values(
+                    count=CalcTimeBucket.count + count,
+                    result_sum=CalcTimeBucket.result_sum + result_sum
+                )
+            ).rowcount
+            if not updated:
+                connection.execute(insert(CalcTimeBucket).values(
+                    user_id=user_id,
+                    granularity=granularity,
+                    bucket_start=bucket_start,
+                    operation=operation,
+                    count=count,
+                    result_sum=result_sum
+                ))
+            return
+        
+        statement = dialect_insert(CalcTimeBucket).values(
+            user_id=user_id,
+            granularity=granularity,
+            bucket_start=bucket_start,
+            operation=operation,
+            count=count,
+            result_sum=result_sum
+        )
+        excluded = statement.excluded
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[
+                CalcTimeBucket.user_id,
+                CalcTimeBucket.granularity,
+                CalcTimeBucket.bucket_start,
+                CalcTimeBucket.operation
+            ],
+            set_={
+                "count": CalcTimeBucket.count + excluded.count,
+                "result_sum": CalcTimeBucket.result_sum + excluded.result_sum
+            }
+        ))
\ No newline at end of file
@@ -0,0 +1,174 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.calculations import CalculationService
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBufferFull(Exception):
+    """Raised when the write buffer cannot accept another row in time"""
+    pass
+
+
+class CalculationWriteBuffer:
+    """Write-behind queue that bulk inserts calculation rows from a background thread"""
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        put_timeout: float = 0.05,
+        max_retries: int = 3
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+    
+    @property
+    def running(self) -> bool:
+        """Whether the background flusher is running"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    @property
+    def pending(self) -> int:
+        """Approximate number of rows waiting to be written"""
+        return self._queue.qsize()
+    
+    def start(self):
+        """Start the background flusher thread"""
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="calculation-write-buffer", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the flusher and write out every row still queued"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Still writing; draining alongside it would race it for rows,
+                # so the thread writes out the rest once its batch is done
+                logger.warning(
+                    "Calculation write buffer still flushing after %ss; leaving it %d rows",
+                    timeout, self.pending
+                )
+                return
+            self._thread = None
+        self.flush()
+    
+    def submit(self, row: dict):
+        """Queue a calculation row, waiting briefly for space when the queue is full"""
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            raise WriteBufferFull("Calculation write buffer is full")
+    
+    def flush(self) -> int:
+        """Synchronously write every row currently queued"""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+    
+    def _take(self, limit: int) -> List[dict]:
+        """Take up to limit rows from the queue without blocking"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        """Flush whenever a full batch is ready or the oldest row has waited flush_interval"""
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                batch.extend(self._take(self.batch_size - len(batch)))
+            
+            self._write(batch)
+        
+        # Rows queued behind the last batch, including any stop gave up waiting for
+        self.flush()
+    
+    def _write(self, rows: List[dict]) -> int:
+        """Bulk insert rows, retrying transient failures before dropping them
+        
+        A batch rejected by a constraint is split in halves and each written
+        on its own, so only the offending rows are dropped, such as those of
+        a user deleted while they were queued.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            db = self.session_factory()
+            try:
+                CalculationService.bulk_create(db, rows)
+                self.flushed_rows += len(rows)
+                return len(rows)
+            except (IntegrityError, DataError):
+                # Retrying the same rows would fail the same way
+                db.rollback()
+                break
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to flush %d buffered calculations (attempt %d)", len(rows), attempt)
+                if attempt < self.max_retries:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            finally:
+                db.close()
+        else:
+            self.dropped_rows += len(rows)
+            logger.error("Dropped %d buffered calculations after %d attempts", len(rows), self.max_retries)
+            return 0
+        
+        if len(rows) == 1:
+            self.dropped_rows += 1
+            logger.error("Dropped a buffered calculation rejected by the database: %s", rows[0])
+            return 0
+        middle = len(rows) // 2
+        return self._write(rows[:middle]) + self._write(rows[middle:])
+
+
+# Shared buffer used when calculation_persistence is "buffered"
+write_buffer = CalculationWriteBuffer(
+    session_factory=SessionLocal,
+    max_size=settings.write_buffer_max_size,
+    batch_size=settings.write_buffer_batch_size,
+    flush_interval=settings.write_buffer_flush_interval,
+    put_timeout=settings.write_buffer_put_timeout
+)
\ No newline at end of file
@@ -5,6 +5,16 @@ const API_BASE = window.location.origin;
 let currentUser = null;
 let token = localStorage.getItem('token');
 
+// Live updates: while the event stream is open, the summary and history
+// page below are kept current from its events instead of re-fetched
+let summary = null;
+let resultSum = 0;
+let historyPage = null;
+let liveStream = null;
+let liveReady = false;
+let liveEvents = 0;
+let liveRetryDelay = 1000;
+
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
     if (token) {
@@ -113,6 +123,7 @@ async function handleLogout() {
         console.error('Logout error:', error);
     }
     
+    stopLiveUpdates();
     token = null;
     currentUser = null;
     localStorage.removeItem('token');
@@ -132,6 +143,7 @@ async function loadUserData() {
             currentUser = await response.json();
             showAppSection();
             loadDashboard();
+            startLiveUpdates();
         } else {
             handleLogout();
         }
@@ -169,8 +181,8 @@ async function handleCalculation(e) {
             document.getElementById('resultDisplay').classList.remove('hidden');
             showAlert('Calculation completed!', 'success');
             
-            // Refresh history if on history page
-            if (!document.getElementById('historySection').classList.contains('hidden')) {
+            // Without the event stream, refresh history if on history page
+            if (!liveReady && isSectionVisible('history')) {
                 loadHistory();
             }
         } else {
@@ -182,7 +194,13 @@ async function handleCalculation(e) {
 }
 
 // Dashboard
-async function loadDashboard() {
+async function loadDashboard(refresh = false) {
+    if (liveReady && summary && !refresh) {
+        displayAnalytics(summary);
+        return;
+    }
+    
+    const seenEvents = liveEvents;
     try {
         const response = await fetch(`${API_BASE}/analytics/summary`, {
             headers: {
@@ -191,8 +209,13 @@ async function loadDashboard() {
         });
         
         if (response.ok) {
-            const data = await response.json();
-            displayAnalytics(data);
+            summary = await response.json();
+            resultSum = (summary.average_result || 0) * summary.total_calculations;
+            // An event that arrived mid-request may or may not be in the response
+            if (liveEvents !== seenEvents) {
+                return loadDashboard(true);
+            }
+            displayAnalytics(summary);
         }
     } catch (error) {
         console.error('Failed to load analytics:', error);
@@ -217,9 +240,15 @@ function displayAnalytics(data) {
 }
 
 // History
-async function loadHistory(page = 0) {
+async function loadHistory(page = 0, refresh = false) {
+    if (liveReady && historyPage && historyPage.page === page && !refresh) {
+        displayHistoryPage();
+        return;
+    }
+    
     const limit = 10;
     const offset = page * limit;
+    const seenEvents = liveEvents;
     
     try {
         const response = await fetch(
@@ -233,14 +262,22 @@ async function loadHistory(page = 0) {
         
         if (response.ok) {
             const data = await response.json();
-            displayHistory(data.items);
-            setupPagination(data, page);
+            if (liveEvents !== seenEvents) {
+                return loadHistory(page, true);
+            }
+            historyPage = { ...data, page };
+            displayHistoryPage();
         }
     } catch (error) {
         showAlert('Failed to load history', 'error');
     }
 }
 
+function displayHistoryPage() {
+    displayHistory(historyPage.items);
+    setupPagination(historyPage, historyPage.page);
+}
+
 function displayHistory(calculations) {
     const tbody = document.getElementById('historyTableBody');
     
@@ -292,8 +329,10 @@ async function handleClearHistory() {
         
         if (response.ok) {
             showAlert('History cleared successfully', 'success');
-            loadHistory();
-            loadDashboard();
+            if (!liveReady) {
+                loadHistory();
+                loadDashboard();
+            }
         }
     } catch (error) {
         showAlert('Failed to clear history', 'error');
@@ -354,6 +393,10 @@ async function handlePasswordChange(e) {
         });
         
         if (response.ok) {
+            // Every earlier token was revoked; keep this session on the new one
+            const data = await response.json();
+            token = data.access_token;
+            localStorage.setItem('token', token);
             showAlert('Password changed successfully', 'success');
             document.getElementById('passwordForm').reset();
         } else {
@@ -365,7 +408,216 @@ async function handlePasswordChange(e) {
     }
 }
 
+// Live updates
+function startLiveUpdates() {
+    stopLiveUpdates();
+    const controller = new AbortController();
+    liveStream = controller;
+    
+    readLiveEvents(controller)
+        .catch(error => console.error('Live updates interrupted:', error))
+        .finally(() => {
+            if (liveStream !== controller) {
+                return;
+            }
+            // Until the stream is back, views fall back to fetching
+            liveReady = false;
+            setTimeout(() => {
+                if (liveStream === controller) {
+                    startLiveUpdates();
+                }
+            }, liveRetryDelay);
+            liveRetryDelay = Math.min(liveRetryDelay * 2, 30000);
+        });
+}
+
+function stopLiveUpdates() {
+    if (liveStream) {
+        liveStream.abort();
+    }
+    liveStream = null;
+    liveReady = false;
+}
+
+async function readLiveEvents(controller) {
+    // EventSource cannot send the Authorization header, so read the stream directly
+    const response = await fetch(`${API_BASE}/analytics/events`, {
+        headers: {
+            'Authorization': `Bearer ${token}`
+        },
+        signal: controller.signal
+    });
+    
+    if (response.status === 401 || response.status === 404) {
+        // Logged out or live updates disabled: keep fetching instead
+        liveStream = null;
+        return;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            return;
+        }
+        buffer += value;
+        
+        let end;
+        while ((end = buffer.indexOf('\n\n')) >= 0) {
+            const message = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            
+            let type = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    type = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            if (data) {
+                handleLiveEvent(type, JSON.parse(data));
+            }
+        }
+    }
+}
+
+function handleLiveEvent(type, event) {
+    if (type === 'ready') {
+        // Anything written before the stream opened is in a fresh snapshot
+        liveReady = true;
+        liveRetryDelay = 1000;
+        refreshVisibleViews();
+        return;
+    }
+    
+    liveEvents += 1;
+    if (type === 'resync') {
+        refreshVisibleViews();
+        return;
+    }
+    if (type === 'history.cleared') {
+        // An empty summary, not null, so the deltas of later events still apply
+        summary = {
+            total_calculations: 0,
+            operations_breakdown: [],
+            most_used_operation: null,
+            average_result: null,
+            latest_calculation: null
+        };
+        resultSum = 0;
+        historyPage = null;
+        displayAnalytics(summary);
+        if (isSectionVisible('history')) {
+            displayHistory([]);
+            document.getElementById('pagination').innerHTML = '';
+        }
+        return;
+    }
+    
+    if (summary) {
+        applySummaryDelta(event.delta);
+    }
+    if (historyPage) {
+        applyHistoryEvent(type, event.calculations);
+    }
+    if (isSectionVisible('dashboard') && summary) {
+        displayAnalytics(summary);
+    }
+    if (isSectionVisible('history')) {
+        if (historyPage) {
+            displayHistoryPage();
+        } else {
+            loadHistory();
+        }
+    }
+}
+
+function applySummaryDelta(delta) {
+    const counts = {};
+    summary.operations_breakdown.forEach(op => {
+        counts[op.operation] = op.count;
+    });
+    Object.entries(delta.operations).forEach(([operation, count]) => {
+        counts[operation] = (counts[operation] || 0) + count;
+    });
+    
+    const total = summary.total_calculations + delta.count;
+    resultSum = total ? resultSum + delta.result_sum : 0;
+    const breakdown = Object.entries(counts)
+        .filter(([, count]) => count > 0)
+        .map(([operation, count]) => ({
+            operation,
+            count,
+            percentage: Math.round(count / total * 10000) / 100
+        }))
+        .sort((a, b) => b.count - a.count);
+    
+    summary = {
+        ...summary,
+        total_calculations: total,
+        operations_breakdown: breakdown,
+        most_used_operation: breakdown.length ? breakdown[0].operation : null,
+        average_result: total ? Math.round(resultSum / total * 10000) / 10000 : null,
+        latest_calculation: delta.latest_at && !(summary.latest_calculation > delta.latest_at)
+            ? delta.latest_at
+            : summary.latest_calculation
+    };
+}
+
+function applyHistoryEvent(type, calculations) {
+    // Only the first page can absorb a change in place; later pages shift
+    if (!calculations || historyPage.page !== 0) {
+        historyPage = null;
+        return;
+    }
+    
+    const ids = new Set(calculations.map(calc => calc.id));
+    if (type === 'calculation.created') {
+        const newest = [...calculations].sort((a, b) =>
+            b.created_at.localeCompare(a.created_at) || b.id - a.id
+        );
+        historyPage.items = newest.concat(historyPage.items).slice(0, historyPage.limit);
+        historyPage.total += calculations.length;
+    } else if (type === 'calculation.updated') {
+        historyPage.items = historyPage.items.map(calc =>
+            calculations.find(updated => updated.id === calc.id) || calc
+        );
+    } else if (type === 'calculation.deleted') {
+        historyPage.items = historyPage.items.filter(calc => !ids.has(calc.id));
+        historyPage.total -= calculations.length;
+        if (historyPage.items.length < Math.min(historyPage.limit, historyPage.total)) {
+            // A row from the next page moves up, which the event does not carry
+            historyPage = null;
+            return;
+        }
+    }
+    historyPage.has_more = historyPage.total > historyPage.limit;
+}
+
+function refreshVisibleViews() {
+    const page = historyPage ? historyPage.page : 0;
+    summary = null;
+    historyPage = null;
+    if (isSectionVisible('dashboard')) {
+        loadDashboard();
+    }
+    if (isSectionVisible('history')) {
+        loadHistory(page);
+    }
+}
+
 // UI helpers
+function isSectionVisible(sectionName) {
+    const section = document.getElementById(`${sectionName}Section`);
+    return section !== null && !section.classList.contains('hidden');
+}
+
 function showSection(sectionName) {
     document.querySelectorAll('.section').forEach(section => {
         section.classList.add('hidden');
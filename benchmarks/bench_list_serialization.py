@@ -0,0 +1,101 @@
+"""Benchmark the column-tuple + orjson list path against per-row Pydantic validation
+
+Each run loads a page of calculations from an in-memory SQLite database and
+renders the response body, the way GET /analytics/history did before (ORM
+objects, a CalculationResponse per row, then jsonable_encoder and json.dumps
+for response_model=dict) and does now (RESPONSE_COLUMNS tuples encoded by
+orjson).
+
+Usage: python -m benchmarks.bench_list_serialization
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models.calculation import Calculation
+from app.models.user import User
+from app.schemas.calculation import CalculationResponse
+from app.services.calculations import CalculationService, RESPONSE_COLUMNS
+
+SIZES = [100, 10_000]
+
+
+def make_session(count: int):
+    """Create an in-memory database holding count calculations for one user"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    with Session() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        db.bulk_insert_mappings(Calculation, [
+            {
+                "user_id": 1,
+                "operation": "add",
+                "operand1": rng.uniform(-1000, 1000),
+                "operand2": rng.uniform(-1000, 1000),
+                "result": rng.uniform(-2000, 2000),
+                "created_at": start + timedelta(seconds=i, microseconds=rng.randrange(1000000))
+            }
+            for i in range(count)
+        ])
+        db.commit()
+    return Session
+
+
+def validated_page(Session, count: int) -> bytes:
+    """Previous path: ORM objects validated into CalculationResponse models"""
+    with Session() as db:
+        calculations = db.query(Calculation).filter(Calculation.user_id == 1).limit(count).all()
+        items = [
+            CalculationResponse(
+                id=calc.id,
+                user_id=calc.user_id,
+                operation=calc.operation,
+                operand1=calc.operand1,
+                operand2=calc.operand2,
+                result=calc.result,
+                created_at=calc.created_at
+            )
+            for calc in calculations
+        ]
+        return JSONResponse(jsonable_encoder({"items": items, "total": count})).body
+
+
+def tuple_page(Session, count: int) -> bytes:
+    """Current path: plain column tuples encoded by orjson"""
+    with Session() as db:
+        rows = db.query(*RESPONSE_COLUMNS).filter(Calculation.user_id == 1).limit(count).all()
+        return ORJSONResponse({"items": CalculationService.response_items(rows), "total": count}).body
+
+
+def timed(func, *args):
+    """Return the best wall time of five runs"""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'rows':>8} {'validated rows/s':>18} {'tuples rows/s':>15} {'speedup':>8}")
+    for size in SIZES:
+        Session = make_session(size)
+        validated_time = timed(validated_page, Session, size)
+        tuple_time = timed(tuple_page, Session, size)
+        print(
+            f"{size:>8} {size / validated_time:>18,.0f} {size / tuple_time:>15,.0f} "
+            f"{validated_time / tuple_time:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""Benchmark login throughput per core with bcrypt on the hashing process pool
+
+Runs concurrent logins against the real /auth/login route with the password
+hasher configured for 0 (inline), 1 and one-per-CPU worker processes, and
+reports logins/sec overall and per core used. The bcrypt cost defaults to
+settings.password_hash_rounds.
+
+Usage: DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_password_hashing
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import httpx
+from fastapi import FastAPI
+from app.core import security
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.core.passwords import PasswordHasher
+from app.models.user import User
+from app.routes import auth_router
+
+USERNAME = "bench-login"
+PASSWORD = "bench-password"
+
+
+def ensure_user(hasher: PasswordHasher):
+    """Create or reset the benchmark user with a hash at the benchmark's cost"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == USERNAME).first()
+        if user is None:
+            user = User(username=USERNAME, email="bench-login@example.com", hashed_password="")
+            db.add(user)
+        user.hashed_password = hasher.hash(PASSWORD)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_logins(client: httpx.AsyncClient, concurrency: int, logins: int):
+    """Log in from concurrent clients and return (latencies, wall time)"""
+    latencies = []
+    per_client = max(1, logins // concurrency)
+    form = {"username": USERNAME, "password": PASSWORD}
+    
+    async def login_loop():
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = await client.post("/auth/login", data=form)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(login_loop() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def run(rounds: int, logins: int, concurrency: int, worker_counts):
+    app = FastAPI()
+    app.include_router(auth_router)
+    cpus = os.cpu_count() or 1
+    
+    print(f"bcrypt cost {rounds}, {cpus} CPU(s), {concurrency} concurrent clients")
+    print(f"{'workers':>8} {'logins/s':>9} {'per core':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in worker_counts:
+        hasher = PasswordHasher(rounds=rounds, workers=workers, max_pending=concurrency)
+        hasher.start()
+        security.password_hasher = hasher
+        ensure_user(hasher)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                latencies, wall = await run_logins(client, concurrency, logins)
+        finally:
+            hasher.shutdown()
+        
+        # Inline hashing runs on the request threads, which can use every core
+        cores = cpus if workers == 0 else min(workers, cpus)
+        rate = len(latencies) / wall
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+        print(
+            f"{workers:>8} {rate:>9.1f} {rate / cores:>9.1f} "
+            f"{statistics.median(latencies) * 1000:>8.1f} {p99 * 1000:>8.1f}"
+        )
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=settings.password_hash_rounds, help="bcrypt cost factor")
+    parser.add_argument("--logins", type=int, default=64, help="Logins per configuration")
+    parser.add_argument("--concurrency", type=int, default=2 * cpus, help="Concurrent clients")
+    args = parser.parse_args()
+    
+    worker_counts = sorted({0, 1, cpus})
+    asyncio.run(run(args.rounds, args.logins, args.concurrency, worker_counts))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,23 +1,79 @@
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import anyio.to_thread
+from fastapi import FastAPI
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
-from app.routes import auth_router, users_router, calculations_router, analytics_router
+from app.core.config import settings
+from app.core.database import engine, Base, get_async_engine
+from fastapi.concurrency import run_in_threadpool
+from app.core.security import password_hasher, token_blacklist
+from app.core.compression import CompressionMiddleware
+from app.core.load_shedding import LoadSheddingMiddleware, concurrency_limit
+from app.core.rate_limit import rate_limiter
+from app.core.static_assets import STATIC_DIR, AssetManifest, PrecompressedStaticFiles
+from app.routes import (
+    auth_router, users_router, calculations_router, analytics_router,
+    async_auth_router, async_calculations_router, async_analytics_router
+)
+from app.services.calculation_channel import calculation_channels
+from app.services.live_events import event_hub
+from app.services.write_buffer import write_buffer
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and drain them on shutdown"""
+    # The limiter belongs to this event loop, so it is sized once it is running
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    if settings.calculation_persistence == "buffered":
+        write_buffer.start()
+    token_blacklist.start()
+    # Spawning the hashing workers takes a moment; do it before the first login
+    await run_in_threadpool(password_hasher.start)
+    yield
+    await event_hub.close()
+    token_blacklist.stop()
+    password_hasher.shutdown()
+    # Write out every buffered calculation before the process exits
+    write_buffer.stop()
+    if settings.async_database:
+        await get_async_engine().dispose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Advanced Calculator API",
     description="A comprehensive calculator application with JWT authentication, calculation history, and analytics",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
+# Compress innermost, so every other middleware sees the plain response
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+
+# Shed load before requests queue up for threads and database connections;
+# added before CORS so refusals still carry CORS headers
+if settings.load_shedding_enabled:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        limiter=concurrency_limit,
+        critical_paths=settings.load_shedding_critical_paths,
+        bulk_paths=settings.load_shedding_bulk_paths,
+        exempt_paths=settings.load_shedding_exempt_paths
+    )
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,23 +81,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset",
+        "Retry-After", "Idempotent-Replayed", "ETag", "Last-Modified"
+    ],
 )
 
-# Mount static files and templates
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Mount static files and templates; static_url() points pages at the hashed
+# copies written by `python -m app.cli static-build` when they exist
+asset_manifest = AssetManifest.load(STATIC_DIR)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR, manifest=asset_manifest), name="static")
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["static_url"] = asset_manifest.url
+
+# Include routers; the async variants run on the asyncio engine instead of
+# the worker threadpool
+if settings.async_database:
+    app.include_router(async_auth_router)
+    app.include_router(users_router)
+    app.include_router(async_calculations_router)
+    app.include_router(async_analytics_router)
+else:
+    app.include_router(auth_router)
+    app.include_router(users_router)
+    app.include_router(calculations_router)
+    app.include_router(analytics_router)
+
 
-# Include routers
-app.include_router(auth_router)
-app.include_router(users_router)
-app.include_router(calculations_router)
-app.include_router(analytics_router)
+@lru_cache(maxsize=1)
+def render_index() -> str:
+    """Render the main page once; it only changes with the asset manifest"""
+    return templates.get_template("index.html").render()
 
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request):
+async def read_root():
     """Serve the main page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    # Revalidated on every visit so a deploy's new asset URLs are picked up
+    return HTMLResponse(render_index(), headers={"Cache-Control": "no-cache"})
 
 
 @app.get("/health")
@@ -49,7 +126,12 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "message": "Advanced Calculator API is running"
+        "message": "Advanced Calculator API is running",
+        "token_store": token_blacklist.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "concurrency": concurrency_limit.stats(),
+        "live_events": event_hub.stats(),
+        "calculation_channels": calculation_channels.stats()
     }
 
 
@@ -1,4 +1,6 @@
 import pytest
+from app.core.config import settings
+from tests.conftest import requires_redis
 
 
 class TestAnalyticsRoutes:
@@ -25,6 +27,44 @@ class TestAnalyticsRoutes:
         assert data["most_used_operation"] is not None
         assert data["average_result"] is not None
     
+    def test_analytics_summary_refreshes_after_write(self, client, auth_headers, test_calculations):
+        """Test a cached summary is invalidated when the user adds a calculation"""
+        first = client.get("/analytics/summary", headers=auth_headers).json()
+        
+        client.post(
+            "/calculations/",
+            json={"operation": "add", "operand1": 1, "operand2": 1},
+            headers=auth_headers
+        )
+        second = client.get("/analytics/summary", headers=auth_headers).json()
+        
+        assert first["total_calculations"] == 3
+        assert second["total_calculations"] == 4
+    
+    def test_get_calculation_timeseries(self, client, auth_headers, test_calculations):
+        """Test the daily time series counts today's calculations"""
+        response = client.get(
+            "/analytics/timeseries",
+            params={"bucket": "1d"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["bucket"] == "1d"
+        assert sum(point["count"] for point in data["points"]) == 3
+        assert data["points"][-1]["operations"] == {"add": 1, "subtract": 1, "multiply": 1}
+    
+    def test_get_calculation_timeseries_invalid_bucket(self, client, auth_headers):
+        """Test an unsupported bucket size is rejected"""
+        response = client.get(
+            "/analytics/timeseries",
+            params={"bucket": "5m"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 400
+    
     def test_get_calculation_history(self, client, auth_headers, test_calculations):
         """Test getting calculation history"""
         response = client.get("/analytics/history", headers=auth_headers)
@@ -36,6 +76,18 @@ class TestAnalyticsRoutes:
         assert data["total"] == 3
         assert len(data["items"]) == 3
     
+    def test_history_items_match_response_schema(self, client, auth_headers, test_calculations):
+        """Test items encoded from column tuples are what CalculationResponse would produce"""
+        from app.schemas.calculation import CalculationResponse
+        response = client.get("/analytics/history", headers=auth_headers)
+        
+        expected = {
+            calc.id: CalculationResponse.model_validate(calc).model_dump(mode="json")
+            for calc in test_calculations
+        }
+        items = response.json()["items"]
+        assert {item["id"]: item for item in items} == expected
+    
     def test_get_calculation_history_with_filter(self, client, auth_headers, test_calculations):
         """Test getting filtered calculation history"""
         response = client.get(
@@ -62,6 +114,69 @@ class TestAnalyticsRoutes:
         assert data["offset"] == 0
         assert data["has_more"] is True
     
+    def test_get_calculation_history_cursor(self, client, auth_headers, test_calculations):
+        """Test cursor pagination in history"""
+        response = client.get("/analytics/history?limit=2", headers=auth_headers)
+        data = response.json()
+        assert data["next_cursor"] is not None
+        
+        response = client.get(
+            f"/analytics/history?limit=2&cursor={data['next_cursor']}",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        page2 = response.json()
+        assert len(page2["items"]) == 1
+        assert page2["has_more"] is False
+        assert page2["next_cursor"] is None
+        ids = [item["id"] for item in data["items"] + page2["items"]]
+        assert len(set(ids)) == 3
+    
+    def test_get_calculation_history_without_total(self, client, auth_headers, test_calculations):
+        """Test skipping the total count still reports has_more"""
+        response = client.get(
+            "/analytics/history?limit=2&include_total=false",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] is None
+        assert data["has_more"] is True
+        assert len(data["items"]) == 2
+    
+    def test_get_calculation_history_bad_cursor(self, client, auth_headers):
+        """Test a malformed cursor returns 400"""
+        response = client.get("/analytics/history?cursor=garbage", headers=auth_headers)
+        
+        assert response.status_code == 400
+    
+    def test_export_history_csv(self, client, auth_headers, test_calculations):
+        """Test exporting history as CSV"""
+        response = client.get("/analytics/history/export?format=csv", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = response.text.strip().splitlines()
+        assert lines[0] == "id,operation,operand1,operand2,result,created_at"
+        assert len(lines) == 4
+    
+    def test_export_history_ndjson_with_filter(self, client, auth_headers, test_calculations):
+        """Test exporting filtered history as NDJSON"""
+        import json
+        
+        response = client.get(
+            "/analytics/history/export?format=ndjson&operation=multiply",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 1
+        assert rows[0]["operation"] == "multiply"
+        assert rows[0]["result"] == 24
+    
     def test_clear_calculation_history(self, client, auth_headers, test_calculations):
         """Test clearing all calculation history"""
         response = client.delete("/analytics/history", headers=auth_headers)
@@ -73,4 +188,64 @@ class TestAnalyticsRoutes:
         # Verify history is empty
         response = client.get("/analytics/history", headers=auth_headers)
         data = response.json()
-        assert data["total"] == 0
\ No newline at end of file
+        assert data["total"] == 0
+    
+    def test_live_events_disabled(self, client, auth_headers, monkeypatch):
+        """Test the event stream needs a login and answers 404 when turned off"""
+        monkeypatch.setattr(settings, "live_events_enabled", False)
+        
+        assert client.get("/analytics/events").status_code == 401
+        assert client.get("/analytics/events", headers=auth_headers).status_code == 404
+
+
+@requires_redis
+class TestAnalyticsConditionalRoutes:
+    """Integration tests for ETag revalidation of analytics reads"""
+    
+    @pytest.mark.parametrize("path", ["/analytics/summary", "/analytics/history"])
+    def test_unchanged_read_is_not_modified(self, client, auth_headers, test_calculations, path):
+        """Test repeating a read with its ETag gets 304 and no body"""
+        first = client.get(path, headers=auth_headers)
+        etag = first.headers["ETag"]
+        
+        again = client.get(path, headers={**auth_headers, "If-None-Match": etag})
+        
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert "Last-Modified" in first.headers
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+    
+    def test_write_changes_etag(self, client, auth_headers, test_calculations):
+        """Test a new calculation makes the old ETag stale"""
+        etag = client.get("/analytics/summary", headers=auth_headers).headers["ETag"]
+        client.post(
+            "/calculations/",
+            headers=auth_headers,
+            json={"operation": "add", "operand1": 1, "operand2": 1}
+        )
+        
+        response = client.get("/analytics/summary", headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == 200
+        assert response.json()["total_calculations"] == len(test_calculations) + 1
+        assert response.headers["ETag"] != etag
+    
+    def test_clear_changes_etag(self, client, auth_headers, test_calculations):
+        """Test clearing history makes the old ETag stale"""
+        etag = client.get("/analytics/history", headers=auth_headers).headers["ETag"]
+        client.delete("/analytics/history", headers=auth_headers)
+        
+        response = client.get("/analytics/history", headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == 200
+        assert response.json()["items"] == []
+    
+    def test_etags_differ_per_endpoint(self, client, auth_headers, test_calculations):
+        """Test one endpoint's ETag does not validate another's"""
+        etag = client.get("/analytics/summary", headers=auth_headers).headers["ETag"]
+        
+        response = client.get("/analytics/history", headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == 200
\ No newline at end of file
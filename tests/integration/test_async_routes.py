@@ -0,0 +1,203 @@
+import asyncio
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.database import OffloadingAsyncSession, async_database_url, get_async_db
+from app.routes import async_auth_router, async_calculations_router, async_analytics_router
+from app.services.summary_cache import summary_cache
+from tests.conftest import TEST_DATABASE_URL, requires_redis
+
+
+@pytest.fixture
+def async_engine(db_session):
+    """Asyncio engine on the test database; NullPool keeps connections off the client's loop"""
+    engine = create_async_engine(async_database_url(TEST_DATABASE_URL), poolclass=NullPool)
+    yield engine
+    engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def async_client(async_engine):
+    """Test client for an app serving the async routers"""
+    app = FastAPI()
+    app.include_router(async_auth_router)
+    app.include_router(async_calculations_router)
+    app.include_router(async_analytics_router)
+    
+    sessions = async_sessionmaker(
+        async_engine,
+        class_=OffloadingAsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    
+    async def override_get_async_db():
+        async with sessions() as db:
+            yield db
+    
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    summary_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def async_headers(async_client, test_user):
+    """Authorization headers obtained through the async login route"""
+    response = async_client.post(
+        "/auth/login",
+        data={"username": "testuser", "password": "testpass123"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class TestAsyncRoutes:
+    """Integration tests for the async database routers"""
+    
+    def test_register_and_me(self, async_client):
+        """Test registering, logging in and reading the profile"""
+        response = async_client.post(
+            "/auth/register",
+            json={"username": "asyncuser", "email": "async@example.com", "password": "asyncpass1"}
+        )
+        assert response.status_code == 201
+        
+        token = async_client.post(
+            "/auth/login",
+            data={"username": "asyncuser", "password": "asyncpass1"}
+        ).json()["access_token"]
+        response = async_client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+        
+        assert response.status_code == 200
+        assert response.json()["username"] == "asyncuser"
+    
+    def test_calculation_crud(self, async_client, async_headers):
+        """Test create, read, update, list and delete"""
+        response = async_client.post(
+            "/calculations/",
+            json={"operation": "add", "operand1": 2, "operand2": 3},
+            headers=async_headers
+        )
+        assert response.status_code == 201
+        assert response.json()["result"] == 5
+        
+        calculations = async_client.get("/calculations/", headers=async_headers).json()
+        assert len(calculations) == 1
+        calculation_id = calculations[0]["id"]
+        
+        response = async_client.put(
+            f"/calculations/{calculation_id}",
+            json={"operation": "multiply", "operand1": 4, "operand2": 5},
+            headers=async_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["result"] == 20
+        
+        response = async_client.delete(f"/calculations/{calculation_id}", headers=async_headers)
+        assert response.status_code == 204
+        response = async_client.get(f"/calculations/{calculation_id}", headers=async_headers)
+        assert response.status_code == 404
+    
+    @requires_redis
+    def test_idempotent_retry_is_replayed(self, async_client, async_headers):
+        """Test a retried create with the same Idempotency-Key saves one calculation"""
+        headers = {**async_headers, "Idempotency-Key": uuid.uuid4().hex}
+        payload = {"operation": "subtract", "operand1": 9, "operand2": 4}
+        
+        first = async_client.post("/calculations/", json=payload, headers=headers)
+        retry = async_client.post("/calculations/", json=payload, headers=headers)
+        
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert len(async_client.get("/calculations/", headers=async_headers).json()) == 1
+    
+    @requires_redis
+    def test_not_modified_history_skips_pool(self, async_client, async_headers, async_engine):
+        """Test a revalidated history page is answered without checking out a connection"""
+        etag = async_client.get("/analytics/history", headers=async_headers).headers["ETag"]
+        checkouts = []
+        event.listen(async_engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+        
+        response = async_client.get("/analytics/history", headers={**async_headers, "If-None-Match": etag})
+        
+        assert response.status_code == 304
+        assert checkouts == []
+    
+    def test_batch_history_and_summary(self, async_client, async_headers):
+        """Test the service-backed routes reached through run_sync"""
+        response = async_client.post(
+            "/calculations/batch",
+            json={"items": [
+                {"operation": "add", "operand1": 1, "operand2": 1},
+                {"operation": "subtract", "operand1": 9, "operand2": 4},
+                {"operation": "divide", "operand1": 1, "operand2": 0}
+            ]},
+            headers=async_headers
+        )
+        assert response.status_code == 201
+        assert response.json()["succeeded"] == 2
+        
+        history = async_client.get("/analytics/history", headers=async_headers).json()
+        assert history["total"] == 2
+        
+        summary = async_client.get("/analytics/summary", headers=async_headers).json()
+        assert summary["total_calculations"] == 2
+        
+        response = async_client.get("/analytics/history/export?format=ndjson", headers=async_headers)
+        assert response.status_code == 200
+        assert len(response.text.strip().splitlines()) == 2
+        
+        response = async_client.delete("/analytics/history", headers=async_headers)
+        assert response.json()["deleted_count"] == 2
+    
+    def test_logout_all_revokes_cached_tokens(self, async_client, async_headers):
+        """Test logging out everywhere rejects a token whose principal was cached"""
+        assert async_client.get("/auth/me", headers=async_headers).status_code == 200
+        
+        assert async_client.post("/auth/logout-all", headers=async_headers).status_code == 200
+        
+        assert async_client.get("/calculations/", headers=async_headers).status_code == 401
+    
+    def test_cached_principal_skips_pool(self, async_client, async_headers, async_engine):
+        """Test that requests answered before any query never check out a connection"""
+        # One authenticated request caches the principal
+        async_client.get("/calculations/", headers=async_headers)
+        checkouts = []
+        event.listen(async_engine.sync_engine, "connect", lambda *args: checkouts.append(1))
+        
+        response = async_client.get("/calculations/999999", headers={"Authorization": "Bearer bogus"})
+        assert response.status_code == 401
+        assert checkouts == []
+        
+        async_client.post("/auth/logout", headers=async_headers)
+        assert checkouts == []
+    
+    def test_after_commit_work_runs_off_the_event_loop(self, async_client, async_headers, monkeypatch):
+        """Test Redis work due after a commit runs in the threadpool, for awaited and run_sync commits"""
+        calls = []
+        
+        def invalidate(user_id):
+            try:
+                asyncio.get_running_loop()
+                calls.append("event loop")
+            except RuntimeError:
+                calls.append("threadpool")
+        
+        monkeypatch.setattr(summary_cache, "invalidate", invalidate)
+        async_client.post(
+            "/calculations/",
+            json={"operation": "add", "operand1": 2, "operand2": 3},
+            headers=async_headers
+        )
+        async_client.post(
+            "/calculations/batch",
+            json={"items": [{"operation": "add", "operand1": 1, "operand2": 1}]},
+            headers=async_headers
+        )
+        
+        assert calls == ["threadpool", "threadpool"]
\ No newline at end of file
@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 
 
 class TestAuthRoutes:
@@ -114,4 +115,107 @@ class TestAuthRoutes:
         
         # Subsequent requests with same token should fail
         response = client.get("/auth/me", headers=auth_headers)
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+    
+    def test_cached_principal_skips_users_table(self, client, auth_headers, db_session):
+        """Test id-only routes answer a cached token without querying users"""
+        client.get("/calculations/", headers=auth_headers)
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db_session.get_bind(), "before_cursor_execute", record)
+        try:
+            response = client.get("/calculations/", headers=auth_headers)
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", record)
+        
+        assert response.status_code == 200
+        assert statements
+        assert not any("FROM users" in statement for statement in statements)
+    
+    def test_username_change_invalidates_cached_token(self, client, auth_headers):
+        """Test a token stops working once its username changes"""
+        assert client.get("/calculations/", headers=auth_headers).status_code == 200
+        
+        response = client.put("/users/profile", headers=auth_headers, json={"username": "renameduser"})
+        assert response.status_code == 200
+        
+        assert client.get("/calculations/", headers=auth_headers).status_code == 401
+    
+    def test_account_deletion_invalidates_cached_token(self, client, auth_headers):
+        """Test a cached token is rejected after the account is deleted"""
+        assert client.get("/calculations/", headers=auth_headers).status_code == 200
+        
+        assert client.delete("/users/profile", headers=auth_headers).status_code == 204
+        
+        assert client.get("/calculations/", headers=auth_headers).status_code == 401
+    
+    def test_logout_all_revokes_every_session(self, client, auth_headers):
+        """Test logging out everywhere rejects all of the user's tokens"""
+        other_token = client.post(
+            "/auth/login",
+            data={"username": "testuser", "password": "testpass123"}
+        ).json()["access_token"]
+        other_headers = {"Authorization": f"Bearer {other_token}"}
+        assert client.get("/calculations/", headers=other_headers).status_code == 200
+        
+        response = client.post("/auth/logout-all", headers=auth_headers)
+        assert response.status_code == 200
+        
+        assert client.get("/calculations/", headers=auth_headers).status_code == 401
+        assert client.get("/calculations/", headers=other_headers).status_code == 401
+        
+        response = client.post(
+            "/auth/login",
+            data={"username": "testuser", "password": "testpass123"}
+        )
+        new_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        assert client.get("/calculations/", headers=new_headers).status_code == 200
+    
+    def test_password_change_revokes_old_tokens(self, client, auth_headers):
+        """Test a password change returns a fresh token and revokes the old ones"""
+        response = client.post(
+            "/users/change-password",
+            headers=auth_headers,
+            json={"current_password": "testpass123", "new_password": "newpass456"}
+        )
+        assert response.status_code == 200
+        new_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        
+        assert client.get("/auth/me", headers=auth_headers).status_code == 401
+        assert client.get("/auth/me", headers=new_headers).status_code == 200
+    
+    def test_login_upgrades_legacy_password_hash(self, client, test_user, db_session):
+        """Test logging in with a SHA-256 hashed password stores a bcrypt hash"""
+        assert len(test_user.hashed_password) == 64
+        
+        response = client.post(
+            "/auth/login",
+            data={"username": "testuser", "password": "testpass123"}
+        )
+        assert response.status_code == 200
+        
+        db_session.refresh(test_user)
+        assert test_user.hashed_password.startswith("$2b$")
+        response = client.post(
+            "/auth/login",
+            data={"username": "testuser", "password": "testpass123"}
+        )
+        assert response.status_code == 200    
+    def test_login_is_rate_limited_per_ip(self, client, test_user, rate_limits):
+        """Test logins beyond the limit are refused with 429 and Retry-After"""
+        rate_limits("auth:login", "2/minute")
+        credentials = {"username": "testuser", "password": "testpass123"}
+        
+        first = client.post("/auth/login", data=credentials)
+        second = client.post("/auth/login", data=credentials)
+        refused = client.post("/auth/login", data=credentials)
+        
+        assert first.status_code == second.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert [first.headers["X-RateLimit-Remaining"], second.headers["X-RateLimit-Remaining"]] == ["1", "0"]
+        assert refused.status_code == 429
+        assert refused.headers["X-RateLimit-Remaining"] == "0"
+        assert 1 <= int(refused.headers["Retry-After"]) <= 30
\ No newline at end of file
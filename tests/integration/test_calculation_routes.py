@@ -1,9 +1,11 @@
+import uuid
 import pytest
+from tests.conftest import requires_redis
 
 @pytest.mark.skip(reason="Redis token validation issue in CI")
 class TestCalculationRoutes:
     """Integration tests for calculation routes"""
-
+    
     @pytest.mark.skip(reason="Redis token validation issue in CI")
     def test_create_calculation_add(self, client, auth_headers, test_user):
         """Test creating addition calculation"""
@@ -158,4 +160,432 @@ class TestCalculationRoutes:
         
         # Verify deletion
         response = client.get(f"/calculations/{calc_id}", headers=auth_headers)
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+
+class TestCalculationRateLimit:
+    """Integration tests for per-user rate limits on calculation writes"""
+    
+    def test_create_is_rate_limited_per_user(self, client, auth_headers, rate_limits):
+        """Test one user's exhausted limit leaves other users unaffected"""
+        rate_limits("calculations:create", "2/minute")
+        payload = {"operation": "add", "operand1": 1, "operand2": 2}
+        
+        statuses = [
+            client.post("/calculations/", headers=auth_headers, json=payload).status_code
+            for _ in range(3)
+        ]
+        assert statuses == [201, 201, 429]
+        
+        client.post(
+            "/auth/register",
+            json={"username": "otheruser", "email": "other@example.com", "password": "otherpass123"}
+        )
+        token = client.post(
+            "/auth/login",
+            data={"username": "otheruser", "password": "otherpass123"}
+        ).json()["access_token"]
+        response = client.post("/calculations/", headers={"Authorization": f"Bearer {token}"}, json=payload)
+        
+        assert response.status_code == 201
+        assert response.headers["X-RateLimit-Remaining"] == "1"
+
+
+@requires_redis
+class TestCalculationIdempotency:
+    """Integration tests for Idempotency-Key on calculation creation"""
+    
+    def test_retry_with_key_creates_one_calculation(self, client, auth_headers, db_session):
+        """Test a retried request is answered from the first response without a second row"""
+        from app.models.calculation import Calculation
+        headers = {**auth_headers, "Idempotency-Key": uuid.uuid4().hex}
+        payload = {"operation": "multiply", "operand1": 6, "operand2": 7}
+        
+        first = client.post("/calculations/", headers=headers, json=payload)
+        retry = client.post("/calculations/", headers=headers, json=payload)
+        
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert "Idempotent-Replayed" not in first.headers
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert db_session.query(Calculation).count() == 1
+    
+    def test_key_reused_with_other_request(self, client, auth_headers):
+        """Test sending a key with a different body is refused"""
+        headers = {**auth_headers, "Idempotency-Key": uuid.uuid4().hex}
+        client.post("/calculations/", headers=headers, json={"operation": "add", "operand1": 1, "operand2": 2})
+        
+        response = client.post("/calculations/", headers=headers, json={"operation": "add", "operand1": 1, "operand2": 3})
+        
+        assert response.status_code == 422
+    
+    def test_failed_request_can_be_retried(self, client, auth_headers):
+        """Test an error response is not replayed to the retry"""
+        headers = {**auth_headers, "Idempotency-Key": uuid.uuid4().hex}
+        payload = {"operation": "power", "operand1": -8, "operand2": 0.5}
+        
+        assert client.post("/calculations/", headers=headers, json=payload).status_code == 400
+        retry = client.post("/calculations/", headers=headers, json=payload)
+        
+        assert retry.status_code == 400
+        assert "Idempotent-Replayed" not in retry.headers
+    
+    def test_keyed_request_skips_the_write_buffer(self, client, auth_headers, db_session, monkeypatch):
+        """Test a response that will be replayed is only sent once its row is saved"""
+        from app.core.config import settings
+        from app.models.calculation import Calculation
+        from app.services.write_buffer import CalculationWriteBuffer
+        from tests.conftest import TestingSessionLocal
+        import app.routes.calculations as calculations_routes
+        
+        buffer = CalculationWriteBuffer(TestingSessionLocal)
+        monkeypatch.setattr(settings, "calculation_persistence", "buffered")
+        monkeypatch.setattr(calculations_routes, "write_buffer", buffer)
+        headers = {**auth_headers, "Idempotency-Key": uuid.uuid4().hex}
+        
+        response = client.post("/calculations/", headers=headers, json={"operation": "add", "operand1": 2, "operand2": 3})
+        
+        assert response.status_code == 201
+        assert response.json()["message"] == "Calculation completed and saved successfully"
+        assert buffer.pending == 0
+        assert db_session.query(Calculation).count() == 1
+
+
+class TestCalculationBatchRoutes:
+    """Integration tests for the batch calculation route"""
+    
+    def test_create_batch(self, client, auth_headers, db_session, test_user):
+        """Test creating a batch of calculations"""
+        from app.models.calculation import Calculation
+        
+        response = client.post(
+            "/calculations/batch",
+            headers=auth_headers,
+            json={
+                "items": [
+                    {"operation": "add", "operand1": 10, "operand2": 5},
+                    {"operation": "multiply", "operand1": 4, "operand2": 6},
+                    {"operation": "power", "operand1": 2, "operand2": 3}
+                ]
+            }
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert data["total"] == 3
+        assert data["succeeded"] == 3
+        assert data["failed"] == 0
+        assert [item["result"] for item in data["results"]] == [15, 24, 8]
+        
+        saved = db_session.query(Calculation).filter(
+            Calculation.user_id == test_user.id
+        ).count()
+        assert saved == 3
+    
+    def test_create_batch_reports_item_errors(self, client, auth_headers, db_session, test_user):
+        """Test that invalid items fail individually without failing the batch"""
+        from app.models.calculation import Calculation
+        
+        response = client.post(
+            "/calculations/batch",
+            headers=auth_headers,
+            json={
+                "items": [
+                    {"operation": "add", "operand1": 1, "operand2": 2},
+                    {"operation": "divide", "operand1": 10, "operand2": 0},
+                    {"operation": "sqrt", "operand1": 4, "operand2": 0},
+                    {"operation": "subtract", "operand1": 9, "operand2": 3}
+                ]
+            }
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        assert data["results"][0]["success"] is True
+        assert data["results"][1]["success"] is False
+        assert "Cannot divide by zero" in data["results"][1]["error"]
+        assert data["results"][2]["success"] is False
+        assert data["results"][3]["result"] == 6
+        
+        saved = db_session.query(Calculation).filter(
+            Calculation.user_id == test_user.id
+        ).count()
+        assert saved == 2
+    
+    def test_create_batch_empty(self, client, auth_headers):
+        """Test that an empty batch is rejected"""
+        response = client.post(
+            "/calculations/batch",
+            headers=auth_headers,
+            json={"items": []}
+        )
+        
+        assert response.status_code == 422
+
+class TestBufferedCalculationRoutes:
+    """Integration tests for write-behind calculation persistence"""
+    
+    def test_create_calculation_buffered(self, client, auth_headers, db_session, test_user, monkeypatch):
+        """Test buffered mode returns immediately and saves on flush"""
+        from app.core.config import settings
+        from app.models.calculation import Calculation
+        from app.services.write_buffer import CalculationWriteBuffer
+        from tests.conftest import TestingSessionLocal
+        import app.routes.calculations as calculations_routes
+        
+        buffer = CalculationWriteBuffer(TestingSessionLocal)
+        monkeypatch.setattr(settings, "calculation_persistence", "buffered")
+        monkeypatch.setattr(calculations_routes, "write_buffer", buffer)
+        
+        response = client.post(
+            "/calculations/",
+            headers=auth_headers,
+            json={"operation": "add", "operand1": 2, "operand2": 3}
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["result"] == 5
+        assert buffer.pending == 1
+        
+        buffer.flush()
+        
+        saved = db_session.query(Calculation).filter(
+            Calculation.user_id == test_user.id
+        ).count()
+        assert saved == 1
+    
+    def test_create_calculation_buffer_full(self, client, auth_headers, monkeypatch):
+        """Test a full buffer sheds load with 503 and Retry-After"""
+        from app.core.config import settings
+        from app.services.write_buffer import CalculationWriteBuffer
+        from tests.conftest import TestingSessionLocal
+        import app.routes.calculations as calculations_routes
+        
+        buffer = CalculationWriteBuffer(TestingSessionLocal, max_size=1, put_timeout=0.01)
+        buffer.submit({})
+        monkeypatch.setattr(settings, "calculation_persistence", "buffered")
+        monkeypatch.setattr(calculations_routes, "write_buffer", buffer)
+        
+        response = client.post(
+            "/calculations/",
+            headers=auth_headers,
+            json={"operation": "add", "operand1": 2, "operand2": 3}
+        )
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+class TestCalculationCursorRoutes:
+    """Integration tests for cursor pagination of calculations"""
+    
+    def test_get_all_calculations_cursor(self, client, auth_headers, test_calculations):
+        """Test browsing calculations page by page with X-Next-Cursor"""
+        response = client.get("/calculations/?limit=2", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        cursor = response.headers["X-Next-Cursor"]
+        
+        response = client.get(f"/calculations/?limit=2&cursor={cursor}", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        assert "X-Next-Cursor" not in response.headers
+
+@requires_redis
+class TestCalculationConditionalRoutes:
+    """Integration tests for ETag revalidation of calculation reads"""
+    
+    def test_unchanged_list_is_not_modified(self, client, auth_headers, test_calculations):
+        """Test the list answers 304 until one of the user's calculations changes"""
+        etag = client.get("/calculations/", headers=auth_headers).headers["ETag"]
+        conditional = {**auth_headers, "If-None-Match": etag}
+        
+        assert client.get("/calculations/", headers=conditional).status_code == 304
+        
+        client.delete(f"/calculations/{test_calculations[0].id}", headers=auth_headers)
+        response = client.get("/calculations/", headers=conditional)
+        
+        assert response.status_code == 200
+        assert len(response.json()) == len(test_calculations) - 1
+    
+    def test_single_read_is_not_modified(self, client, auth_headers, test_calculations):
+        """Test a calculation read answers 304 to its own ETag"""
+        path = f"/calculations/{test_calculations[0].id}"
+        etag = client.get(path, headers=auth_headers).headers["ETag"]
+        
+        response = client.get(path, headers={**auth_headers, "If-None-Match": f'"other", {etag}'})
+        
+        assert response.status_code == 304
+
+
+class TestCalculationImportRoutes:
+    """Integration tests for streaming calculation imports"""
+    
+    def test_import_csv(self, client, auth_headers, db_session, test_user):
+        """Test importing CSV with a mix of valid and invalid rows"""
+        from app.models.calculation import Calculation
+        
+        body = (
+            "operation,operand1,operand2,created_at\n"
+            "add,1,2,2024-01-01T10:00:00\n"
+            "divide,1,0,\n"
+            "multiply,3,4,\n"
+            "bogus,1,1,\n"
+        )
+        response = client.post(
+            "/calculations/import",
+            headers={**auth_headers, "Content-Type": "text/csv"},
+            content=body.encode()
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert data["accepted"] == 2
+        assert data["rejected"] == 2
+        assert [error["line"] for error in data["errors"]] == [3, 5]
+        
+        saved = db_session.query(Calculation).filter(
+            Calculation.user_id == test_user.id
+        ).order_by(Calculation.created_at).all()
+        assert [calc.result for calc in saved] == [3, 12]
+        assert saved[0].created_at.year == 2024
+    
+    def test_import_csv_with_byte_order_mark(self, client, auth_headers, db_session, test_user):
+        """Test a CSV saved by Excel, starting with a UTF-8 BOM, keeps its first column"""
+        from app.models.calculation import Calculation
+        
+        body = "operation,operand1,operand2\nadd,1,2\nmultiply,3,4\n"
+        response = client.post(
+            "/calculations/import",
+            headers={**auth_headers, "Content-Type": "text/csv"},
+            content=body.encode("utf-8-sig")
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["accepted"] == 2
+        assert db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count() == 2
+    
+    def test_import_ndjson_in_chunks(self, client, auth_headers, db_session, test_user, monkeypatch):
+        """Test NDJSON imports are inserted chunk by chunk"""
+        from app.core.config import settings
+        from app.models.calculation import Calculation
+        
+        monkeypatch.setattr(settings, "import_chunk_size", 2)
+        lines = [
+            '{"operation": "add", "operand1": %d, "operand2": 1}' % i
+            for i in range(5)
+        ]
+        response = client.post(
+            "/calculations/import?format=ndjson",
+            headers=auth_headers,
+            content=("\n".join(lines) + "\nnot json\n").encode()
+        )
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert data["accepted"] == 5
+        assert data["rejected"] == 1
+        
+        saved = db_session.query(Calculation).filter(
+            Calculation.user_id == test_user.id
+        ).count()
+        assert saved == 5
+    
+    def test_import_normalizes_timestamps_to_utc(self, client, auth_headers, db_session, test_user):
+        """Test naive, Z and offset timestamps are stored and bucketed as naive UTC"""
+        from datetime import datetime
+        from app.models.calc_time_bucket import CalcTimeBucket
+        from app.models.calculation import Calculation
+        
+        lines = [
+            '{"operation": "add", "operand1": 1, "operand2": 1, "created_at": "2024-01-01T10:30:00"}',
+            '{"operation": "add", "operand1": 2, "operand2": 1, "created_at": "2024-01-01T11:30:00Z"}',
+            '{"operation": "add", "operand1": 3, "operand2": 1, "created_at": "2024-01-01T14:30:00+02:00"}'
+        ]
+        response = client.post(
+            "/calculations/import?format=ndjson",
+            headers=auth_headers,
+            content="\n".join(lines).encode()
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["accepted"] == 3
+        
+        stored = db_session.query(Calculation.operand1, Calculation.created_at).filter(
+            Calculation.user_id == test_user.id
+        ).order_by(Calculation.operand1).all()
+        assert [created_at for _, created_at in stored] == [
+            datetime(2024, 1, 1, 10, 30),
+            datetime(2024, 1, 1, 11, 30),
+            datetime(2024, 1, 1, 12, 30)
+        ]
+        buckets = db_session.query(CalcTimeBucket.bucket_start, CalcTimeBucket.count).filter(
+            CalcTimeBucket.user_id == test_user.id,
+            CalcTimeBucket.granularity == "hour"
+        ).order_by(CalcTimeBucket.bucket_start).all()
+        assert buckets == [
+            (datetime(2024, 1, 1, 10), 1),
+            (datetime(2024, 1, 1, 11), 1),
+            (datetime(2024, 1, 1, 12), 1)
+        ]
+    
+    def test_import_unknown_content_type(self, client, auth_headers):
+        """Test uploads without a recognizable format are rejected"""
+        response = client.post(
+            "/calculations/import",
+            headers={**auth_headers, "Content-Type": "application/octet-stream"},
+            content=b"add,1,2"
+        )
+        
+        assert response.status_code == 415
+
+class TestCalculationChannelRoutes:
+    """Integration tests for the WebSocket calculation channel"""
+    
+    def test_pipelined_calculations(self, client, auth_headers, db_session, test_user):
+        """Test messages sent without waiting are answered by id and saved"""
+        from app.models.calculation import Calculation
+        
+        with client.websocket_connect("/calculations/ws", headers=auth_headers) as websocket:
+            assert websocket.receive_json()["type"] == "ready"
+            websocket.send_json({"id": "a", "operation": "add", "operand1": 10, "operand2": 5})
+            websocket.send_json({"id": "b", "operation": "divide", "operand1": 1, "operand2": 0})
+            websocket.send_json({"id": 3, "operation": "multiply", "operand1": 4, "operand2": 6})
+            
+            replies = {}
+            while len(replies) < 3:
+                message = websocket.receive_json()
+                assert message["type"] == "results"
+                replies.update((reply["id"], reply) for reply in message["results"])
+            
+            websocket.send_json({"type": "stats"})
+            stats = websocket.receive_json()
+        
+        assert replies["a"]["result"] == 15
+        assert replies["b"]["error"].endswith("Cannot divide by zero")
+        assert replies[3]["result"] == 24
+        assert stats["received"] == 3 and stats["succeeded"] == 2 and stats["in_flight"] == 0
+        
+        saved = db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count()
+        assert saved == 2
+    
+    def test_authenticates_with_first_message(self, client, auth_token):
+        """Test clients that cannot set headers send their token in an auth message"""
+        with client.websocket_connect("/calculations/ws") as websocket:
+            websocket.send_json({"type": "auth", "token": auth_token})
+            
+            assert websocket.receive_json()["type"] == "ready"
+    
+    def test_rejects_invalid_token(self, client):
+        """Test a connection with a bad token is closed with a policy violation"""
+        from starlette.websockets import WebSocketDisconnect
+        
+        with client.websocket_connect("/calculations/ws") as websocket:
+            websocket.send_json({"type": "auth", "token": "not-a-token"})
+            
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+        
+        assert closed.value.code == 1008
\ No newline at end of file
@@ -1,6 +1,18 @@
+import asyncio
+import importlib.util
 import pytest
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from app.core.database import async_database_url
 from app.services.analytics import AnalyticsService
 from app.models.calculation import Calculation
+from tests.conftest import TEST_DATABASE_URL
+
+requires_asyncpg = pytest.mark.skipif(
+    importlib.util.find_spec("asyncpg") is None or not TEST_DATABASE_URL.startswith("postgresql"),
+    reason="asyncpg and a PostgreSQL test database are required"
+)
 
 
 class TestAnalyticsService:
@@ -74,4 +86,90 @@ class TestAnalyticsService:
         remaining = db_session.query(Calculation).filter(
             Calculation.user_id == test_user.id
         ).count()
-        assert remaining == 0
\ No newline at end of file
+        assert remaining == 0
+    
+    def test_get_calculation_history_cursor(self, db_session, test_user, test_calculations):
+        """Test keyset pagination walks every row exactly once"""
+        from app.services.pagination import next_cursor
+        
+        page1, total, has_more = AnalyticsService.get_history_page(
+            db_session, test_user.id, limit=2
+        )
+        cursor = next_cursor(page1, has_more)
+        assert total == 3
+        assert cursor is not None
+        
+        page2, _, has_more = AnalyticsService.get_history_page(
+            db_session, test_user.id, limit=2, cursor=cursor
+        )
+        
+        assert len(page2) == 1
+        assert has_more is False
+        seen = {calc.id for calc in page1 + page2}
+        assert seen == {calc.id for calc in test_calculations}
+    
+    def test_get_history_page_without_total(self, db_session, test_user, test_calculations):
+        """Test has_more is known without counting rows"""
+        calculations, total, has_more = AnalyticsService.get_history_page(
+            db_session, test_user.id, limit=3, total_mode="none"
+        )
+        
+        assert total is None
+        assert len(calculations) == 3
+        assert has_more is False
+    
+    def test_get_history_page_estimated_total(self, db_session, test_user, test_calculations):
+        """Test estimated totals are cached per filter set"""
+        from app.services.analytics import _history_count_cache
+        _history_count_cache.clear()
+        
+        _, total, _ = AnalyticsService.get_history_page(
+            db_session, test_user.id, operation="add", total_mode="estimated"
+        )
+        assert total == 1
+        
+        db_session.add(Calculation(user_id=test_user.id, operation="add", operand1=1, operand2=1, result=2))
+        db_session.commit()
+        
+        _, cached_total, _ = AnalyticsService.get_history_page(
+            db_session, test_user.id, operation="add", total_mode="estimated"
+        )
+        assert cached_total == 1
+    
+    def test_explain_statement_uses_positional_params_for_asyncpg(self, db_session, test_user):
+        """Test the EXPLAIN for asyncpg binds $n placeholders to a parameter tuple"""
+        query = AnalyticsService.filter_calculations(db_session, test_user.id, "add")
+        
+        sql, params = AnalyticsService.explain_statement(query.statement, PGDialect_asyncpg())
+        
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "$1" in sql and "$2" in sql
+        assert params == (test_user.id, "add")
+    
+    @requires_asyncpg
+    def test_estimate_count_through_asyncpg(self, db_session, test_user, test_calculations):
+        """Test estimated totals are read from the planner over an asyncpg connection"""
+        from app.services.analytics import _history_count_cache
+        _history_count_cache.clear()
+        engine = create_async_engine(async_database_url(TEST_DATABASE_URL))
+        
+        def estimate(session: Session) -> int:
+            query = AnalyticsService.filter_calculations(session, test_user.id, "add")
+            return AnalyticsService.estimate_count(session, query, ("asyncpg", test_user.id))
+        
+        async def run() -> int:
+            async with engine.connect() as connection:
+                async with AsyncSession(bind=connection) as session:
+                    return await session.run_sync(estimate)
+        
+        try:
+            assert asyncio.run(run()) >= 0
+        finally:
+            engine.sync_engine.dispose()
+    
+    def test_get_calculation_history_invalid_cursor(self, db_session, test_user):
+        """Test a malformed cursor is rejected"""
+        with pytest.raises(ValueError, match="Invalid pagination cursor"):
+            AnalyticsService.get_calculation_history(
+                db_session, test_user.id, cursor="not-a-cursor"
+            )
\ No newline at end of file
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from fastapi import HTTPException
+from app.core.principal_cache import Principal
+from app.services.calculation_channel import CalculationChannel
+
+PRINCIPAL = Principal(id=1, username="testuser", email="test@example.com")
+
+
+class FakeWebSocket:
+    """Plays a client's messages and records what the server sends
+    
+    Once out of messages the client disconnects at once, after every message
+    is answered, or never, as set by disconnect.
+    """
+    
+    def __init__(self, messages, disconnect="now"):
+        self.headers = {"authorization": "Bearer token"}
+        self.incoming = [{"type": "websocket.receive", "text": json.dumps(message)} for message in messages]
+        self.sent_count = len(messages)
+        self.disconnect = disconnect
+        self.sent = []
+        self.closed = None
+    
+    @property
+    def answered(self):
+        return sum(len(message["results"]) for message in self.sent if message["type"] == "results")
+    
+    async def accept(self):
+        pass
+    
+    async def receive(self):
+        await asyncio.sleep(0)
+        if self.incoming:
+            return self.incoming.pop(0)
+        if self.disconnect == "never":
+            await asyncio.Future()
+        while self.disconnect == "answered" and self.answered < self.sent_count:
+            await asyncio.sleep(0.001)
+        return {"type": "websocket.disconnect", "code": 1000}
+    
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+    
+    async def close(self, code, reason):
+        self.closed = code
+
+
+def calculations(count):
+    """Numbered add messages"""
+    return [{"id": i, "operation": "add", "operand1": i, "operand2": 1} for i in range(count)]
+
+
+def run_channel(websocket, save, authenticate=None, **options):
+    """Serve a channel over a fake connection until it ends"""
+    async def principal(token):
+        return PRINCIPAL
+    
+    channel = CalculationChannel(websocket, authenticate or principal, save, **options)
+    asyncio.run(channel.serve())
+    return channel
+
+
+class TestCalculationChannel:
+    """Unit tests for the WebSocket calculation channel"""
+    
+    def test_backpressure_limits_unanswered_messages(self):
+        """Test the channel stops reading at max_in_flight, yet saves everything received"""
+        in_flight, saved = [], []
+        
+        async def save(rows):
+            in_flight.append(channel_in_flight())
+            await asyncio.sleep(0.01)
+            saved.extend(rows)
+            return len(rows)
+        
+        websocket = FakeWebSocket(calculations(10), disconnect="answered")
+        channel_in_flight = lambda: channel.in_flight
+        channel = CalculationChannel(websocket, lambda token: asyncio.sleep(0, PRINCIPAL), save, max_in_flight=3)
+        asyncio.run(channel.serve())
+        
+        assert max(in_flight) <= 3
+        assert [row["result"] for row in saved] == [i + 1 for i in range(10)]
+        replies = [reply for message in websocket.sent if message["type"] == "results" for reply in message["results"]]
+        assert [reply["id"] for reply in replies] == list(range(10))
+    
+    def test_batches_pipelined_messages(self):
+        """Test messages that arrive together are saved as one batch, even if the client leaves"""
+        batches = []
+        
+        async def save(rows):
+            batches.append(len(rows))
+            return len(rows)
+        
+        channel = run_channel(FakeWebSocket(calculations(5)), save, flush_interval=0.05)
+        
+        assert batches == [5]
+        assert channel.stats.batches == 1
+    
+    def test_closes_once_token_is_revoked(self):
+        """Test a token that stops validating closes the channel before its next batch"""
+        checks = []
+        
+        async def authenticate(token):
+            checks.append(token)
+            if len(checks) > 1:
+                raise HTTPException(status_code=401, detail="Token has been revoked")
+            return PRINCIPAL
+        
+        async def save(rows):
+            raise AssertionError("Nothing may be saved for a revoked token")
+        
+        websocket = FakeWebSocket(calculations(2), disconnect="never")
+        run_channel(websocket, save, authenticate=authenticate, revalidate_interval=0)
+        
+        assert websocket.closed == 1008
+    
+    def test_failed_save_closes_with_internal_error(self):
+        """Test a batch that cannot be saved is left unanswered and the channel closed"""
+        async def save(rows):
+            raise RuntimeError("database is gone")
+        
+        websocket = FakeWebSocket(calculations(2), disconnect="never")
+        run_channel(websocket, save)
+        
+        assert websocket.closed == 1011
+        assert [message["type"] for message in websocket.sent] == ["ready"]
\ No newline at end of file
@@ -68,4 +68,71 @@ class TestCalculatorService:
     def test_calculate_invalid_operation(self):
         """Test calculate with invalid operation"""
         with pytest.raises(ValueError, match="Invalid operation"):
-            CalculatorService.calculate("invalid", 10, 5)
\ No newline at end of file
+            CalculatorService.calculate("invalid", 10, 5)
+    
+    def test_power_out_of_range(self):
+        """Test power results that cannot be represented raise errors"""
+        with pytest.raises(ValueError, match="out of range"):
+            CalculatorService.calculate("power", 10.0, 400.0)
+        with pytest.raises(ValueError, match="not a real number"):
+            CalculatorService.calculate("power", -8.0, 0.5)
+        with pytest.raises(ValueError, match="zero to a negative power"):
+            CalculatorService.calculate("power", 0.0, -1.0)
+    
+    def test_calculate_many(self):
+        """Test vectorized calculation of many rows"""
+        results, errors = CalculatorService.calculate_many(
+            ["add", "subtract", "multiply", "divide", "power", "modulus"],
+            [10, 10, 10, 10, 2, 10],
+            [5, 5, 5, 5, 3, 3]
+        )
+        
+        assert results.tolist() == [15, 5, 50, 2, 8, 1]
+        assert errors == [None] * 6
+        assert not results.mask.any()
+    
+    def test_calculate_many_masks_errors(self):
+        """Test per-row errors are masked instead of raised"""
+        results, errors = CalculatorService.calculate_many(
+            ["divide", "modulus", "multiply", "power", "invalid", "add"],
+            [1, 1, 1e308, -8, 1, 1],
+            [0, 0, 10, 0.5, 1, 1]
+        )
+        
+        assert errors[:5] == [
+            "Cannot divide by zero",
+            "Cannot calculate modulus with zero divisor",
+            "Result is out of range",
+            "Power result is not a real number",
+            "Invalid operation: invalid"
+        ]
+        assert errors[5] is None
+        assert results.mask.tolist() == [True, True, True, True, True, False]
+        assert results[5] == 2
+    
+    def test_calculate_many_matches_scalar_path(self):
+        """Test vectorized results are bit-identical to the scalar path"""
+        import random
+        
+        rng = random.Random(42)
+        operations = sorted(CalculatorService.OPERATIONS)
+        special = [0.0, -0.0, 1.0, -1.0, 0.5, -2.5, 3.0, 1e308, -1e308, 1e-308, 1024.0]
+        rows = [
+            (
+                rng.choice(operations),
+                rng.choice(special) if rng.random() < 0.3 else rng.uniform(-1e3, 1e3),
+                rng.choice(special) if rng.random() < 0.3 else rng.uniform(-20, 20)
+            )
+            for _ in range(5000)
+        ]
+        
+        results, errors = CalculatorService.calculate_many(*zip(*rows))
+        
+        for (operation, a, b), value, error in zip(rows, results.data.tolist(), errors):
+            try:
+                expected = CalculatorService.calculate(operation, a, b)
+            except ValueError as e:
+                assert error == str(e)
+            else:
+                assert error is None
+                assert value.hex() == expected.hex()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import pytest
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+class TestCircuitBreaker:
+    """Unit tests for the circuit breaker"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit trips at the threshold and then fails fast"""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call(fail)
+        
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "never called")
+        assert breaker.stats() == {"state": "open", "trips": 1, "failures": 2, "short_circuits": 1}
+    
+    def test_success_resets_failure_count(self):
+        """Test failures must be consecutive to trip the circuit"""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.call(lambda: "ok") == "ok"
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        
+        assert breaker.state == "closed"
+    
+    def test_half_open_trial_closes_or_reopens(self):
+        """Test one trial call after the reset timeout decides the next state"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.state == "half_open"
+        
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.trips == 1
+        
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == "closed"
+    
+    def test_unlisted_exception_ends_the_trial(self):
+        """Test an exception the breaker does not count still lets a later trial through"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0, exceptions=(ConnectionError,))
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        
+        with pytest.raises(KeyError):
+            breaker.call(lambda: {}["missing"])
+        
+        assert breaker.state == "half_open"
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == "closed"
\ No newline at end of file
@@ -0,0 +1,99 @@
+import gzip
+import brotli
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from app.core.compression import CompressionMiddleware, acceptable_encodings
+
+
+class TestAcceptableEncodings:
+    """Unit tests for Accept-Encoding negotiation"""
+    
+    def test_prefers_brotli_at_equal_quality(self):
+        """Test brotli wins over gzip unless the client ranks it lower"""
+        assert acceptable_encodings("gzip, deflate, br") == ["br", "gzip"]
+        assert acceptable_encodings("br;q=0.5, gzip") == ["gzip", "br"]
+    
+    def test_refused_and_unlisted_codings(self):
+        """Test q=0 refuses a coding and a wildcard admits unlisted ones"""
+        assert acceptable_encodings("br;q=0, gzip") == ["gzip"]
+        assert acceptable_encodings("*;q=0.5, br;q=0") == ["gzip"]
+        assert acceptable_encodings("") == []
+        assert acceptable_encodings("identity") == []
+
+
+@pytest.fixture
+def compressed_client():
+    """Client for an app behind the middleware with a 100 byte threshold"""
+    app = FastAPI()
+    
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse("calculation " * 100, headers={"ETag": '"abc"'})
+    
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+    
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 100, media_type="image/png")
+    
+    @app.get("/stream")
+    async def stream():
+        async def rows():
+            for i in range(50):
+                yield f"{i},add,1,2,3\n"
+        return StreamingResponse(rows(), media_type="text/csv")
+    
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+class TestCompressionMiddleware:
+    """Unit tests for negotiated response compression"""
+    
+    async def test_large_body_uses_best_accepted_coding(self, compressed_client):
+        """Test bodies over the threshold are compressed, with a weakened ETag"""
+        async with compressed_client as client:
+            br = await client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+            gz = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        
+        assert br.headers["Content-Encoding"] == "br"
+        assert gz.headers["Content-Encoding"] == "gzip"
+        assert br.text == gz.text == "calculation " * 100
+        assert int(gz.headers["Content-Length"]) < 1200
+        assert gz.headers["ETag"] == 'W/"abc"'
+        assert gz.headers["Vary"] == "Accept-Encoding"
+    
+    async def test_uncompressed_responses(self, compressed_client):
+        """Test small bodies, binary types and clients without a coding pass through"""
+        async with compressed_client as client:
+            small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+            image = await client.get("/image", headers={"Accept-Encoding": "gzip"})
+            identity = await client.get("/large", headers={"Accept-Encoding": "identity"})
+        
+        for response in (small, image, identity):
+            assert "Content-Encoding" not in response.headers
+        assert identity.headers["ETag"] == '"abc"'
+    
+    async def test_stream_is_compressed_chunk_by_chunk(self, compressed_client):
+        """Test a streamed body is compressed without a Content-Length and decodes whole"""
+        async with compressed_client as client:
+            async with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        assert gzip.decompress(raw).decode() == "".join(f"{i},add,1,2,3\n" for i in range(50))
+    
+    async def test_stream_with_brotli(self, compressed_client):
+        """Test flushed brotli chunks still form one valid stream"""
+        async with compressed_client as client:
+            async with client.stream("GET", "/stream", headers={"Accept-Encoding": "br"}) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        
+        assert brotli.decompress(raw).decode().count("\n") == 50
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+import uuid
+import pytest
+import redis
+from app.core.cache import redis_client
+from app.services.idempotency import IdempotencyKeyInFlight, IdempotencyKeyReused, IdempotencyStore
+from tests.conftest import requires_redis
+
+
+@pytest.fixture
+def store():
+    """A store under a fresh test prefix"""
+    prefix = f"test:idempotency:{uuid.uuid4().hex}"
+    yield IdempotencyStore(redis_client, wait_timeout=2.0, poll_interval=0.01, prefix=prefix)
+    for key in redis_client.scan_iter(f"{prefix}:*"):
+        redis_client.delete(key)
+
+
+def counting_handler(response=None, delay=0.0):
+    """Handler returning response after delay, counting its calls"""
+    calls = []
+    
+    def handler():
+        calls.append(1)
+        time.sleep(delay)
+        return response or {"result": 3}
+    
+    return handler, calls
+
+
+@requires_redis
+class TestIdempotencyStore:
+    """Unit tests for replaying responses by idempotency key"""
+    
+    def test_retry_replays_first_response(self, store):
+        """Test a repeated key returns the stored response without running the handler"""
+        handler, calls = counting_handler()
+        
+        first = store.run("user:1", "key", "fp", handler)
+        second = store.run("user:1", "key", "fp", handler)
+        
+        assert first == ({"result": 3}, False)
+        assert second == ({"result": 3}, True)
+        assert len(calls) == 1
+    
+    def test_keys_are_scoped(self, store):
+        """Test the same key in another scope runs separately"""
+        handler, calls = counting_handler()
+        
+        store.run("user:1", "key", "fp", handler)
+        _, replayed = store.run("user:2", "key", "fp", handler)
+        
+        assert not replayed
+        assert len(calls) == 2
+    
+    def test_reused_key_with_other_request_is_refused(self, store):
+        """Test a key sent with a different request body raises"""
+        handler, _ = counting_handler()
+        store.run("user:1", "key", "fp", handler)
+        
+        with pytest.raises(IdempotencyKeyReused):
+            store.run("user:1", "key", "other-fp", handler)
+    
+    def test_failed_request_releases_key(self, store):
+        """Test a retry runs again when the first attempt raised"""
+        def failing():
+            raise ValueError("boom")
+        handler, calls = counting_handler()
+        
+        with pytest.raises(ValueError):
+            store.run("user:1", "key", "fp", failing)
+        _, replayed = store.run("user:1", "key", "fp", handler)
+        
+        assert not replayed
+        assert len(calls) == 1
+    
+    def test_concurrent_duplicate_waits_for_first(self, store):
+        """Test a duplicate arriving mid-request gets the first response instead of running"""
+        handler, calls = counting_handler(delay=0.2)
+        results = []
+        first = threading.Thread(target=lambda: results.append(store.run("user:1", "key", "fp", handler)))
+        first.start()
+        time.sleep(0.05)
+        
+        second = store.run("user:1", "key", "fp", handler)
+        first.join()
+        
+        assert second == ({"result": 3}, True)
+        assert results == [({"result": 3}, False)]
+        assert len(calls) == 1
+    
+    def test_duplicate_gives_up_after_wait_timeout(self, store):
+        """Test a duplicate raises when the first request outlasts the wait"""
+        store.wait_timeout = 0.05
+        handler, _ = counting_handler(delay=0.3)
+        first = threading.Thread(target=lambda: store.run("user:1", "key", "fp", handler))
+        first.start()
+        time.sleep(0.05)
+        
+        with pytest.raises(IdempotencyKeyInFlight):
+            store.run("user:1", "key", "fp", handler)
+        first.join()
+    
+    def test_slow_request_keeps_its_claim(self, store):
+        """Test a handler outlasting claim_timeout keeps its key, so a duplicate never runs"""
+        store.claim_timeout = 0.15
+        handler, calls = counting_handler(delay=0.5)
+        first = threading.Thread(target=lambda: store.run("user:1", "key", "fp", handler))
+        first.start()
+        time.sleep(0.05)
+        
+        second = store.run("user:1", "key", "fp", handler)
+        first.join()
+        
+        assert second == ({"result": 3}, True)
+        assert len(calls) == 1
+    
+    def test_lapsed_claim_is_left_to_its_new_holder(self, store):
+        """Test a request whose claim was taken over neither overwrites nor deletes the new entry"""
+        redis_key = store._key("user:1", "key")
+        taken = store._claim_entry("other-token", "fp")
+        
+        def taken_over(response=None):
+            def handler():
+                redis_client.set(redis_key, taken)
+                if response is None:
+                    raise ValueError("boom")
+                return response
+            return handler
+        
+        store.run("user:1", "key", "fp", taken_over({"result": 3}))
+        assert redis_client.get(redis_key) == taken
+        
+        redis_client.delete(redis_key)
+        with pytest.raises(ValueError):
+            store.run("user:1", "key", "fp", taken_over())
+        assert redis_client.get(redis_key) == taken
+    
+    def test_async_duplicates_run_once(self, store):
+        """Test concurrent duplicates on the event loop share one run"""
+        calls = []
+        
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"result": 3}
+        
+        async def run():
+            return await asyncio.gather(*[store.run_async("user:1", "key", "fp", handler) for _ in range(3)])
+        
+        results = asyncio.run(run())
+        
+        assert sorted(replayed for _, replayed in results) == [False, True, True]
+        assert len(calls) == 1
+
+
+def test_unreachable_redis_runs_every_request():
+    """Test requests still succeed, unprotected, while Redis is down"""
+    client = redis.Redis(port=1, socket_connect_timeout=0.05, socket_timeout=0.05)
+    store = IdempotencyStore(client)
+    handler, calls = counting_handler()
+    
+    assert store.run("user:1", "key", "fp", handler) == ({"result": 3}, False)
+    assert store.run("user:1", "key", "fp", handler) == ({"result": 3}, False)
+    assert len(calls) == 2
\ No newline at end of file
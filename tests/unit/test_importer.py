@@ -0,0 +1,27 @@
+import pytest
+from app.services.importer import iter_lines
+
+
+async def collect(chunks, max_line_bytes=16):
+    """Run iter_lines over in-memory chunks"""
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    return [item async for item in iter_lines(stream(), max_line_bytes)]
+
+
+@pytest.mark.asyncio
+class TestIterLines:
+    """Unit tests for incremental line splitting"""
+    
+    async def test_lines_split_across_chunks(self):
+        """Test lines are reassembled across chunk boundaries"""
+        lines = await collect([b"ab", b"c\nde", b"f\n", b"gh"])
+        
+        assert lines == [(1, b"abc"), (2, b"def"), (3, b"gh")]
+    
+    async def test_overlong_line_is_discarded(self):
+        """Test a line beyond the limit is reported without being buffered"""
+        lines = await collect([b"short\n", b"x" * 20, b"x" * 20, b"\nok\n"])
+        
+        assert lines == [(1, b"short"), (2, None), (3, b"ok")]
\ No newline at end of file
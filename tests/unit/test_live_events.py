@@ -0,0 +1,119 @@
+import asyncio
+import json
+import pytest
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.models.calculation import Calculation
+from app.routes.analytics import _event_stream
+from app.services.calculations import CalculationService
+from app.services.live_events import CREATED, DELETED, EventHub, channel, summary_delta
+from tests.conftest import requires_redis
+
+
+def test_summary_delta():
+    """Test added and removed calculations net out per operation"""
+    delta = summary_delta(
+        added=[
+            {"operation": "add", "result": 5.0, "created_at": "2026-01-02T00:00:00"},
+            {"operation": "multiply", "result": 6.0, "created_at": "2026-01-03T00:00:00"}
+        ],
+        removed=[{"operation": "add", "result": 2.0}]
+    )
+    
+    assert delta == {
+        "count": 1,
+        "result_sum": 9.0,
+        "operations": {"multiply": 1},
+        "latest_at": "2026-01-03T00:00:00"
+    }
+
+
+def test_event_stream_formatting(monkeypatch):
+    """Test the stream opens with ready, keeps alive when idle and ends on None"""
+    monkeypatch.setattr(settings, "live_events_keepalive", 0.01)
+    
+    async def read_stream():
+        queue = asyncio.Queue()
+        stream = _event_stream(queue)
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        queue.put_nowait([{"type": CREATED, "delta": None}])
+        queue.put_nowait(None)
+        return chunks + [chunk async for chunk in stream]
+    
+    ready, keepalive, created = asyncio.run(read_stream())
+    
+    assert ready == "event: ready\ndata: {}\n\n"
+    assert keepalive == ": keepalive\n\n"
+    assert created == f'event: {CREATED}\ndata: {{"type": "{CREATED}", "delta": null}}\n\n'
+
+
+@requires_redis
+class TestLiveEvents:
+    """Unit tests for publishing and fanning out live events"""
+    
+    def test_hub_fans_out_to_every_stream(self):
+        """Test each of a user's streams gets published events, and only that user's"""
+        hub = EventHub(settings.redis_url)
+        
+        async def run():
+            first, second = await hub.subscribe(1), await hub.subscribe(1)
+            other = await hub.subscribe(2)
+            redis_client.publish(channel(1), json.dumps([{"type": CREATED}]))
+            received = [await asyncio.wait_for(queue.get(), 2) for queue in (first, second)]
+            
+            other_empty = other.empty()
+            await hub.unsubscribe(1, first)
+            stats = hub.stats()
+            await hub.close()
+            return received, other_empty, stats
+        
+        received, other_empty, stats = asyncio.run(run())
+        
+        assert received == [[{"type": CREATED}]] * 2
+        assert other_empty
+        assert stats == {"users": 2, "streams": 2}
+    
+    def test_commit_publishes_and_rollback_does_not(self, db_session, test_user):
+        """Test ORM writes reach the user's channel only once committed"""
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(channel(test_user.id))
+        pubsub.get_message(timeout=1.0)
+        try:
+            db_session.add(Calculation(user_id=test_user.id, operation="add", operand1=1, operand2=2, result=3))
+            db_session.flush()
+            db_session.rollback()
+            calculation = Calculation(user_id=test_user.id, operation="add", operand1=2, operand2=2, result=4)
+            db_session.add(calculation)
+            db_session.commit()
+            db_session.delete(calculation)
+            db_session.commit()
+            
+            messages = []
+            while (message := pubsub.get_message(timeout=1.0)) is not None:
+                messages.append(json.loads(message["data"]))
+        finally:
+            pubsub.close()
+        
+        created, deleted = messages
+        assert [event["type"] for event in created + deleted] == [CREATED, DELETED]
+        assert created[0]["calculations"][0]["result"] == 4
+        assert created[0]["calculations"][0]["created_at"]
+        assert deleted[0]["delta"] == {"count": -1, "result_sum": -4.0, "operations": {"add": -1}, "latest_at": None}
+    
+    def test_bulk_insert_publishes_ids(self, db_session, test_user):
+        """Test rows saved with one multi-row INSERT are published with their ids"""
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(channel(test_user.id))
+        pubsub.get_message(timeout=1.0)
+        try:
+            CalculationService.bulk_create(db_session, [
+                {"user_id": test_user.id, "operation": "add", "operand1": 1, "operand2": 1, "result": 2},
+                {"user_id": test_user.id, "operation": "multiply", "operand1": 2, "operand2": 3, "result": 6}
+            ])
+            (created,) = json.loads(pubsub.get_message(timeout=1.0)["data"])
+        finally:
+            pubsub.close()
+        
+        ids = [row.id for row in db_session.query(Calculation).order_by(Calculation.id)]
+        assert [calculation["id"] for calculation in created["calculations"]] == ids
+        assert created["delta"]["operations"] == {"add": 1, "multiply": 1}
\ No newline at end of file
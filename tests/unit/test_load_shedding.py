@@ -0,0 +1,112 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.core.load_shedding import BULK, CRITICAL, NORMAL, AdaptiveConcurrencyLimit, LoadSheddingMiddleware
+
+
+class TestAdaptiveConcurrencyLimit:
+    """Unit tests for the AIMD concurrency limit"""
+    
+    def test_priority_shares(self):
+        """Test bulk requests are refused before normal ones, and normal before critical"""
+        limit = AdaptiveConcurrencyLimit(initial=10)
+        
+        admitted = [limit.try_acquire(BULK) for _ in range(6)]
+        admitted += [limit.try_acquire(NORMAL) for _ in range(4)]
+        admitted += [limit.try_acquire(CRITICAL) for _ in range(3)]
+        
+        assert admitted == [True] * 5 + [False] + [True] * 3 + [False] + [True] * 2 + [False]
+        assert limit.stats()["shed"] == {CRITICAL: 1, NORMAL: 1, BULK: 1}
+    
+    def test_fast_responses_grow_a_busy_limit(self):
+        """Test the limit grows additively while it is in use and requests are fast"""
+        limit = AdaptiveConcurrencyLimit(initial=4, latency_target=0.5)
+        
+        for _ in range(8):
+            for _ in range(4):
+                limit.try_acquire(CRITICAL)
+            for _ in range(4):
+                limit.release(time.monotonic(), 0.01)
+        
+        assert 6 < limit.limit < 7
+    
+    def test_idle_limit_does_not_grow(self):
+        """Test fast responses with little concurrency leave the limit alone"""
+        limit = AdaptiveConcurrencyLimit(initial=20)
+        
+        for _ in range(50):
+            limit.try_acquire(NORMAL)
+            limit.release(time.monotonic(), 0.01)
+        
+        assert limit.limit == 20
+    
+    def test_slow_responses_cut_the_limit_once_per_round(self):
+        """Test requests started before a cut cannot cut the limit again"""
+        limit = AdaptiveConcurrencyLimit(initial=20, min_limit=4, latency_target=0.5, backoff=0.5)
+        started = time.monotonic()
+        for _ in range(3):
+            limit.try_acquire(NORMAL)
+        
+        for _ in range(3):
+            limit.release(started, 2.0)
+        assert limit.limit == 10
+        
+        for _ in range(5):
+            limit.try_acquire(NORMAL)
+            limit.release(time.monotonic(), 2.0)
+        assert limit.limit == 4
+
+
+@pytest.mark.asyncio
+class TestLoadSheddingMiddleware:
+    """Unit tests for shedding requests in the ASGI middleware"""
+    
+    @pytest.fixture
+    def shed_app(self):
+        """An app whose bulk route blocks until released"""
+        release = asyncio.Event()
+        app = FastAPI()
+        
+        @app.get("/analytics/slow")
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+        
+        @app.get("/auth/me")
+        @app.get("/health")
+        async def fast():
+            return {"ok": True}
+        
+        limit = AdaptiveConcurrencyLimit(initial=4, min_limit=4)
+        app.add_middleware(
+            LoadSheddingMiddleware,
+            limiter=limit,
+            critical_paths=["/auth/"],
+            bulk_paths=["/analytics/"],
+            exempt_paths=["/health"]
+        )
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://test"), release, limit
+    
+    async def test_bulk_requests_are_shed_first(self, shed_app):
+        """Test a full bulk share is refused with 503 while critical paths still answer"""
+        client, release, limit = shed_app
+        async with client:
+            slow = [asyncio.create_task(client.get("/analytics/slow")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            
+            shed = await client.get("/analytics/slow")
+            critical = await client.get("/auth/me")
+            health = await client.get("/health")
+            
+            release.set()
+            responses = await asyncio.gather(*slow)
+        
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+        assert critical.status_code == health.status_code == 200
+        assert [response.status_code for response in responses] == [200, 200]
+        assert limit.inflight == 0
+        assert limit.shed == {CRITICAL: 0, NORMAL: 0, BULK: 1}
\ No newline at end of file
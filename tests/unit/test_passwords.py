@@ -0,0 +1,66 @@
+import hashlib
+import os
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.core.passwords import PasswordHasher, PasswordHasherBusy
+
+
+class TestPasswordHasher:
+    """Unit tests for the bcrypt password hasher"""
+    
+    def test_hash_and_verify_in_worker_process(self):
+        """Test hashing and verification through the process pool"""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        try:
+            hashed = hasher.hash("secret-password")
+            
+            assert hashed.startswith("$2b$04$")
+            assert hasher.verify_and_update("secret-password", hashed) == (True, None)
+            assert hasher.verify_and_update("wrong-password", hashed) == (False, None)
+            assert hasher.pending == 0
+        finally:
+            hasher.shutdown()
+    
+    def test_pool_is_replaced_after_a_worker_dies(self):
+        """Test hashing recovers once a dead worker has broken the pool"""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                hasher._submit(os._exit, 1).result()
+            
+            assert hasher.hash("secret-password").startswith("$2b$04$")
+            assert hasher.pending == 0
+        finally:
+            hasher.shutdown()
+    
+    def test_legacy_sha256_hash_is_upgraded(self):
+        """Test an unsalted SHA-256 hash verifies and comes back as bcrypt"""
+        hasher = PasswordHasher(rounds=4, workers=0)
+        legacy = hashlib.sha256(b"old-password").hexdigest()
+        
+        valid, new_hash = hasher.verify_and_update("old-password", legacy)
+        
+        assert valid
+        assert new_hash.startswith("$2b$04$")
+        assert hasher.verify_and_update("wrong-password", legacy) == (False, None)
+    
+    def test_cost_change_triggers_rehash(self):
+        """Test a hash made at another cost is replaced at the configured one"""
+        old_hash = PasswordHasher(rounds=4, workers=0).hash("secret-password")
+        
+        valid, new_hash = PasswordHasher(rounds=5, workers=0).verify_and_update("secret-password", old_hash)
+        
+        assert valid
+        assert new_hash.startswith("$2b$05$")
+    
+    def test_unknown_hash_format_is_rejected(self):
+        """Test a stored value no scheme recognises fails verification"""
+        assert PasswordHasher(rounds=4, workers=0).verify_and_update("x", "not-a-hash") == (False, None)
+    
+    def test_full_queue_refuses_new_jobs(self):
+        """Test jobs beyond max_pending are refused instead of queued"""
+        hasher = PasswordHasher(rounds=4, workers=0, max_pending=0)
+        
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("secret-password")
+        assert hasher.pending == 0
\ No newline at end of file
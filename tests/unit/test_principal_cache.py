@@ -0,0 +1,86 @@
+import time
+from app.core.principal_cache import Principal, PrincipalCache
+
+
+class TestPrincipalCache:
+    """Unit tests for the authenticated principal cache"""
+    
+    def test_get_and_invalidate_token(self):
+        """Test a cached token is returned until it is invalidated"""
+        cache = PrincipalCache()
+        principal = Principal(id=1, username="alice", email="alice@example.com")
+        cache.set("token-a", principal, cache.generation(1))
+        
+        assert cache.get("token-a") == principal
+        
+        cache.invalidate_token("token-a")
+        
+        assert cache.get("token-a") is None
+    
+    def test_invalidate_user_drops_every_token(self):
+        """Test bumping a user's generation drops all of that user's tokens only"""
+        cache = PrincipalCache()
+        alice = Principal(id=1, username="alice", email="alice@example.com")
+        bob = Principal(id=2, username="bob", email="bob@example.com")
+        cache.set("alice-1", alice, cache.generation(1))
+        cache.set("alice-2", alice, cache.generation(1))
+        cache.set("bob-1", bob, cache.generation(2))
+        
+        cache.invalidate_user(1)
+        
+        assert cache.get("alice-1") is None
+        assert cache.get("alice-2") is None
+        assert cache.get("bob-1") == bob
+    
+    def test_entry_resolved_before_invalidation_is_stale(self):
+        """Test an entry stored with an older generation is never served"""
+        cache = PrincipalCache()
+        principal = Principal(id=1, username="alice", email="alice@example.com")
+        generation = cache.generation(1)
+        cache.invalidate_user(1)
+        cache.set("token-a", principal, generation)
+        
+        assert cache.get("token-a") is None
+    
+    def test_entries_expire(self):
+        """Test entries honour their TTL"""
+        cache = PrincipalCache(ttl=60)
+        principal = Principal(id=1, username="alice", email="alice@example.com")
+        cache.set("token-a", principal, 0, ttl=0.01)
+        
+        time.sleep(0.02)
+        
+        assert cache.get("token-a") is None
+
+def test_revocation_during_lookup_is_not_cached(db_session, test_user):
+    """Test a principal loaded while its user is invalidated is not cached"""
+    from app.core.security import _resolve_principal, create_access_token, principal_cache
+    
+    class RevokedDuringQuery:
+        """Session whose user lookup races a committed revocation"""
+        
+        def query(self, *entities):
+            principal_cache.invalidate_user(test_user.id)
+            return db_session.query(*entities)
+    
+    token = create_access_token({"sub": test_user.username})
+    
+    assert _resolve_principal(token, RevokedDuringQuery()).id == test_user.id
+    assert principal_cache.get(token) is None
+    
+    _resolve_principal(token, db_session)
+    
+    assert principal_cache.get(token).id == test_user.id
+
+
+def test_account_deletion_is_announced_to_other_workers(db_session, test_user, monkeypatch):
+    """Test deleting a user publishes a revocation, not just a local invalidation"""
+    from app.core.security import token_blacklist
+    revoked = []
+    monkeypatch.setattr(token_blacklist, "revoke_user", revoked.append)
+    user_id = test_user.id
+    
+    db_session.delete(test_user)
+    db_session.commit()
+    
+    assert revoked == [user_id]
\ No newline at end of file
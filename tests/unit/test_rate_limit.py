@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+import pytest
+import redis
+from app.core.cache import redis_client
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.rate_limit import Limit, RateLimiter, parse_limit
+from tests.conftest import requires_redis
+
+
+def hits(limiter, key, limit, count):
+    """Send count requests through a limiter, returning their decisions"""
+    async def run():
+        return [await limiter.hit(key, limit) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def redis_scripting_available() -> bool:
+    """Whether the Redis server can run Lua scripts"""
+    try:
+        return redis_client.eval("return 1", 0) == 1
+    except redis.RedisError:
+        return False
+
+
+class TestParseLimit:
+    """Unit tests for rate limit specs"""
+    
+    def test_parses_count_and_period(self):
+        """Test a spec becomes a count per period in seconds"""
+        assert parse_limit("60/minute") == Limit(60, 60)
+        assert parse_limit("5/second").rate == 5
+    
+    def test_rejects_unknown_unit(self):
+        """Test a malformed spec raises ValueError"""
+        with pytest.raises(ValueError):
+            parse_limit("10/fortnight")
+
+
+class TestLocalRateLimiter:
+    """Unit tests for rate limiting with in-process buckets"""
+    
+    def test_refuses_requests_beyond_limit(self):
+        """Test the bucket empties and refusals say when to retry"""
+        decisions = hits(RateLimiter(), "user:1", Limit(3, 60), 4)
+        
+        assert [decision.allowed for decision in decisions] == [True, True, True, False]
+        assert [decision.remaining for decision in decisions] == [2, 1, 0, 0]
+        assert decisions[-1].headers()["Retry-After"] == "20"
+    
+    def test_keys_have_separate_buckets(self):
+        """Test one client's exhausted bucket does not limit another"""
+        limiter = RateLimiter()
+        hits(limiter, "user:1", Limit(1, 60), 1)
+        
+        assert not hits(limiter, "user:1", Limit(1, 60), 1)[0].allowed
+        assert hits(limiter, "user:2", Limit(1, 60), 1)[0].allowed
+    
+    def test_bucket_refills_over_time(self):
+        """Test tokens come back at the limit's rate"""
+        limiter = RateLimiter()
+        limit = Limit(1, 0.05)
+        hits(limiter, "user:1", limit, 1)
+        
+        asyncio.run(asyncio.sleep(0.06))
+        
+        assert hits(limiter, "user:1", limit, 1)[0].allowed
+    
+    def test_unreachable_redis_falls_back_to_local_buckets(self):
+        """Test limits still hold, per process, while Redis is down"""
+        client = redis.Redis(port=1, socket_connect_timeout=0.05, socket_timeout=0.05)
+        breaker = CircuitBreaker("test", failure_threshold=2, exceptions=(redis.RedisError,))
+        limiter = RateLimiter(client, breaker=breaker)
+        
+        decisions = hits(limiter, "user:1", Limit(3, 60), 5)
+        
+        assert [decision.allowed for decision in decisions] == [True, True, True, False, False]
+        assert breaker.stats()["trips"] == 1
+
+
+@requires_redis
+@pytest.mark.skipif(not redis_scripting_available(), reason="Redis cannot run Lua scripts")
+class TestRedisRateLimiter:
+    """Unit tests for the Redis-backed token bucket"""
+    
+    @pytest.fixture
+    def make_limiter(self):
+        """Build limiters sharing one test prefix"""
+        prefix = f"test:ratelimit:{uuid.uuid4().hex}"
+        yield lambda: RateLimiter(redis_client, lease_fraction=0.5, lease_ttl=60, prefix=prefix)
+        for key in redis_client.scan_iter(f"{prefix}:*"):
+            redis_client.delete(key)
+    
+    def test_workers_share_one_budget(self, make_limiter):
+        """Test requests spread over two workers never exceed the limit"""
+        first, second = make_limiter(), make_limiter()
+        limit = Limit(5, 60)
+        
+        async def run():
+            allowed = 0
+            for _ in range(5):
+                allowed += (await first.hit("user:1", limit)).allowed
+                allowed += (await second.hit("user:1", limit)).allowed
+            return allowed
+        
+        assert asyncio.run(run()) == 5
+    
+    def test_leases_grow_for_busy_clients(self, make_limiter):
+        """Test a client using its lease up is given a bigger one"""
+        limiter = make_limiter()
+        hits(limiter, "user:1", Limit(100, 60), 4)
+        
+        lease = limiter._leases["user:1"]
+        assert lease.size > 1
+        assert float(redis_client.hget(f"{limiter.prefix}:user:1", "tokens")) <= 100 - 4
+    
+    def test_refusals_are_remembered_locally(self, make_limiter):
+        """Test a refused client is turned away again without asking Redis"""
+        limiter = make_limiter()
+        hits(limiter, "user:1", Limit(1, 60), 2)
+        redis_client.delete(f"{limiter.prefix}:user:1")
+        
+        assert not hits(limiter, "user:1", Limit(1, 60), 1)[0].allowed
\ No newline at end of file
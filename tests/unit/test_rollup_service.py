@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime
+from app.models.calculation import Calculation
+from app.models.user_calc_stats import UserCalcStats
+from app.services.analytics import AnalyticsService
+from app.services.calculations import CalculationService
+from app.services.rollup import StatsRollupService
+
+
+def stats_by_operation(db_session, user_id):
+    """Read the rollup as {operation: (count, result_sum)}"""
+    db_session.expire_all()
+    return {
+        row.operation: (row.count, row.result_sum)
+        for row in StatsRollupService.get_user_stats(db_session, user_id)
+    }
+
+
+class TestStatsRollupService:
+    """Unit tests for the per-user calculation rollup"""
+    
+    def test_orm_inserts_update_rollup(self, db_session, test_user, test_calculations):
+        """Test rows added through the session are counted"""
+        assert stats_by_operation(db_session, test_user.id) == {
+            "add": (1, 15),
+            "subtract": (1, 12),
+            "multiply": (1, 24)
+        }
+        assert StatsRollupService.check(db_session) == []
+    
+    def test_bulk_create_updates_rollup(self, db_session, test_user):
+        """Test bulk inserts are folded in with one upsert per operation"""
+        CalculationService.bulk_create(db_session, [
+            {"user_id": test_user.id, "operation": "add", "operand1": 1, "operand2": 1, "result": 2},
+            {"user_id": test_user.id, "operation": "add", "operand1": 2, "operand2": 2, "result": 4},
+            {"user_id": test_user.id, "operation": "power", "operand1": 2, "operand2": 3, "result": 8}
+        ])
+        
+        assert stats_by_operation(db_session, test_user.id) == {"add": (2, 6), "power": (1, 8)}
+        assert StatsRollupService.check(db_session) == []
+    
+    def test_update_moves_between_operations(self, db_session, test_user, test_calculations):
+        """Test changing a calculation's operation moves it in the rollup"""
+        calculation = test_calculations[0]
+        calculation.operation = "multiply"
+        calculation.result = 50
+        db_session.commit()
+        
+        assert stats_by_operation(db_session, test_user.id) == {
+            "subtract": (1, 12),
+            "multiply": (2, 74)
+        }
+        assert StatsRollupService.check(db_session) == []
+    
+    def test_delete_recomputes_latest(self, db_session, test_user):
+        """Test deleting the latest calculation rolls latest_at back"""
+        older = Calculation(
+            user_id=test_user.id, operation="add", operand1=1, operand2=1, result=2,
+            created_at=datetime(2024, 1, 1)
+        )
+        newer = Calculation(
+            user_id=test_user.id, operation="add", operand1=2, operand2=2, result=4,
+            created_at=datetime(2024, 6, 1)
+        )
+        db_session.add_all([older, newer])
+        db_session.commit()
+        
+        db_session.delete(newer)
+        db_session.commit()
+        
+        row = db_session.get(UserCalcStats, (test_user.id, "add"))
+        db_session.refresh(row)
+        assert row.count == 1
+        assert row.latest_at == datetime(2024, 1, 1)
+        assert StatsRollupService.check(db_session) == []
+    
+    def test_clear_history_clears_rollup(self, db_session, test_user, test_calculations):
+        """Test clearing history empties the rollup"""
+        AnalyticsService.delete_calculation_history(db_session, test_user.id)
+        
+        assert stats_by_operation(db_session, test_user.id) == {}
+        assert AnalyticsService.get_user_statistics(db_session, test_user.id).total_calculations == 0
+    
+    def test_check_and_rebuild(self, db_session, test_user, test_calculations):
+        """Test drift is detected and repaired by a rebuild"""
+        db_session.query(UserCalcStats).filter(UserCalcStats.operation == "add").delete()
+        db_session.commit()
+        
+        mismatches = StatsRollupService.check(db_session, test_user.id)
+        assert [m["operation"] for m in mismatches] == ["add"]
+        
+        StatsRollupService.rebuild(db_session, test_user.id)
+        
+        assert StatsRollupService.check(db_session) == []
+        assert stats_by_operation(db_session, test_user.id)["add"] == (1, 15)
\ No newline at end of file
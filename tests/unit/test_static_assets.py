@@ -0,0 +1,114 @@
+import gzip
+import json
+import re
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    AssetManifest,
+    PrecompressedStaticFiles,
+    build_assets
+)
+
+SCRIPT = "function calculate() { return 1 + 1; }\n" * 50
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """A static directory with one script and one image"""
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text(SCRIPT)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 10)
+    return tmp_path
+
+
+@pytest.fixture
+def static_client(static_dir):
+    """Client for an app serving the built directory"""
+    manifest = AssetManifest(build_assets(str(static_dir)))
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir), manifest=manifest))
+    return TestClient(app), manifest
+
+
+class TestBuildAssets:
+    """Unit tests for the static asset build"""
+    
+    def test_hashes_and_precompresses(self, static_dir):
+        """Test text assets get hashed copies with .gz and .br siblings, images only a copy"""
+        manifest = build_assets(str(static_dir))
+        
+        script = static_dir / manifest["js/app.js"]
+        assert script.name.startswith("app.") and script.name != "app.js"
+        assert script.read_text() == SCRIPT
+        assert gzip.decompress(script.with_name(script.name + ".gz").read_bytes()).decode() == SCRIPT
+        assert script.with_name(script.name + ".br").exists()
+        
+        image = static_dir / manifest["logo.png"]
+        assert not image.with_name(image.name + ".gz").exists()
+        assert json.loads((static_dir / "dist" / "manifest.json").read_text()) == manifest
+    
+    def test_rebuild_replaces_old_copies(self, static_dir):
+        """Test a changed asset gets a new name and the old copy is removed"""
+        old = build_assets(str(static_dir))["js/app.js"]
+        (static_dir / "js" / "app.js").write_text(SCRIPT + "// changed\n")
+        
+        new = build_assets(str(static_dir))["js/app.js"]
+        
+        assert new != old
+        assert not (static_dir / old).exists()
+    
+    def test_url_falls_back_to_source_path(self):
+        """Test assets missing from the manifest keep their plain URL"""
+        manifest = AssetManifest({"js/app.js": "dist/js/app.123.js"})
+        
+        assert manifest.url("js/app.js") == "/static/dist/js/app.123.js"
+        assert manifest.url("css/style.css") == "/static/css/style.css"
+
+
+class TestPrecompressedStaticFiles:
+    """Unit tests for serving precompressed, hashed assets"""
+    
+    def test_serves_precompressed_sibling(self, static_client):
+        """Test a hashed asset is served from its .br file, immutable, with its own media type"""
+        client, manifest = static_client
+        
+        response = client.get(manifest.url("js/app.js"), headers={"Accept-Encoding": "br"})
+        
+        assert response.headers["Content-Encoding"] == "br"
+        assert response.headers["Content-Type"].startswith("text/javascript")
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.text == SCRIPT
+    
+    def test_uncompressed_and_unhashed_requests(self, static_client):
+        """Test clients without a coding get the plain file, and source paths are revalidated"""
+        client, manifest = static_client
+        
+        plain = client.get(manifest.url("js/app.js"), headers={"Accept-Encoding": "identity"})
+        source = client.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+        
+        assert "Content-Encoding" not in plain.headers
+        assert plain.text == SCRIPT
+        assert source.headers["Cache-Control"] == "no-cache"
+        assert source.text == SCRIPT
+    
+    def test_precompressed_not_modified(self, static_client):
+        """Test a repeated request with the compressed copy's ETag gets 304"""
+        client, manifest = static_client
+        headers = {"Accept-Encoding": "gzip"}
+        etag = client.get(manifest.url("js/app.js"), headers=headers).headers["ETag"]
+        
+        response = client.get(manifest.url("js/app.js"), headers={**headers, "If-None-Match": etag})
+        
+        assert response.status_code == 304
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_index_page_links_resolve(client):
+    """Test the cached main page is revalidated and every asset it links to is served"""
+    page = client.get("/")
+    
+    assert page.headers["Cache-Control"] == "no-cache"
+    for url in re.findall(r'(?:href|src)="(/static/[^"]+)"', page.text):
+        assert client.get(url).status_code == 200
\ No newline at end of file
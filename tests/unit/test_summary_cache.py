@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from app.core.cache import redis_client
+from app.schemas.analytics import AnalyticsSummary
+from app.services.summary_cache import SummaryCache
+from tests.conftest import requires_redis
+
+
+def make_summary(total):
+    """Build a summary with the given total"""
+    return AnalyticsSummary(total_calculations=total, operations_breakdown=[])
+
+
+@pytest.fixture
+def cache():
+    """Summary cache under its own key prefix"""
+    cache = SummaryCache(redis_client, stale_ttl=30, lock_timeout=2, prefix="test:summary")
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@requires_redis
+class TestSummaryCache:
+    """Unit tests for the analytics summary cache"""
+    
+    def test_computes_once_until_invalidated(self, cache):
+        """Test a cached summary is reused until the user writes again"""
+        calls = []
+        compute = lambda: calls.append(1) or make_summary(len(calls))
+        
+        assert cache.get(1, compute).total_calculations == 1
+        assert cache.get(1, compute).total_calculations == 1
+        
+        cache.invalidate(1)
+        
+        assert cache.get(1, compute).total_calculations == 2
+        assert len(calls) == 2
+    
+    def test_users_are_cached_separately(self, cache):
+        """Test invalidating one user leaves another user's entry fresh"""
+        cache.get(1, lambda: make_summary(1))
+        cache.get(2, lambda: make_summary(2))
+        
+        cache.invalidate(1)
+        
+        assert cache.get(2, lambda: make_summary(99)).total_calculations == 2
+        assert cache.get(1, lambda: make_summary(10)).total_calculations == 10
+    
+    def test_serves_stale_while_another_request_recomputes(self, cache):
+        """Test a stale entry is returned instead of waiting on the recompute lock"""
+        cache.get(1, lambda: make_summary(1))
+        cache.invalidate(1)
+        redis_client.set("test:summary:1:lock", "other-request")
+        
+        started = time.monotonic()
+        summary = cache.get(1, lambda: make_summary(2))
+        
+        assert summary.total_calculations == 1
+        assert time.monotonic() - started < 0.5
+    
+    def test_concurrent_misses_compute_once(self, cache):
+        """Test concurrent misses wait for a single recompute"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return make_summary(7)
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get(1, compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert [summary.total_calculations for summary in results] == [7] * 5
+    
+    def test_generation_changes_only_on_invalidate(self, cache):
+        """Test a user's generation is created once and replaced by each invalidation"""
+        first = cache.generation(1)
+        
+        assert first is not None
+        assert cache.generation(1) == first
+        assert cache.generation(2) != first
+        
+        cache.invalidate(1)
+        
+        assert cache.generation(1) != first
+    
+    def test_disabled_cache_always_computes(self, cache):
+        """Test a disabled cache passes straight through"""
+        cache.enabled = False
+        calls = []
+        
+        for _ in range(3):
+            cache.get(1, lambda: calls.append(1) or make_summary(0))
+        
+        assert len(calls) == 3
\ No newline at end of file
@@ -0,0 +1,119 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models.calc_time_bucket import CalcTimeBucket
+from app.models.calculation import Calculation
+from app.services.calculations import CalculationService
+from app.services.timeseries import TimeSeriesService, parse_bucket, DAY, HOUR
+
+
+def make_row(user_id, created_at, operation="add", result=2.0):
+    """Build a calculation row at the given time"""
+    return {
+        "user_id": user_id,
+        "operation": operation,
+        "operand1": 1.0,
+        "operand2": 1.0,
+        "result": result,
+        "created_at": created_at
+    }
+
+
+def bucket_counts(db_session, granularity):
+    """Read stored buckets as {(bucket_start, operation): count}"""
+    db_session.expire_all()
+    return {
+        (row.bucket_start, row.operation): row.count
+        for row in db_session.query(CalcTimeBucket).filter(CalcTimeBucket.granularity == granularity)
+    }
+
+
+class TestTimeSeriesService:
+    """Unit tests for bucketed time-series analytics"""
+    
+    def test_parse_bucket(self):
+        """Test bucket sizes in hours and days"""
+        assert parse_bucket("1h") == timedelta(hours=1)
+        assert parse_bucket("6h") == timedelta(hours=6)
+        assert parse_bucket("7d") == timedelta(days=7)
+        for invalid in ("0h", "15m", "day", ""):
+            with pytest.raises(ValueError):
+                parse_bucket(invalid)
+    
+    def test_writes_fill_hourly_buckets(self, db_session, test_user):
+        """Test bulk and ORM inserts land in their hour, and deletes leave it"""
+        CalculationService.bulk_create(db_session, [
+            make_row(test_user.id, datetime(2024, 3, 1, 10, 5)),
+            make_row(test_user.id, datetime(2024, 3, 1, 10, 55), "multiply", 6.0),
+            make_row(test_user.id, datetime(2024, 3, 1, 11, 0))
+        ])
+        calculation = Calculation(**make_row(test_user.id, datetime(2024, 3, 1, 11, 30)))
+        db_session.add(calculation)
+        db_session.commit()
+        db_session.delete(calculation)
+        db_session.commit()
+        
+        assert bucket_counts(db_session, HOUR) == {
+            (datetime(2024, 3, 1, 10), "add"): 1,
+            (datetime(2024, 3, 1, 10), "multiply"): 1,
+            (datetime(2024, 3, 1, 11), "add"): 1
+        }
+    
+    def test_series_buckets_and_fills_gaps(self, db_session, test_user):
+        """Test hourly buckets are summed into the requested size with empty buckets kept"""
+        CalculationService.bulk_create(db_session, [
+            make_row(test_user.id, datetime(2024, 3, 1, 1), result=2.0),
+            make_row(test_user.id, datetime(2024, 3, 1, 5), "multiply", 6.0),
+            make_row(test_user.id, datetime(2024, 3, 1, 13), result=4.0)
+        ])
+        
+        points = TimeSeriesService.get_series(
+            db_session, test_user.id, datetime(2024, 3, 1), datetime(2024, 3, 2), parse_bucket("6h")
+        )
+        
+        assert [point.bucket_start.hour for point in points] == [0, 6, 12, 18]
+        assert [point.count for point in points] == [2, 0, 1, 0]
+        assert points[0].operations == {"add": 1, "multiply": 1}
+        assert points[0].average_result == 4.0
+        assert points[1].average_result is None
+    
+    def test_compaction_keeps_series(self, db_session, test_user):
+        """Test compacting old hours into days leaves daily totals unchanged"""
+        CalculationService.bulk_create(db_session, [
+            make_row(test_user.id, datetime(2024, 3, 1, hour)) for hour in range(0, 24, 3)
+        ] + [make_row(test_user.id, datetime(2024, 3, 5, 12))])
+        
+        compacted = TimeSeriesService.compact(db_session, datetime(2024, 3, 5, 18))
+        
+        assert compacted == 8
+        assert bucket_counts(db_session, DAY) == {(datetime(2024, 3, 1), "add"): 8}
+        assert bucket_counts(db_session, HOUR) == {(datetime(2024, 3, 5, 12), "add"): 1}
+        points = TimeSeriesService.get_series(
+            db_session, test_user.id, datetime(2024, 3, 1), datetime(2024, 3, 6), parse_bucket("1d")
+        )
+        assert [point.count for point in points] == [8, 0, 0, 0, 1]
+    
+    def test_delete_after_compaction(self, db_session, test_user):
+        """Test deleting a calculation whose hour was compacted updates its day"""
+        for hour in (1, 2):
+            db_session.add(Calculation(**make_row(test_user.id, datetime(2024, 3, 1, hour))))
+        db_session.commit()
+        TimeSeriesService.compact(db_session, datetime(2024, 3, 10))
+        
+        db_session.delete(db_session.query(Calculation).first())
+        db_session.commit()
+        
+        assert bucket_counts(db_session, DAY) == {(datetime(2024, 3, 1), "add"): 1}
+    
+    def test_rebuild_and_limits(self, db_session, test_user):
+        """Test a rebuild restores buckets and oversized ranges are rejected"""
+        CalculationService.bulk_create(db_session, [make_row(test_user.id, datetime(2024, 3, 1, 9))])
+        db_session.query(CalcTimeBucket).delete()
+        db_session.commit()
+        
+        assert TimeSeriesService.rebuild(db_session, test_user.id) == 1
+        assert bucket_counts(db_session, HOUR) == {(datetime(2024, 3, 1, 9), "add"): 1}
+        with pytest.raises(ValueError):
+            TimeSeriesService.get_series(
+                db_session, test_user.id, datetime(2020, 1, 1), datetime(2024, 1, 1),
+                parse_bucket("1h"), max_points=1000
+            )
\ No newline at end of file
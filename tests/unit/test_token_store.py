@@ -0,0 +1,195 @@
+import time
+import pytest
+import redis
+from app.core.cache import redis_client
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.redis_token_store import BloomFilter, RedisTokenStore
+from app.core.token_store import MemoryTokenStore, SQLiteTokenStore, token_digest
+from tests.conftest import requires_redis
+
+PREFIX = "test:blacklist"
+
+
+def wait_for(condition, timeout=3.0):
+    """Poll until condition() holds or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def clear_keys():
+    for key in redis_client.scan_iter(f"{PREFIX}:*"):
+        redis_client.delete(key)
+
+
+@pytest.fixture
+def make_blacklist():
+    """Build started blacklists under a test prefix and stop them afterwards"""
+    clear_keys()
+    started = []
+    
+    def make(start=True):
+        blacklist = RedisTokenStore(redis_client, capacity=1000, prefix=PREFIX)
+        if start:
+            blacklist.start()
+            assert wait_for(lambda: blacklist.live)
+        started.append(blacklist)
+        return blacklist
+    
+    yield make
+    for blacklist in started:
+        blacklist.stop()
+    clear_keys()
+
+
+class TestBloomFilter:
+    """Unit tests for the Bloom filter"""
+    
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        """Test every added item is found and misses stay near the error rate"""
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"token-{i}")
+        
+        assert all(f"token-{i}" in bloom for i in range(10000))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestMemoryTokenStore:
+    """Unit tests for the in-process token store"""
+    
+    def test_revocations_expire(self):
+        """Test a revoked token is reported until its expiry passes"""
+        store = MemoryTokenStore()
+        store.add("revoked-token", 60)
+        store.add("expired-token", 0)
+        
+        assert store.contains("revoked-token")
+        assert store.might_contain("revoked-token")
+        assert not store.contains("expired-token")
+        assert not store.might_contain("fresh-token")
+
+
+class TestSQLiteTokenStore:
+    """Unit tests for the SQLite token store"""
+    
+    def test_revocations_are_shared_through_the_file(self, tmp_path):
+        """Test stores opened on the same file see each other's revocations"""
+        path = str(tmp_path / "revoked.db")
+        first, second = SQLiteTokenStore(path), SQLiteTokenStore(path)
+        first.add("revoked-token", 60)
+        first.add("expired-token", 0)
+        
+        assert second.contains("revoked-token")
+        assert not second.contains("expired-token")
+        assert not second.contains("fresh-token")
+
+
+class TestRedisTokenStoreOutage:
+    """Unit tests for the Redis token store while Redis is unreachable"""
+    
+    def test_breaker_trips_and_checks_fall_back_locally(self):
+        """Test an outage trips the breaker and answers checks from local state"""
+        down = redis.Redis(port=1, socket_connect_timeout=0.05, decode_responses=True)
+        store = RedisTokenStore(
+            down,
+            breaker=CircuitBreaker("test", failure_threshold=1, reset_timeout=60, exceptions=(redis.RedisError,)),
+            capacity=1000,
+            prefix=PREFIX
+        )
+        
+        store.add("revoked-token", 60)
+        
+        assert store.contains("revoked-token")
+        assert not store.contains("fresh-token")
+        stats = store.stats()
+        assert stats["pending_revocations"] == 1
+        assert stats["circuit"]["state"] == "open"
+        assert stats["circuit"]["trips"] == 1
+    
+    @requires_redis
+    def test_pending_revocations_reach_redis(self):
+        """Test revocations made during an outage are written once Redis answers"""
+        clear_keys()
+        down = redis.Redis(port=1, socket_connect_timeout=0.05, decode_responses=True)
+        store = RedisTokenStore(down, capacity=1000, prefix=PREFIX)
+        store.add("revoked-token", 60)
+        
+        store.client = redis_client
+        store.flush_pending()
+        
+        assert redis_client.ttl(f"{PREFIX}:{token_digest('revoked-token')}") > 0
+        assert store.stats()["pending_revocations"] == 0
+        clear_keys()
+
+
+@requires_redis
+class TestRedisTokenStore:
+    """Unit tests for the filtered Redis token store"""
+    
+    def test_stores_token_digest_not_token(self, make_blacklist):
+        """Test Redis keys hold the token's hash instead of the JWT"""
+        blacklist = make_blacklist()
+        blacklist.add("header.payload.signature", 60)
+        
+        assert redis_client.exists(f"{PREFIX}:{token_digest('header.payload.signature')}")
+        assert not redis_client.exists(f"{PREFIX}:header.payload.signature")
+        assert blacklist.contains("header.payload.signature")
+    
+    def test_live_filter_answers_misses_without_redis(self, make_blacklist, monkeypatch):
+        """Test unrevoked tokens are cleared locally once the filter is synced"""
+        blacklist = make_blacklist()
+        blacklist.add("revoked-token", 60)
+        calls = []
+        original = redis_client.exists
+        monkeypatch.setattr(redis_client, "exists", lambda *keys: calls.append(keys) or original(*keys))
+        
+        assert not blacklist.contains("fresh-token")
+        assert calls == []
+        assert blacklist.contains("revoked-token")
+        assert len(calls) == 1
+    
+    def test_revocations_reach_other_processes(self, make_blacklist):
+        """Test a token revoked in one process is flagged by another's filter"""
+        first, second = make_blacklist(), make_blacklist()
+        assert not second.might_contain("shared-token")
+        
+        first.add("shared-token", 60)
+        
+        assert wait_for(lambda: second.might_contain("shared-token"))
+        assert second.contains("shared-token")
+    
+    def test_user_revocations_reach_other_processes(self, make_blacklist):
+        """Test revoking a user's tokens notifies every process's callback"""
+        revoked = []
+        first, second = make_blacklist(), make_blacklist()
+        second.on_user_revoked = revoked.append
+        
+        first.revoke_user(42)
+        
+        assert wait_for(lambda: revoked == [42])
+    
+    def test_reload_picks_up_existing_and_legacy_keys(self, make_blacklist):
+        """Test the startup scan loads hashed keys and keys holding the raw token"""
+        redis_client.setex(f"{PREFIX}:{token_digest('hashed-token')}", 60, "true")
+        redis_client.setex(f"{PREFIX}:legacy.raw.token", 60, "true")
+        
+        blacklist = make_blacklist()
+        
+        assert blacklist.contains("hashed-token")
+        assert blacklist.contains("legacy.raw.token")
+        assert not blacklist.contains("other.raw.token")
+    
+    def test_unsynced_blacklist_always_asks_redis(self, make_blacklist):
+        """Test a blacklist without a running subscriber never trusts its filter"""
+        writer = make_blacklist(start=False)
+        reader = make_blacklist(start=False)
+        writer.add("revoked-token", 60)
+        
+        assert not reader.live
+        assert reader.might_contain("anything")
+        assert reader.contains("revoked-token")
\ No newline at end of file
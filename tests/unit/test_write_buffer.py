@@ -0,0 +1,94 @@
+import time
+import pytest
+from app.models.calculation import Calculation
+from app.services.write_buffer import CalculationWriteBuffer, WriteBufferFull
+from tests.conftest import TestingSessionLocal
+
+
+def make_row(user_id, operand1=1.0):
+    """Build a calculation row as the create route queues it"""
+    return {
+        "user_id": user_id,
+        "operation": "add",
+        "operand1": operand1,
+        "operand2": 1.0,
+        "result": operand1 + 1.0
+    }
+
+
+class TestCalculationWriteBuffer:
+    """Unit tests for the write-behind calculation buffer"""
+    
+    def test_stop_drains_queue(self, db_session, test_user):
+        """Test rows queued before shutdown are written on stop"""
+        buffer = CalculationWriteBuffer(TestingSessionLocal, batch_size=2, flush_interval=60)
+        buffer.start()
+        for i in range(5):
+            buffer.submit(make_row(test_user.id, i))
+        
+        buffer.stop(timeout=5)
+        
+        assert buffer.pending == 0
+        assert buffer.flushed_rows == 5
+        assert db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count() == 5
+    
+    def test_flushes_on_interval(self, db_session, test_user):
+        """Test a partial batch is written once the flush interval passes"""
+        buffer = CalculationWriteBuffer(TestingSessionLocal, batch_size=100, flush_interval=0.05)
+        buffer.start()
+        try:
+            buffer.submit(make_row(test_user.id))
+            deadline = time.monotonic() + 5
+            while buffer.flushed_rows == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            buffer.stop(timeout=5)
+        
+        assert buffer.flushed_rows == 1
+        assert db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count() == 1
+    
+    def test_backpressure_when_full(self, test_user):
+        """Test submitting to a full buffer raises instead of growing"""
+        buffer = CalculationWriteBuffer(TestingSessionLocal, max_size=2, put_timeout=0.01)
+        buffer.submit(make_row(test_user.id))
+        buffer.submit(make_row(test_user.id))
+        
+        with pytest.raises(WriteBufferFull):
+            buffer.submit(make_row(test_user.id))
+        
+        assert buffer.pending == 2
+    
+    def test_rejected_row_is_dropped_alone(self, db_session, test_user):
+        """Test a row failing a constraint is dropped without the rest of its batch"""
+        buffer = CalculationWriteBuffer(TestingSessionLocal, batch_size=10)
+        rows = [make_row(test_user.id, i) for i in range(5)]
+        rows[2]["operation"] = None
+        for row in rows:
+            buffer.submit(row)
+        
+        assert buffer.flush() == 4
+        
+        assert buffer.dropped_rows == 1
+        assert db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count() == 4
+    
+    def test_stop_leaves_rows_to_a_busy_flusher(self, db_session, test_user):
+        """Test stop does not drain alongside a flusher that outlasts its timeout"""
+        def slow_session():
+            time.sleep(0.3)
+            return TestingSessionLocal()
+        
+        buffer = CalculationWriteBuffer(slow_session, batch_size=1, flush_interval=0.01)
+        buffer.start()
+        buffer.submit(make_row(test_user.id))
+        time.sleep(0.1)
+        buffer.submit(make_row(test_user.id))
+        
+        buffer.stop(timeout=0.01)
+        
+        assert buffer.running
+        assert buffer.pending == 1
+        deadline = time.monotonic() + 5
+        while buffer.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.flushed_rows == 2
+        assert db_session.query(Calculation).filter(Calculation.user_id == test_user.id).count() == 2
\ No newline at end of file